@@ -0,0 +1,190 @@
+"""
+Static asset pipeline.
+
+Build step (run on deploy, needs network access to the CDNs once):
+
+    python -m app.assets
+
+Vendors the CDN scripts/styles used by the templates into app/static/vendor,
+fingerprints every file (name.<hash>.ext), precompresses them (.gz, and .br
+when the `brotli` package is installed) and writes app/static/manifest.json.
+Fingerprinted files of the previous manifest that are no longer referenced are
+removed together with their precompressed variants. Templates call asset_url(name); without a manifest they fall back to the CDN.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import urllib.request
+from mimetypes import guess_type
+import anyio
+from fastapi.staticfiles import StaticFiles
+
+STATIC_DIR = "app/static"
+VENDOR_DIR = os.path.join(STATIC_DIR, "vendor")
+MANIFEST_PATH = os.path.join(STATIC_DIR, "manifest.json")
+COMPRESSIBLE_EXTENSIONS = (".js", ".css", ".svg", ".json", ".html", ".txt")
+
+CDN_ASSETS = {
+    "tailwind.js": "https://cdn.tailwindcss.com",
+    "lucide.js": "https://unpkg.com/lucide@0.344.0/dist/umd/lucide.min.js",
+    "fullcalendar.js": "https://cdn.jsdelivr.net/npm/fullcalendar@6.1.10/index.global.min.js",
+    "fullcalendar.css": "https://cdn.jsdelivr.net/npm/fullcalendar@6.1.10/index.global.min.css",
+    "bootstrap.css": "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css",
+}
+
+_manifest = None
+_fingerprinted = None
+
+def load_manifest() -> dict:
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST_PATH, encoding="utf-8") as f:
+                _manifest = json.load(f)
+        except FileNotFoundError:
+            _manifest = {}
+    return _manifest
+
+def _fingerprinted_paths() -> frozenset:
+    global _fingerprinted
+    if _fingerprinted is None:
+        _fingerprinted = frozenset(load_manifest().values())
+    return _fingerprinted
+
+def asset_url(name: str) -> str:
+    """URL of a logical asset: fingerprinted local copy if built, otherwise the CDN/original path."""
+    path = load_manifest().get(name)
+    if path:
+        return f"/static/{path}"
+    return CDN_ASSETS.get(name, f"/static/{name}")
+
+def _fingerprint(path: str) -> str:
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:10]
+    stem, ext = os.path.splitext(path)
+    hashed = f"{stem}.{digest}{ext}"
+    shutil.copyfile(path, hashed)
+    return hashed
+
+def _precompress(path: str):
+    if not path.endswith(COMPRESSIBLE_EXTENSIONS):
+        return
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9))
+    try:
+        import brotli
+    except ImportError:
+        return
+    with open(path + ".br", "wb") as f:
+        f.write(brotli.compress(data, quality=11))
+
+def _read_manifest_file() -> dict:
+    try:
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def _prune(previous: dict, current: dict) -> list:
+    """Delete fingerprinted files (and .gz/.br) of the previous build that the new manifest no longer uses."""
+    keep = set(current.values())
+    removed = []
+    for path in set(previous.values()) - keep:
+        full = os.path.join(STATIC_DIR, path)
+        for candidate in (full, full + ".gz", full + ".br"):
+            try:
+                os.remove(candidate)
+            except FileNotFoundError:
+                continue
+            removed.append(os.path.relpath(candidate, STATIC_DIR).replace(os.sep, "/"))
+    return removed
+
+def build():
+    os.makedirs(VENDOR_DIR, exist_ok=True)
+    previous = _read_manifest_file()
+    manifest = {}
+    for name, url in CDN_ASSETS.items():
+        target = os.path.join(VENDOR_DIR, name)
+        with urllib.request.urlopen(url, timeout=30) as resp, open(target, "wb") as f:
+            f.write(resp.read())
+        manifest[name] = _fingerprint(target)
+    # Local files (e.g. logo.png) that are not fingerprinted yet
+    for entry in os.scandir(STATIC_DIR):
+        if entry.is_file() and entry.name != "manifest.json" and not entry.name.endswith((".gz", ".br")):
+            if entry.name.count(".") == 1:
+                manifest[entry.name] = _fingerprint(entry.path)
+    for name, path in manifest.items():
+        _precompress(path)
+        manifest[name] = os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    # Chỉ xóa file cũ sau khi manifest mới đã được ghi
+    _prune(previous, manifest)
+    return manifest
+
+def _accepted_encodings(header: str) -> set:
+    """Encodings the client accepts from an Accept-Encoding value ("br;q=1.0, gzip;q=0, *")."""
+    accepted, refused, wildcard = set(), set(), False
+    for token in header.split(","):
+        name, _, params = token.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name == "*":
+            wildcard = q > 0
+        elif q > 0:
+            accepted.add(name)
+        else:
+            refused.add(name)
+    if wildcard:
+        accepted |= {"br", "gzip"} - refused
+    return accepted
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves precompressed variants (.br/.gz) when the client accepts them
+    and marks fingerprinted files as immutable. ETag/If-None-Match come from StaticFiles.
+    """
+    IMMUTABLE = "public, max-age=31536000, immutable"
+    REVALIDATE = "public, max-age=0, must-revalidate"
+
+    async def get_response(self, path: str, scope):
+        accept = _accepted_encodings(",".join(
+            value.decode("latin-1") for key, value in scope.get("headers", []) if key == b"accept-encoding"
+        ))
+        response = None
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if encoding not in accept:
+                continue
+            # lookup_path gọi os.stat (blocking) -> chạy trong thread như StaticFiles
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result is None:
+                continue
+            response = await super().get_response(path + suffix, scope)
+            if response.status_code == 200:
+                media_type = guess_type(path)[0] or "application/octet-stream"
+                response.headers["content-type"] = media_type
+                response.headers["content-encoding"] = encoding
+            break
+        if response is None:
+            response = await super().get_response(path, scope)
+        response.headers["vary"] = "Accept-Encoding"
+        fingerprinted = path in _fingerprinted_paths()
+        response.headers["cache-control"] = self.IMMUTABLE if fingerprinted else self.REVALIDATE
+        return response
+
+if __name__ == "__main__":
+    for name, path in build().items():
+        print(f"{name} -> {path}")
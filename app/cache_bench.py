@@ -0,0 +1,141 @@
+"""
+Benchmark: host-wide SharedCache vs a plain dict per worker.
+
+    python -m app.cache_bench [--workers 4] [--keys 200] [--reads 20000] [--load-ms 2]
+
+Each simulated worker is a separate process reading random keys; a miss costs
+`--load-ms` (stand-in for the DB query). Reported per backend: read latency on hits,
+total loads across workers (the dict pays one load per key per worker), and whether a
+worker sees an invalidation made by another worker.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from app.services.shared_cache import SharedCache, dumps
+
+NAMESPACE = "bench"
+
+def _value(key: str) -> dict:
+    # Kích thước gần giống một thẻ tutor
+    return {"id": int(key), "name": f"Tutor {key}", "mssv": f"2{int(key):06d}", "department": "Khoa học Máy tính",
+            "rating": 4.5, "totalSessions": 30, "subjects": ["Giải tích 1", "Vật lý 1"], "bio": "x" * 120}
+
+def _dict_worker(args):
+    keys, reads, load_ms, seed = args
+    rng, cache, loads = random.Random(seed), {}, 0
+    hit_time, hits = 0.0, 0
+    for _ in range(reads):
+        key = str(rng.randrange(keys))
+        started = time.perf_counter()
+        value = cache.get(key)
+        if value is not None:
+            body = json.dumps(value, ensure_ascii=False).encode()  # dict giữ object -> serialize mỗi lần trả
+            hit_time += time.perf_counter() - started
+            hits += 1
+            continue
+        time.sleep(load_ms / 1000)
+        loads += 1
+        cache[key] = _value(key)
+    return loads, hits, hit_time
+
+def _shared_worker(args):
+    keys, reads, load_ms, seed, path = args
+    cache = SharedCache(path=path, enabled=True)
+    rng = random.Random(seed)
+    loads, hit_time, hits = 0, 0.0, 0
+
+    def loader(missing):
+        nonlocal loads
+        time.sleep(load_ms / 1000)
+        loads += 1
+        return {k: _value(k) for k in missing}
+
+    for _ in range(reads):
+        key = str(rng.randrange(keys))
+        started = time.perf_counter()
+        before = loads
+        body = cache.load_many(NAMESPACE, [key], loader)[key]
+        if loads == before:
+            hit_time += time.perf_counter() - started
+            hits += 1
+    return loads, hits, hit_time
+
+def _run(pool, worker, jobs) -> dict:
+    started = time.perf_counter()
+    results = pool.map(worker, jobs)
+    elapsed = time.perf_counter() - started
+    loads = sum(r[0] for r in results)
+    hits = sum(r[1] for r in results)
+    hit_time = sum(r[2] for r in results)
+    return {"wall_s": round(elapsed, 2), "loads": loads,
+            "hit_us": round(hit_time / hits * 1e6, 1) if hits else None}
+
+def _coherence_worker(conn, backend: str, cache_path: str, source: str):
+    """Worker A: answers each "read" with the cached value of "k", loading it from `source` on a miss."""
+    def load():
+        with open(source, encoding="utf-8") as f:
+            return f.read()
+
+    shared, local = SharedCache(path=cache_path, enabled=True), {}
+    while conn.recv() == "read":
+        if backend == "shared_cache":
+            conn.send(json.loads(shared.load("coherence", "k", load)))
+        else:
+            if "k" not in local:
+                local["k"] = load()
+            conn.send(local["k"])
+
+def _check_invalidation(path: str) -> dict:
+    """Worker A caches a value, worker B (this process) changes the data and invalidates: does A see it?"""
+    source = os.path.join(os.path.dirname(path), "coherence.txt")
+    seen = {}
+    for backend in ("shared_cache", "per_process_dict"):
+        with open(source, "w", encoding="utf-8") as f:
+            f.write("old")
+        SharedCache(path=path, enabled=True).invalidate("coherence")
+        parent, child = multiprocessing.Pipe()
+        worker = multiprocessing.Process(target=_coherence_worker, args=(child, backend, path, source))
+        worker.start()
+        parent.send("read")
+        parent.recv()
+        with open(source, "w", encoding="utf-8") as f:
+            f.write("new")
+        # Với dict, worker B chỉ xóa được dict của chính nó; A không hề biết
+        if backend == "shared_cache":
+            SharedCache(path=path, enabled=True).invalidate("coherence")
+        parent.send("read")
+        seen[backend] = parent.recv()
+        parent.send("stop")
+        worker.join()
+    return seen
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--keys", type=int, default=200)
+    parser.add_argument("--reads", type=int, default=20000)
+    parser.add_argument("--load-ms", type=float, default=2.0)
+    opts = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.sqlite3")
+        SharedCache(path=path).invalidate(NAMESPACE)  # tạo schema trước khi các worker mở file
+        with multiprocessing.Pool(opts.workers) as pool:
+            results = {
+                "per_process_dict": _run(pool, _dict_worker, [
+                    (opts.keys, opts.reads, opts.load_ms, seed) for seed in range(opts.workers)]),
+                "shared_cache": _run(pool, _shared_worker, [
+                    (opts.keys, opts.reads, opts.load_ms, seed, path) for seed in range(opts.workers)]),
+            }
+        results["invalidation_seen"] = _check_invalidation(path)
+        results["value_bytes"] = len(dumps(_value("1")))
+    print(json.dumps({"workers": opts.workers, "keys": opts.keys, "reads_per_worker": opts.reads,
+                      "load_ms": opts.load_ms, **results}, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import re
 from datetime import datetime, timedelta
 
 class ScheduleDomain:
@@ -23,4 +24,87 @@ class MatchingDomain:
     """
     Logic for matching students to tutors (Advanced Feature)
     """
-    pass
\ No newline at end of file
+    pass
+
+class SemesterDomain:
+    """
+    Maps semester labels such as 'HK2 2025-2026' to the calendar window they cover:
+    HK1 = Sep..Jan of the first year, HK2 = Feb..Jun, HK3 (summer) = Jul..Aug.
+    """
+    PATTERN = re.compile(r"HK\s*([123])\s+(\d{4})\s*-\s*(\d{4})", re.IGNORECASE)
+
+    @classmethod
+    def window(cls, semester: str):
+        """[start, end) of the semester, or None when the label is not recognised."""
+        m = cls.PATTERN.search(semester or "")
+        if not m:
+            return None
+        term, first, second = int(m.group(1)), int(m.group(2)), int(m.group(3))
+        if term == 1:
+            return datetime(first, 9, 1), datetime(second, 2, 1)
+        if term == 2:
+            return datetime(second, 2, 1), datetime(second, 7, 1)
+        return datetime(second, 7, 1), datetime(second, 9, 1)
+
+class AvailabilityDomain:
+    """
+    Week bitsets for free-time search. Bit i of a week = the i-th 15-minute
+    block after Monday 00:00. Python ints are used as the bit vectors, so
+    AND/OR/shift run word-parallel in C. NumPy is available (analytics uses it)
+    but a week is only 672 bits; one int per week is cheaper than array setup.
+    Runs may cross into the next week: shift that week's bits up by
+    BLOCKS_PER_WEEK and OR them in before calling runs().
+    """
+    GRANULARITY_MINUTES = 15
+    BLOCKS_PER_DAY = 24 * 60 // GRANULARITY_MINUTES
+    BLOCKS_PER_WEEK = 7 * BLOCKS_PER_DAY
+
+    @staticmethod
+    def week_start(dt: datetime) -> datetime:
+        day = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+        return day - timedelta(days=day.weekday())
+
+    @classmethod
+    def block_index(cls, dt: datetime, week: datetime) -> int:
+        return int((dt - week).total_seconds() // 60) // cls.GRANULARITY_MINUTES
+
+    @classmethod
+    def range_mask(cls, first: int, last: int) -> int:
+        """Bits [first, last) set."""
+        first = max(first, 0)
+        last = min(last, cls.BLOCKS_PER_WEEK)
+        if last <= first:
+            return 0
+        return ((1 << (last - first)) - 1) << first
+
+    @classmethod
+    def encode(cls, intervals) -> dict:
+        """[(start, end), ...] -> {week_start: bits}. Intervals spanning weeks are split."""
+        weeks = {}
+        for start, end in intervals:
+            week = cls.week_start(start)
+            while week < end:
+                next_week = week + timedelta(days=7)
+                first = cls.block_index(max(start, week), week)
+                # Làm tròn lên để slot lẻ phút vẫn chiếm trọn block cuối
+                last_minutes = (min(end, next_week) - week).total_seconds() / 60
+                last = -int(-last_minutes // cls.GRANULARITY_MINUTES)
+                weeks[week] = weeks.get(week, 0) | cls.range_mask(first, last)
+                week = next_week
+        return weeks
+
+    @staticmethod
+    def runs(bits: int, length: int) -> int:
+        """Bit i set iff bits i .. i+length-1 are all set."""
+        result = bits
+        for shift in range(1, length):
+            result &= bits >> shift
+        return result
+
+    @staticmethod
+    def lowest_bit(bits: int) -> int:
+        return (bits & -bits).bit_length() - 1 if bits else -1
+
+    @classmethod
+    def block_time(cls, week: datetime, index: int) -> datetime:
+        return week + timedelta(minutes=index * cls.GRANULARITY_MINUTES)
@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+# POST endpoints clients retry on timeout; a repeated Idempotency-Key replays the first answer
+IDEMPOTENT_PATHS = frozenset({"/api/student/book", "/api/select_tutor", "/api/register_program"})
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "3600"))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "20000"))
+# A retry arriving while the first request still runs waits this long for its result
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+# Bodies are buffered and hashed before the handler runs; these endpoints take tiny JSON
+IDEMPOTENCY_MAX_BODY_BYTES = int(os.getenv("IDEMPOTENCY_MAX_BODY_BYTES", str(16 * 1024)))
+MAX_KEY_LENGTH = 255
+MAX_STORED_BODY_BYTES = 64 * 1024
+
+class _Entry:
+    __slots__ = ("fingerprint", "expires", "done", "response")
+
+    def __init__(self, fingerprint: str, expires: float):
+        self.fingerprint = fingerprint
+        self.expires = expires
+        self.done = asyncio.Event()
+        self.response = None  # (status, headers, body) once finished
+
+class IdempotencyStore:
+    """
+    Bounded LRU of (user, path, key) -> first response, expiring after `ttl`.
+    Only touched from the event loop, so no lock is needed. Per worker: a retry
+    routed to another worker runs the handler again, as before.
+    """
+
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL_SECONDS, max_keys: int = IDEMPOTENCY_MAX_KEYS):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._entries = OrderedDict()
+        self.stats = {"stored": 0, "replayed": 0, "conflicts": 0, "in_flight_waits": 0, "too_large": 0}
+
+    def get(self, key) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def begin(self, key, fingerprint: str) -> _Entry:
+        entry = self._entries[key] = _Entry(fingerprint, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+        return entry
+
+    def finish(self, key, entry: _Entry, response):
+        entry.response = response
+        entry.done.set()
+        if response is None:
+            # Lỗi server / body quá lớn: không lưu, lần thử lại sẽ chạy lại handler
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        else:
+            self.stats["stored"] += 1
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "keys": len(self._entries)}
+
+idempotency_store = IdempotencyStore()
+
+def new_idempotency_key() -> str:
+    """Key prefix for one page render (templates: idempotency_key()); idempotency.js appends a counter."""
+    return uuid.uuid4().hex
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware for IDEMPOTENT_PATHS. Requests carrying an Idempotency-Key are
+    answered from the store when the same user already sent that key, without reaching
+    the handler (so no DB session or validation queries). Must sit inside
+    SessionMiddleware so the key can be scoped to the logged-in user.
+    """
+
+    def __init__(self, app, store: IdempotencyStore = idempotency_store, paths=IDEMPOTENT_PATHS,
+                 max_body_bytes: int = IDEMPOTENCY_MAX_BODY_BYTES):
+        self.app = app
+        self.store = store
+        self.paths = paths
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        idem_key = headers.get(b"idempotency-key")
+        if not idem_key:
+            return await self.app(scope, receive, send)
+        if len(idem_key) > MAX_KEY_LENGTH:
+            return await self._send_json(send, 400, b'{"detail":"Idempotency-Key too long"}')
+        try:
+            declared = int(headers.get(b"content-length", b"0"))
+        except ValueError:
+            declared = 0
+        if declared > self.max_body_bytes:
+            return await self._too_large(send)
+
+        body, size, more = [], 0, True
+        while more:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            # Chunked/không khai Content-Length: dừng đọc ngay khi vượt giới hạn
+            if size > self.max_body_bytes:
+                return await self._too_large(send)
+            body.append(chunk)
+            more = message.get("more_body", False)
+        body = b"".join(body)
+        fingerprint = hashlib.sha256(body).hexdigest()
+
+        user = (scope.get("session") or {}).get("user") or {}
+        key = (user.get("id"), scope["path"], idem_key)
+        entry = self.store.get(key)
+        if entry is not None:
+            if entry.fingerprint != fingerprint:
+                self.store.stats["conflicts"] += 1
+                return await self._send_json(send, 422, b'{"detail":"Idempotency-Key reused with a different request body"}')
+            if not entry.done.is_set():
+                self.store.stats["in_flight_waits"] += 1
+                try:
+                    await asyncio.wait_for(entry.done.wait(), IDEMPOTENCY_WAIT_SECONDS)
+                except asyncio.TimeoutError:
+                    return await self._send_json(send, 409, b'{"detail":"Request with this Idempotency-Key is still in progress"}')
+            if entry.response is not None:
+                self.store.stats["replayed"] += 1
+                status, headers, response_body = entry.response
+                await send({"type": "http.response.start", "status": status,
+                            "headers": headers + [(b"idempotent-replayed", b"true")]})
+                await send({"type": "http.response.body", "body": response_body})
+                return
+            # Lần đầu bị lỗi server -> chạy lại như request mới
+
+        entry = self.store.begin(key, fingerprint)
+        captured = {"status": None, "headers": [], "body": [], "size": 0}
+
+        async def replay_receive():
+            nonlocal body
+            if body is not None:
+                chunk, body = body, None
+                return {"type": "http.request", "body": chunk, "more_body": False}
+            return await receive()
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                captured["status"] = message["status"]
+                # Không phát lại cookie phiên cũ
+                captured["headers"] = [(k, v) for k, v in message.get("headers", []) if k.lower() != b"set-cookie"]
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                captured["size"] += len(chunk)
+                if captured["size"] <= MAX_STORED_BODY_BYTES:
+                    captured["body"].append(chunk)
+            await send(message)
+
+        response = None
+        try:
+            await self.app(scope, replay_receive, capture_send)
+            if captured["status"] is not None and captured["status"] < 500 \
+                    and captured["size"] <= MAX_STORED_BODY_BYTES:
+                response = (captured["status"], captured["headers"], b"".join(captured["body"]))
+        finally:
+            self.store.finish(key, entry, response)
+
+    async def _too_large(self, send):
+        self.store.stats["too_large"] += 1
+        await self._send_json(send, 413, b'{"detail":"Request body too large"}')
+
+    @staticmethod
+    async def _send_json(send, status: int, body: bytes):
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
@@ -1,18 +1,248 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Optional
+import httpx
+from app.integration.library_cache import TwoTierCache
+
+# Remote HCMUT services. Leave the URL empty to keep the local stub behaviour.
+SSO_URL = os.getenv("SSO_URL", "")
+DATACORE_URL = os.getenv("DATACORE_URL", "")
+LIBRARY_URL = os.getenv("LIBRARY_URL", "")
+INTEGRATION_TIMEOUT_SECONDS = float(os.getenv("INTEGRATION_TIMEOUT_SECONDS", "2.0"))
+
+class IntegrationUnavailable(Exception):
+    """The remote service is down, too slow, or its circuit breaker is open."""
+    pass
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and fails fast for
+    `reset_timeout` seconds; then lets one trial call through (half-open).
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+    def release_trial(self):
+        """Frees the half-open trial when the call ended without an outcome (e.g. cancelled)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+class TTLCache:
+    def __init__(self, ttl_seconds: float, max_size: int = 10000):
+        self.ttl = ttl_seconds
+        self.max_size = max_size
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._data[key]
+                return None
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            if len(self._data) >= self.max_size:
+                now = time.monotonic()
+                for k in [k for k, (expires, _) in self._data.items() if expires < now]:
+                    del self._data[k]
+                if len(self._data) >= self.max_size:
+                    self._data.pop(next(iter(self._data)))
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+class HttpClientPool:
+    """One keep-alive AsyncClient per process, shared by every adapter."""
+
+    def __init__(self, max_connections: int = 100, max_keepalive: int = 20):
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=INTEGRATION_TIMEOUT_SECONDS)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+http_pool = HttpClientPool()
+
+class RemoteAdapter:
+    """Timeout + circuit breaker around calls to one remote service."""
+
+    def __init__(self, base_url: str, timeout: float = INTEGRATION_TIMEOUT_SECONDS, pool: HttpClientPool = http_pool):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.pool = pool
+        self.breaker = CircuitBreaker()
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        if not self.breaker.allow():
+            raise IntegrationUnavailable(f"{self.base_url}: circuit open")
+        try:
+            resp = await self.pool.client.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+        except httpx.HTTPError as e:
+            self.breaker.record_failure()
+            raise IntegrationUnavailable(f"{self.base_url}: {type(e).__name__}") from e
+        except BaseException:
+            # CancelledError...: không có kết quả, nhưng không được giữ trial mãi
+            self.breaker.release_trial()
+            raise
+        if resp.status_code >= 500:
+            self.breaker.record_failure()
+            raise IntegrationUnavailable(f"{self.base_url}: HTTP {resp.status_code}")
+        self.breaker.record_success()
+        return resp
+
+    def _json(self, resp: httpx.Response) -> dict:
+        """Body of a 2xx answer; a malformed body counts as a failure of the service."""
+        try:
+            data = resp.json()
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            self.breaker.record_failure()
+            raise IntegrationUnavailable(f"{self.base_url}: malformed response")
+        return data
+
+    def stats(self) -> dict:
+        return {"state": self.breaker.state, "failures": self.breaker.failures}
+
 # Simulates the SSOAdapter component in the diagram
-class SSOAdapter:
-    def authenticate(self, mssv: str, password: str) -> bool:
-        # In a real scenario, this would send a REST/SOAP request to HCMUT SSO
-        # For now, we return True to allow the AuthService to proceed with local DB check
-        # or implement mock logic here.
-        return True
+class SSOAdapter(RemoteAdapter):
+    # Chỉ cache kết quả đăng nhập thành công, trong thời gian ngắn
+    CACHE_TTL_SECONDS = 60
+
+    def __init__(self, base_url: str = SSO_URL, **kwargs):
+        super().__init__(base_url, **kwargs)
+        self.cache = TTLCache(self.CACHE_TTL_SECONDS)
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.base_url)
+
+    async def authenticate(self, mssv: str, password: str) -> bool:
+        if not self.base_url:
+            # No SSO configured: let the AuthService proceed with the local DB check
+            return True
+        key = hashlib.sha256(f"{mssv}\0{password}".encode()).hexdigest()
+        if self.cache.get(key):
+            return True
+        resp = await self._request("POST", "/authenticate", json={"mssv": mssv, "password": password})
+        ok = resp.status_code == 200 and bool(self._json(resp).get("authenticated"))
+        if ok:
+            self.cache.set(key, True)
+        return ok
 
 # Simulates DataCoreAdapter
-class DataCoreAdapter:
-    def sync_user_data(self, mssv: str):
-        # Mocking fetching data from HCMUT_DATACORE
-        return {"ho_ten": "Nguyen Van A (Synced)", "major": "Computer Science"}
+class DataCoreAdapter(RemoteAdapter):
+    CACHE_TTL_SECONDS = 300
+
+    def __init__(self, base_url: str = DATACORE_URL, **kwargs):
+        super().__init__(base_url, **kwargs)
+        self.cache = TTLCache(self.CACHE_TTL_SECONDS)
+
+    async def sync_user_data(self, mssv: str):
+        if not self.base_url:
+            # Mocking fetching data from HCMUT_DATACORE
+            return {"ho_ten": "Nguyen Van A (Synced)", "major": "Computer Science"}
+        cached = self.cache.get(mssv)
+        if cached is not None:
+            return cached
+        resp = await self._request("GET", f"/users/{mssv}")
+        if resp.status_code != 200:
+            return None
+        data = self._json(resp)
+        self.cache.set(mssv, data)
+        return data
+
+    async def iter_roster(self, page_size: int = 1000, cursor: Optional[str] = None):
+        """Streams the full roster page by page: yields (users, next_cursor)."""
+        if not self.base_url:
+            return
+        while True:
+            params = {"limit": page_size}
+            if cursor:
+                params["cursor"] = cursor
+            resp = await self._request("GET", "/users", params=params)
+            if resp.status_code != 200:
+                raise IntegrationUnavailable(f"{self.base_url}: roster HTTP {resp.status_code}")
+            data = self._json(resp)
+            cursor = data.get("next_cursor")
+            yield data.get("users", []), cursor
+            if not cursor:
+                break
 
 # Simulates LibraryAdapter
-class LibraryAdapter:
-    def get_documents(self, subject_code: str):
-        return ["Book A", "Slide B"]
\ No newline at end of file
+class LibraryAdapter(RemoteAdapter):
+    """Document lists per subject; they change rarely, so every lookup goes through a
+    memory + SQLite cache with stale-while-revalidate."""
+
+    def __init__(self, base_url: str = LIBRARY_URL, cache: TwoTierCache = None, **kwargs):
+        super().__init__(base_url, **kwargs)
+        self.cache = cache or TwoTierCache()
+
+    async def _fetch_documents(self, subject_code: str):
+        if not self.base_url:
+            return ["Book A", "Slide B"]
+        resp = await self._request("GET", "/documents", params={"subject": subject_code})
+        if resp.status_code != 200:
+            raise IntegrationUnavailable(f"{self.base_url}: documents HTTP {resp.status_code}")
+        return self._json(resp).get("documents", [])
+
+    async def get_documents(self, subject_code: str):
+        return await self.cache.get(subject_code, lambda: self._fetch_documents(subject_code))
+
+    def stats(self) -> dict:
+        return {**super().stats(), "cache": self.cache.snapshot()}
+
+# Shared instances: the breaker and caches must outlive a single request
+sso_adapter = SSOAdapter()
+datacore_adapter = DataCoreAdapter()
+library_adapter = LibraryAdapter()
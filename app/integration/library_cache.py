@@ -0,0 +1,122 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+LIBRARY_CACHE_PATH = os.getenv("LIBRARY_CACHE_PATH", "library_cache.sqlite3")
+
+class TwoTierCache:
+    """
+    In-memory LRU in front of a SQLite file, for slow-changing upstream data.
+
+    - fresh (age < ttl): served from memory/disk
+    - stale (age < ttl + stale_ttl): served immediately, refreshed in the background
+    - missing/expired: loaded from upstream; concurrent misses for the same key
+      share one upstream call
+    """
+
+    def __init__(self, path: str = LIBRARY_CACHE_PATH, ttl: float = 6 * 3600,
+                 stale_ttl: float = 7 * 24 * 3600, max_memory_items: int = 2000):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_memory_items = max_memory_items
+        self._memory = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn = None
+        self._inflight = {}
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stale_served": 0,
+                      "upstream_calls": 0, "coalesced": 0, "upstream_errors": 0}
+
+    # --- disk tier (sqlite3, called from a worker thread) ---
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, fetched_at REAL, value TEXT)")
+            self._conn = conn
+        return self._conn
+
+    def _disk_get(self, key: str):
+        with self._db_lock:
+            row = self._connection().execute(
+                "SELECT fetched_at, value FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def _disk_put(self, key: str, fetched_at: float, value):
+        with self._db_lock:
+            conn = self._connection()
+            conn.execute("INSERT OR REPLACE INTO cache (key, fetched_at, value) VALUES (?, ?, ?)",
+                         (key, fetched_at, json.dumps(value, ensure_ascii=False)))
+            conn.commit()
+
+    # --- memory tier ---
+    def _memory_get(self, key: str):
+        with self._memory_lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            return entry
+
+    def _memory_put(self, key: str, entry):
+        with self._memory_lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
+
+    async def get(self, key: str, loader: Callable[[], Awaitable]):
+        entry = self._memory_get(key)
+        if entry is not None:
+            self.stats["memory_hits"] += 1
+        else:
+            entry = await asyncio.to_thread(self._disk_get, key)
+            if entry is not None:
+                self.stats["disk_hits"] += 1
+                self._memory_put(key, entry)
+
+        if entry is not None:
+            age = time.time() - entry[0]
+            if age < self.ttl:
+                return entry[1]
+            if age < self.ttl + self.stale_ttl:
+                self.stats["stale_served"] += 1
+                self._refresh(key, loader)  # làm mới nền, không chờ
+                return entry[1]
+
+        self.stats["misses"] += 1
+        # shield: request đầu tiên bị hủy (client ngắt) không được hủy lần tải của các request đang chờ chung
+        return await asyncio.shield(self._refresh(key, loader))
+
+    def _refresh(self, key: str, loader):
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+            return task
+        task = asyncio.ensure_future(self._load(key, loader))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Lỗi khi làm mới nền (hoặc khi mọi request chờ đã bị hủy) không ảnh hưởng ai, chỉ đánh dấu đã đọc
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    async def _load(self, key: str, loader):
+        self.stats["upstream_calls"] += 1
+        try:
+            value = await loader()
+        except Exception:
+            self.stats["upstream_errors"] += 1
+            raise
+        entry = (time.time(), value)
+        self._memory_put(key, entry)
+        await asyncio.to_thread(self._disk_put, key, entry[0], value)
+        return value
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "memory_items": len(self._memory)}
@@ -1,27 +1,66 @@
+import time
+BOOT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI, Request, Depends
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from starlette.middleware.gzip import GZipMiddleware
 from starlette.middleware.sessions import SessionMiddleware
+from contextlib import asynccontextmanager
 from app.routers import controllers
-from app.database import engine, Base
+from app.services.health import health_monitor
+from app.templating import templates, precompile_templates
+from app.assets import CachedStaticFiles
+from app.idempotency import IdempotencyMiddleware
+from app.ratelimit import RateLimitMiddleware
+from app.services.scheduler import background_scheduler
+from app.services.jobs import register_jobs, BACKGROUND_JOBS_ENABLED
+from app.integration.adapters import http_pool
+from app.services.audit import audit_log
+import asyncio
+import logging
 import os
 
-# Create DB Tables automatically
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
+
+# Schema is managed by `python -m app.migrate`; AUTO_CREATE_SCHEMA=1 keeps the old dev behaviour
+if os.getenv("AUTO_CREATE_SCHEMA", "0") == "1":
+    from app.migrate import migrate
+    migrate()
+
+COLD_START_TARGET_MS = float(os.getenv("COLD_START_TARGET_MS", "1500"))
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    precompile_templates()
+    health_monitor.start()
+    health_monitor.cold_start_ms = round((time.perf_counter() - BOOT_STARTED) * 1000, 1)
+    if health_monitor.cold_start_ms > COLD_START_TARGET_MS:
+        logger.warning("Worker cold start took %.0f ms (target %.0f ms)",
+                       health_monitor.cold_start_ms, COLD_START_TARGET_MS)
+    if BACKGROUND_JOBS_ENABLED:
+        register_jobs()
+        background_scheduler.start()
+    yield
+    await background_scheduler.stop()
+    await health_monitor.stop()
+    await http_pool.aclose()
+    # Ghi nốt các sự kiện audit còn trong buffer
+    await asyncio.to_thread(audit_log.stop)
+
+app = FastAPI(lifespan=lifespan)
 
 # Mount Static Folder
 if not os.path.exists("app/static"):
     os.makedirs("app/static")
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+app.mount("/static", CachedStaticFiles(directory="app/static"), name="static")
 
 # Configuration
+# Added first so they run inside SessionMiddleware (keyed by the logged-in user).
+# Rate limiting is innermost: idempotent replays do not spend the quota.
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(IdempotencyMiddleware)
 app.add_middleware(SessionMiddleware, secret_key="SUPER_SECRET_KEY")
-
-# Templates Configuration
-templates = Jinja2Templates(directory="app/templates")
+app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 # Register Routers
 app.include_router(controllers.router)
@@ -0,0 +1,61 @@
+"""
+Explicit schema management.
+Run once per deploy instead of on every worker boot:
+
+    python -m app.migrate
+
+create_all() only creates missing tables; columns and indexes added to existing
+tables are listed in ADDED_COLUMNS / ADDED_INDEXES and created when absent.
+"""
+from sqlalchemy import inspect, text
+from app.database import engine, Base
+import app.models  # noqa: F401  (registers tables on Base.metadata)
+
+# (table, column, DDL type) in the order they were introduced
+ADDED_COLUMNS = [
+    ("booking_requests", "reminder_token", "VARCHAR(32) NULL"),
+    ("time_slots", "is_closed", "BOOLEAN NOT NULL DEFAULT 0"),
+]
+
+# (table, index name) of indexes declared in app/models.py after the table existed
+ADDED_INDEXES = [
+    ("time_slots", "ix_time_slots_tutor_open"),
+]
+
+def add_missing_columns(bind=engine) -> list:
+    """ALTER TABLE ... ADD COLUMN for every ADDED_COLUMNS entry missing in the database."""
+    applied = []
+    with bind.begin() as conn:
+        inspector = inspect(conn)
+        existing = {}
+        for table, column, ddl in ADDED_COLUMNS:
+            if table not in existing:
+                existing[table] = {c["name"] for c in inspector.get_columns(table)}
+            if column in existing[table]:
+                continue
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+            existing[table].add(column)
+            applied.append(f"{table}.{column}")
+    return applied
+
+def add_missing_indexes(bind=engine) -> list:
+    """CREATE INDEX for every ADDED_INDEXES entry missing in the database."""
+    applied = []
+    with bind.begin() as conn:
+        inspector = inspect(conn)
+        for table, name in ADDED_INDEXES:
+            if name in {i["name"] for i in inspector.get_indexes(table)}:
+                continue
+            index = next(i for i in Base.metadata.tables[table].indexes if i.name == name)
+            index.create(conn)
+            applied.append(f"{table}.{name}")
+    return applied
+
+def migrate(bind=engine) -> list:
+    Base.metadata.create_all(bind=bind)
+    return add_missing_columns(bind) + add_missing_indexes(bind)
+
+if __name__ == "__main__":
+    for name in migrate():
+        print(f"added {name}")
+    print("Schema is up to date.")
@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String, Enum, DateTime, ForeignKey, Boolean, Text, UniqueConstraint, Index
+from sqlalchemy import Column, Integer, BigInteger, String, Enum, DateTime, ForeignKey, Boolean, Text, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
 import enum
 from datetime import datetime, timezone
 
+# Password of accounts created by the DataCore sync: they sign in through SSO only
+NO_LOCAL_PASSWORD = "!"
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -43,11 +46,18 @@ class TimeSlot(Base):
     start_time = Column(DateTime(timezone=True), nullable=False)
     end_time = Column(DateTime(timezone=True), nullable=False)
     is_booked = Column(Boolean, default=False)
+    # Set by the close_past_slots job on unbooked slots that are over; kept for history/analytics
+    is_closed = Column(Boolean, default=False, nullable=False, server_default="0")
     
     tutor = relationship("User", back_populates="time_slots")
     appointment = relationship("Appointment", back_populates="slot", uselist=False)
     booking_request = relationship("BookingRequest", back_populates="slot", uselist=False)
 
+    __table_args__ = (
+        # Calendar/free-time reads: open slots of given tutors from a start time
+        Index("ix_time_slots_tutor_open", "tutor_id", "is_closed", "start_time"),
+    )
+
 class Appointment(Base):
     __tablename__ = "appointments"
     id = Column(Integer, primary_key=True)
@@ -99,6 +109,8 @@ class BookingRequest(Base):
     slot_id = Column(Integer, ForeignKey("time_slots.id"))
     note = Column(Text, nullable=True)
     status = Column(Enum("pending", "accepted", "rejected"), default="pending")
+    # Token of the worker that sent the session reminder (NULL = not reminded yet)
+    reminder_token = Column(String(32), nullable=True)
     created_at = Column(
         DateTime(timezone=True), 
         default=lambda: datetime.now(timezone.utc), 
@@ -118,3 +130,37 @@ class BookingRequest(Base):
             initially="DEFERRED"
         ),
     )
+
+
+class FeedVersion(Base):
+    """
+    Per-owner version counters for the calendar JSON feeds.
+    Bumped in the same transaction as the write, read to build ETags.
+    """
+    __tablename__ = "feed_versions"
+
+    scope = Column(String(32), primary_key=True)  # 'tutor_slots' | 'student_bookings'
+    owner_id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class AuditLog(Base):
+    """
+    Append-only record of state changes. Written in batches by the audit writer
+    (app/services/audit.py), never updated.
+    """
+    __tablename__ = "audit_logs"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    actor_id = Column(Integer, nullable=True)
+    action = Column(String(50), nullable=False)
+    entity = Column(String(50), nullable=True)
+    entity_id = Column(Integer, nullable=True)
+    detail = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("ix_audit_logs_actor", "actor_id", "id"),
+        Index("ix_audit_logs_action", "action", "id"),
+        Index("ix_audit_logs_created_at", "created_at"),
+    )
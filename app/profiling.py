@@ -0,0 +1,215 @@
+import asyncio
+import concurrent.futures.thread
+import cProfile
+import functools
+import inspect
+import io
+import os
+import pstats
+import queue
+import selectors
+import socket
+import ssl
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from fastapi.routing import APIRoute
+
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_MAX_REQUESTS = int(os.getenv("PROFILE_MAX_REQUESTS", "100"))
+# (file, function) of the stdlib leaf frames of threads that are just waiting: threadpool idle,
+# event loop select, Event/Condition wait, blocking socket reads. Matched on the file too, so
+# application functions that happen to be called `get` or `wait` are still sampled.
+IDLE_FUNCTIONS = frozenset(
+    (module.__file__, name)
+    for module, names in (
+        (threading, ("wait", "wait_for", "_wait_for_tstate_lock")),
+        (selectors, ("select",)),
+        (queue, ("get",)),
+        (concurrent.futures.thread, ("_worker",)),
+        (socket, ("accept", "recv_into", "readinto")),
+        (ssl, ("read", "recv", "recv_into")),
+    )
+    for name in names
+)
+
+class ProfilerBusy(Exception):
+    pass
+
+# Chỉ một phiên profiling mỗi worker tại một thời điểm
+_session_lock = threading.Lock()
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+def sample_stacks(seconds: float, interval: float = 0.005, include_idle: bool = False) -> str:
+    """
+    Statistical sampler over every thread of this worker. Returns collapsed stacks
+    ("root;...;leaf count" per line) for flamegraph.pl / speedscope. Blocking: call it
+    from a thread. Costs nothing when not running.
+    """
+    if not _session_lock.acquire(blocking=False):
+        raise ProfilerBusy("Đang có một phiên profiling khác")
+    try:
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        stacks = Counter()
+        deadline = time.monotonic() + min(seconds, PROFILE_MAX_SECONDS)
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if not include_idle and (frame.f_code.co_filename, frame.f_code.co_name) in IDLE_FUNCTIONS:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(ident, f"thread-{ident}"))
+                stacks[";".join(reversed(labels))] += 1
+            time.sleep(interval)
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+    finally:
+        _session_lock.release()
+
+class ProfileSession:
+    """cProfile results of the next `count` calls of one route, merged into one pstats.Stats."""
+
+    def __init__(self, path: str, count: int):
+        self.path = path
+        self.count = min(count, PROFILE_MAX_REQUESTS)
+        self.stats = None
+        self.calls = 0
+        self.skipped = 0
+        self.elapsed = []
+        self.done = asyncio.Event()
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def collect(self, profile: cProfile.Profile, started: float):
+        with self._lock:
+            if self.calls >= self.count:
+                return
+            self.calls += 1
+            self.elapsed.append(time.perf_counter() - started)
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+            if self.calls >= self.count:
+                self._loop.call_soon_threadsafe(self.done.set)
+
+    def skip(self):
+        with self._lock:
+            self.skipped += 1
+
+    async def run(self, timeout: float) -> bool:
+        """Arms the route and waits for `count` calls; False when the timeout hit first."""
+        global _active
+        if not _session_lock.acquire(blocking=False):
+            raise ProfilerBusy("Đang có một phiên profiling khác")
+        try:
+            self._loop = asyncio.get_running_loop()
+            _active = self
+            try:
+                await asyncio.wait_for(self.done.wait(), min(timeout, PROFILE_MAX_SECONDS))
+                return True
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                _active = None
+        finally:
+            _session_lock.release()
+
+    def as_text(self, limit: int = 60) -> str:
+        out = io.StringIO()
+        out.write(f"{self.path}: {self.calls} request(s), "
+                  f"{', '.join(f'{e * 1000:.1f} ms' for e in self.elapsed)}")
+        if self.skipped:
+            out.write(f" ({self.skipped} overlapping request(s) not profiled)")
+        out.write("\n\n")
+        if self.stats is not None:
+            self.stats.stream = out
+            self.stats.sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+    def as_pstats(self) -> bytes:
+        """Binary pstats dump (open with `python -m pstats` or snakeviz)."""
+        if self.stats is None:
+            return b""
+        with tempfile.NamedTemporaryFile(suffix=".pstats", delete=False) as f:
+            path = f.name
+        try:
+            self.stats.dump_stats(path)
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            os.unlink(path)
+
+_active = None
+profiled_paths = set()
+# A thread has one profiler hook: a second cProfile enabled on the same thread (concurrent
+# armed async requests on the event loop) would replace the first. One profiled call per thread.
+_profiling = threading.local()
+
+def _armed(path: str):
+    session = _active
+    if session is None or session.path != path:
+        return None
+    if getattr(_profiling, "busy", False):
+        session.skip()
+        return None
+    return session
+
+def _profiled(path: str, endpoint):
+    """
+    Wraps an endpoint so an armed ProfileSession can cProfile it in the thread that
+    actually runs it (sync endpoints run in the threadpool). Inactive cost: one global
+    read per request. For async endpoints the numbers include other coroutines that ran
+    on the loop in between; calls arriving while one is profiled on the same thread run
+    unprofiled and are counted as skipped.
+    """
+    def start():
+        _profiling.busy = True
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile, time.perf_counter()
+
+    def stop(session, profile, started):
+        profile.disable()
+        _profiling.busy = False
+        session.collect(profile, started)
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            session = _armed(path)
+            if session is None:
+                return await endpoint(*args, **kwargs)
+            profile, started = start()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                stop(session, profile, started)
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            session = _armed(path)
+            if session is None:
+                return endpoint(*args, **kwargs)
+            profile, started = start()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                stop(session, profile, started)
+    return wrapper
+
+class ProfiledRoute(APIRoute):
+    """route_class for APIRouter: makes every route of the router profilable by path."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        profiled_paths.add(path)
+        super().__init__(path, _profiled(path, endpoint), **kwargs)
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+# "memory" = per worker; "sqlite" = counters shared by all workers on the host
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", "ratelimit.sqlite3")
+
+class Rule(NamedTuple):
+    limit: int
+    window_seconds: float
+
+# Routes that run full queries on every call. Keyed by session user (or client IP when logged out).
+RATE_LIMITS: Dict[Tuple[str, str], Rule] = {
+    ("POST", "/api/login"): Rule(10, 60),
+    ("GET", "/api/find_tutor"): Rule(30, 60),
+    ("GET", "/api/subject_materials"): Rule(30, 60),
+    ("GET", "/api/student/slots"): Rule(60, 60),
+    ("GET", "/api/student/free_time"): Rule(30, 60),
+    ("GET", "/api/student/free_time/window"): Rule(30, 60),
+    ("GET", "/api/student/bookings/export"): Rule(5, 60),
+    ("GET", "/api/tutor/requests/export"): Rule(5, 60),
+    ("GET", "/api/coordinator/export/bookings"): Rule(5, 60),
+    ("GET", "/api/coordinator/export/registrations"): Rule(5, 60),
+}
+
+class MemoryRateStore:
+    """Fixed-window counters in a dict; old windows are dropped as time moves on."""
+    blocking = False
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def hit(self, key: str, window: int, window_seconds: float) -> Tuple[int, int]:
+        """Counts one call in `window`; returns (previous window count, current count)."""
+        with self._lock:
+            current = self._counts[(key, window)] = self._counts.get((key, window), 0) + 1
+            previous = self._counts.get((key, window - 1), 0)
+            now = time.monotonic()
+            if now - self._last_sweep > window_seconds:
+                self._counts = {k: v for k, v in self._counts.items() if k[1] >= window - 1}
+                self._last_sweep = now
+            return previous, current
+
+class SQLiteRateStore:
+    """
+    Same counters in a local SQLite (WAL) file, so every worker on the host sees the
+    same numbers. One short write transaction per limited call; it may wait on another
+    worker's lock, so the middleware runs it off the event loop.
+    """
+    blocking = True
+
+    def __init__(self, path: str = RATE_LIMIT_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS hits (key TEXT, window INTEGER, count INTEGER, "
+                         "PRIMARY KEY (key, window)) WITHOUT ROWID")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key: str, window: int, window_seconds: float) -> Tuple[int, int]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT INTO hits VALUES (?, ?, 1) ON CONFLICT (key, window) DO UPDATE SET count = count + 1",
+                         (key, window))
+            rows = dict(conn.execute("SELECT window, count FROM hits WHERE key = ? AND window >= ?",
+                                     (key, window - 1)).fetchall())
+            # Dọn cửa sổ cũ của key này luôn trong cùng transaction
+            conn.execute("DELETE FROM hits WHERE key = ? AND window < ?", (key, window - 1))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return rows.get(window - 1, 0), rows.get(window, 0)
+
+class RateLimiter:
+    """
+    Sliding-window limit: the previous fixed window counts in proportion to how much of
+    it still overlaps the last `window_seconds`, so bursts across a window edge are
+    still limited.
+    """
+
+    def __init__(self, rules=RATE_LIMITS, store=None, enabled: bool = RATE_LIMIT_ENABLED):
+        self.rules = rules
+        self.store = store or (SQLiteRateStore() if RATE_LIMIT_BACKEND == "sqlite" else MemoryRateStore())
+        self.enabled = enabled
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def limited(self, method: str, path: str) -> bool:
+        return self.enabled and (method, path) in self.rules
+
+    def check(self, method: str, path: str, client: str) -> Optional[float]:
+        """None when the call is allowed, otherwise the seconds to wait (Retry-After)."""
+        rule = self.rules.get((method, path))
+        if rule is None or not self.enabled:
+            return None
+        now = time.time()
+        window = int(now // rule.window_seconds)
+        try:
+            previous, current = self.store.hit(f"{client}|{method} {path}", window, rule.window_seconds)
+        except sqlite3.Error:
+            # File đếm bị khóa/hỏng: cho request đi qua, không biến rate limiter thành lỗi 500
+            logger.exception("Rate limit store failed (%s %s)", method, path)
+            self._count(path, "store_errors")
+            return None
+        elapsed = now / rule.window_seconds - window
+        weighted = previous * (1 - elapsed) + current
+        allowed = weighted <= rule.limit
+        self._count(path, "allowed" if allowed else "throttled")
+        if allowed:
+            return None
+        return self._retry_after(rule, previous, current, elapsed)
+
+    @staticmethod
+    def _retry_after(rule: Rule, previous: int, current: int, elapsed: float) -> float:
+        """
+        Seconds until one more call fits. Rejected calls are counted too, and so will the
+        retry: within this window it needs previous * (1 - e) + current + 1 <= limit; in the
+        next one, where `current` becomes the previous window, current * (1 - e) + 1 <= limit.
+        """
+        to_next = (1 - elapsed) * rule.window_seconds
+        if previous and current + 1 <= rule.limit:
+            # Chờ tới khi phần cửa sổ trước còn tính giảm đủ
+            wait = (1 - elapsed - (rule.limit - current - 1) / previous) * rule.window_seconds
+            if wait < to_next:
+                return max(wait, 0.0)
+        return to_next + max(0.0, 1 - (rule.limit - 1) / current) * rule.window_seconds
+
+    def _count(self, path: str, name: str):
+        with self._lock:
+            route = self._stats.setdefault(path, {"allowed": 0, "throttled": 0, "store_errors": 0})
+            route[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": type(self.store).__name__, "routes": {k: dict(v) for k, v in self._stats.items()}}
+
+rate_limiter = RateLimiter()
+
+class RateLimitMiddleware:
+    """Answers 429 + Retry-After before the route runs. Must sit inside SessionMiddleware."""
+
+    def __init__(self, app, limiter: RateLimiter = rate_limiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        method, path = scope["method"], scope["path"]
+        if not self.limiter.limited(method, path):
+            return await self.app(scope, receive, send)
+        user = (scope.get("session") or {}).get("user") or {}
+        client = f"user:{user['id']}" if user.get("id") is not None else f"ip:{(scope.get('client') or ('-',))[0]}"
+        if self.limiter.store.blocking:
+            retry_after = await asyncio.to_thread(self.limiter.check, method, path, client)
+        else:
+            retry_after = self.limiter.check(method, path, client)
+        if retry_after is None:
+            return await self.app(scope, receive, send)
+        seconds = max(1, math.ceil(retry_after))
+        body = json.dumps({"detail": f"Quá nhiều yêu cầu, vui lòng thử lại sau {seconds} giây"},
+                          ensure_ascii=False).encode()
+        await send({"type": "http.response.start", "status": 429, "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(seconds).encode()),
+        ]})
+        await send({"type": "http.response.body", "body": body})
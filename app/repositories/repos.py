@@ -1,5 +1,8 @@
-from sqlalchemy.orm import Session, joinedload
-from app.models import User, Program, Registration, TimeSlot, Appointment, BookingRequest
+from sqlalchemy.orm import Session, joinedload, aliased
+from sqlalchemy import func, or_, and_, exists, case, cast, select, text, Integer
+from sqlalchemy.exc import IntegrityError
+from app.database import replica_read
+from app.models import User, Program, Registration, TimeSlot, Appointment, BookingRequest, FeedVersion, TutorRequest, AuditLog
 from typing import List, Optional
 from datetime import datetime
 
@@ -8,15 +11,71 @@ class UserRepository:
         self.db = db
     def get_by_mssv(self, mssv: str) -> Optional[User]:
         return self.db.query(User).filter(User.mssv == mssv).first()
+    @replica_read
     def get_all(self):
         return self.db.query(User).all()
+    @replica_read
+    def list_users(self, role: Optional[str] = None, mssv_prefix: Optional[str] = None,
+                   sort: str = "id", desc: bool = False, after: Optional[tuple] = None, limit: int = 50):
+        """Keyset-paginated user listing. Only light columns are selected (never password).
+        `after` is the (sort_value, id) of the last row of the previous page; sort_value may be
+        None: NULLs sort after every value (before them when desc)."""
+        sort_col = {"id": User.id, "mssv": User.mssv, "ho_ten": User.ho_ten}[sort]
+        is_null = sort_col.is_(None)
+        q = self.db.query(User.id, User.mssv, User.ho_ten, User.role)
+        if role:
+            q = q.filter(User.role == role)
+        if mssv_prefix:
+            escaped = mssv_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            q = q.filter(User.mssv.like(escaped + "%", escape="\\"))
+        if after is not None:
+            last_value, last_id = after
+            if desc:
+                if last_value is None:
+                    q = q.filter(or_(and_(is_null, User.id < last_id), sort_col.isnot(None)))
+                else:
+                    q = q.filter(or_(sort_col < last_value, and_(sort_col == last_value, User.id < last_id)))
+            else:
+                if last_value is None:
+                    q = q.filter(is_null, User.id > last_id)
+                else:
+                    q = q.filter(or_(sort_col > last_value, and_(sort_col == last_value, User.id > last_id), is_null))
+        if desc:
+            q = q.order_by(is_null.desc(), sort_col.desc(), User.id.desc())
+        else:
+            q = q.order_by(is_null.asc(), sort_col.asc(), User.id.asc())
+        return q.limit(limit).all()
+
+    @replica_read
+    def count_by_role(self) -> dict:
+        return dict(self.db.query(User.role, func.count(User.id)).group_by(User.role).all())
+
+    @replica_read
+    def get_names(self, user_ids) -> dict:
+        if not user_ids:
+            return {}
+        return dict(self.db.query(User.id, User.ho_ten).filter(User.id.in_(list(user_ids))).all())
+
+    def get_sync_rows(self, mssvs) -> List[tuple]:
+        return self.db.query(User.id, User.mssv, User.ho_ten, User.role).filter(User.mssv.in_(list(mssvs))).all()
+
+    def apply_sync_batch(self, updates: List[dict], inserts: List[dict]):
+        """Batched upsert: executemany UPDATE by primary key + executemany INSERT, one short transaction."""
+        if updates:
+            self.db.bulk_update_mappings(User, updates)
+        if inserts:
+            self.db.bulk_insert_mappings(User, inserts)
+        self.db.commit()
+
     # NEW: Get all tutors
+    @replica_read
     def get_all_tutors(self) -> List[User]:
         return self.db.query(User).filter(User.role == 'tutor').all()
 
 class ProgramRepository:
     def __init__(self, db: Session):
         self.db = db
+    @replica_read
     def get_open_programs(self) -> List[Program]:
         return self.db.query(Program).filter(Program.status == 'open').order_by(Program.id.desc()).all()
     
@@ -27,54 +86,293 @@ class ProgramRepository:
         self.db.add(reg)
         self.db.commit()
         return reg
+
+    def register_students(self, pairs: List[tuple]) -> List[Optional[str]]:
+        """Registers many (student_id, program_id) pairs in one transaction.
+        Returns one error message per pair (None when registered)."""
+        student_ids = {s for s, _ in pairs}
+        program_ids = {p for _, p in pairs}
+        existing = set(
+            self.db.query(Registration.student_id, Registration.program_id)
+            .filter(Registration.student_id.in_(student_ids), Registration.program_id.in_(program_ids))
+            .all()
+        )
+        errors = []
+        for student_id, program_id in pairs:
+            if (student_id, program_id) in existing:
+                errors.append("Bạn đã đăng ký chương trình này rồi")
+                continue
+            existing.add((student_id, program_id))
+            self.db.add(Registration(student_id=student_id, program_id=program_id))
+            errors.append(None)
+        self.db.commit()
+        return errors
     
+    def iter_registrations(self, program_id: Optional[int] = None, semester: Optional[str] = None,
+                           chunk_size: int = 1000):
+        """Streams registration rows through a server-side cursor, chunk_size at a time."""
+        q = (
+            self.db.query(
+                Registration.id, Program.id.label("program_id"), Program.name.label("program_name"),
+                Program.semester, User.mssv, User.ho_ten
+            )
+            .join(Program, Registration.program_id == Program.id)
+            .join(User, Registration.student_id == User.id)
+        )
+        if program_id is not None:
+            q = q.filter(Program.id == program_id)
+        if semester:
+            q = q.filter(Program.semester == semester)
+        q = q.order_by(Registration.id).execution_options(stream_results=True, yield_per=chunk_size)
+        yield from q
+
     def create_program(self, name: str, semester: str):
         prog = Program(name=name, semester=semester, status='open')
         self.db.add(prog)
         self.db.commit()
         return prog
 
+class FeedVersionRepository:
+    """Version counters behind the calendar ETags. bump() does not commit:
+    it rides on the transaction of the write that changed the feed."""
+    TUTOR_SLOTS = "tutor_slots"
+    STUDENT_BOOKINGS = "student_bookings"
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def bump(self, scope: str, owner_id: int):
+        updated = (
+            self.db.query(FeedVersion)
+            .filter(FeedVersion.scope == scope, FeedVersion.owner_id == owner_id)
+            .update({FeedVersion.version: FeedVersion.version + 1}, synchronize_session=False)
+        )
+        if updated:
+            return
+        try:
+            with self.db.begin_nested():
+                self.db.add(FeedVersion(scope=scope, owner_id=owner_id, version=1))
+        except IntegrityError:
+            # Worker khác vừa tạo dòng này
+            self.bump(scope, owner_id)
+
+    @replica_read
+    def get(self, scope: str, owner_id: int) -> int:
+        version = (
+            self.db.query(FeedVersion.version)
+            .filter(FeedVersion.scope == scope, FeedVersion.owner_id == owner_id)
+            .scalar()
+        )
+        return version or 0
+
 class ScheduleRepository:
     def __init__(self, db: Session):
         self.db = db
+        self.versions = FeedVersionRepository(db)
+    @replica_read
     def get_slots_by_tutor(self, tutor_id: int) -> List[TimeSlot]:
-        return self.db.query(TimeSlot).filter(TimeSlot.tutor_id == tutor_id).all()
+        return self.db.query(TimeSlot).filter(TimeSlot.tutor_id == tutor_id, TimeSlot.is_closed == False).all()
     
+    @replica_read
+    def get_open_slot_times(self, tutor_ids: List[int], after: datetime):
+        return (
+            self.db.query(TimeSlot.tutor_id, TimeSlot.start_time, TimeSlot.end_time)
+            .filter(
+                TimeSlot.tutor_id.in_(tutor_ids),
+                TimeSlot.is_closed == False,
+                TimeSlot.is_booked == False,
+                TimeSlot.start_time > after
+            )
+            .all()
+        )
+
     def get_slot_by_id(self, slot_id: int):
         return self.db.query(TimeSlot).filter(TimeSlot.id == slot_id).first()
 
     def create_slot(self, tutor_id: int, start_time: datetime, end_time: datetime):
         slot = TimeSlot(tutor_id=tutor_id, start_time=start_time, end_time=end_time)
         self.db.add(slot)
+        self.versions.bump(FeedVersionRepository.TUTOR_SLOTS, tutor_id)
         self.db.commit()
         return slot
 
     def delete_slot(self, tutor_id: int, start_time: datetime):
         self.db.query(TimeSlot).filter(TimeSlot.tutor_id == tutor_id, TimeSlot.start_time == start_time).delete()
+        self.versions.bump(FeedVersionRepository.TUTOR_SLOTS, tutor_id)
         self.db.commit()
 
     def mark_booked(self, slot_id: int):
         slot = self.get_slot_by_id(slot_id)
         if slot:
             slot.is_booked = True
+            self.versions.bump(FeedVersionRepository.TUTOR_SLOTS, slot.tutor_id)
             self.db.commit()
 
+    def get_booked_slot_ids(self, slot_ids) -> set:
+        if not slot_ids:
+            return set()
+        rows = self.db.query(TimeSlot.id).filter(TimeSlot.id.in_(list(slot_ids)), TimeSlot.is_booked == True).all()
+        return {r.id for r in rows}
+
+    def get_closable_slots(self, ended_before: datetime, limit: int):
+        """Unbooked, still open slots that ended before the cutoff."""
+        return (
+            self.db.query(TimeSlot.id, TimeSlot.tutor_id)
+            .filter(
+                TimeSlot.is_booked == False,
+                TimeSlot.is_closed == False,
+                TimeSlot.end_time < ended_before
+            )
+            .order_by(TimeSlot.id)
+            .limit(limit)
+            .all()
+        )
+
+    def close_slots(self, rows):
+        """rows: (id, tutor_id) from get_closable_slots. Rows are kept: analytics
+        counts them as offered hours."""
+        self.db.query(TimeSlot).filter(
+            TimeSlot.id.in_([r.id for r in rows]),
+            TimeSlot.is_booked == False
+        ).update({TimeSlot.is_closed: True}, synchronize_session=False)
+        for tutor_id in sorted({r.tutor_id for r in rows}):
+            self.versions.bump(FeedVersionRepository.TUTOR_SLOTS, tutor_id)
+        self.db.commit()
+
     def create_appointment(self, student_id: int, slot_id: int):
         appt = Appointment(student_id=student_id, slot_id=slot_id)
         self.db.add(appt)
         self.db.commit()
         return appt
 
+class AnalyticsRepository:
+    """
+    Single-pass aggregates for the coordinator analytics. `window` is an optional
+    [start, end) from SemesterDomain.window; `after` arguments fetch only the rows
+    added since the previous refresh.
+    """
+    def __init__(self, db: Session):
+        self.db = db
+
+    # Biểu thức ngày giờ khác nhau giữa MySQL và SQLite (tests/ và môi trường dev chạy SQLite)
+    def _dialect(self) -> str:
+        return self.db.get_bind().dialect.name
+
+    def _seconds(self, start, end):
+        if self._dialect() == "sqlite":
+            return (func.julianday(end) - func.julianday(start)) * 86400
+        return func.timestampdiff(text("SECOND"), start, end)
+
+    def _weekday_hour(self, col):
+        """(0 = Monday .. 6, hour 0..23)"""
+        if self._dialect() == "sqlite":
+            return ((cast(func.strftime("%w", col), Integer) + 6) % 7,
+                    cast(func.strftime("%H", col), Integer))
+        return func.weekday(col), func.hour(col)
+
+    @staticmethod
+    def _in_window(q, col, window):
+        if window:
+            q = q.filter(col >= window[0], col < window[1])
+        return q
+
+    @replica_read
+    def watermarks(self) -> dict:
+        """Cheap change markers for every section, in one round trip."""
+        row = self.db.execute(select(
+            select(func.count(Program.id)).scalar_subquery().label("programs"),
+            # Mở/đóng program không đổi số dòng: đếm + tổng id các program đang mở
+            select(func.count(Program.id)).where(Program.status == 'open').scalar_subquery().label("programs_open"),
+            select(func.coalesce(func.sum(Program.id), 0)).where(Program.status == 'open')
+                .scalar_subquery().label("programs_open_ids"),
+            select(func.count(Registration.id)).scalar_subquery().label("registrations"),
+            select(func.coalesce(func.max(Registration.id), 0)).scalar_subquery().label("registration_max_id"),
+            select(func.coalesce(func.sum(FeedVersion.version), 0))
+                .where(FeedVersion.scope == FeedVersionRepository.TUTOR_SLOTS).scalar_subquery().label("slot_version"),
+            select(func.count(BookingRequest.id)).scalar_subquery().label("bookings"),
+            select(func.coalesce(func.max(BookingRequest.id), 0)).scalar_subquery().label("booking_max_id"),
+            select(func.count(TutorRequest.id)).where(TutorRequest.responded_at.isnot(None))
+                .scalar_subquery().label("responded"),
+            select(func.max(TutorRequest.responded_at)).scalar_subquery().label("responded_max_at"),
+        )).mappings().one()
+        return dict(row)
+
+    @replica_read
+    def program_registrations(self, semester: Optional[str] = None, after_id: int = 0):
+        """(program_id, name, status, registrations) per program of the semester."""
+        q = (
+            self.db.query(Program.id, Program.name, Program.status, func.count(Registration.id))
+            .outerjoin(Registration, and_(Registration.program_id == Program.id, Registration.id > after_id))
+            .group_by(Program.id, Program.name, Program.status)
+            .order_by(Program.id)
+        )
+        if semester:
+            q = q.filter(Program.semester == semester)
+        return q.all()
+
+    @replica_read
+    def tutor_slot_hours(self, window=None):
+        """(tutor_id, ho_ten, offered_seconds, booked_seconds) over the window."""
+        seconds = self._seconds(TimeSlot.start_time, TimeSlot.end_time)
+        q = (
+            self.db.query(
+                TimeSlot.tutor_id, User.ho_ten,
+                func.sum(seconds), func.sum(case((TimeSlot.is_booked == True, seconds), else_=0))
+            )
+            .join(User, TimeSlot.tutor_id == User.id)
+            .group_by(TimeSlot.tutor_id, User.ho_ten)
+            .order_by(TimeSlot.tutor_id)
+        )
+        return self._in_window(q, TimeSlot.start_time, window).all()
+
+    @replica_read
+    def response_latencies(self, window=None, responded_after: Optional[datetime] = None):
+        """(status, seconds) for every answered tutor request requested in the window."""
+        q = self.db.query(TutorRequest.status, self._seconds(TutorRequest.requested_at, TutorRequest.responded_at))
+        q = q.filter(TutorRequest.responded_at.isnot(None))
+        if responded_after is not None:
+            q = q.filter(TutorRequest.responded_at > responded_after)
+        return self._in_window(q, TutorRequest.requested_at, window).all()
+
+    @replica_read
+    def demand_by_hour(self, window=None, after_id: int = 0):
+        """(weekday, hour, requests) of booking requests by slot start."""
+        weekday, hour = self._weekday_hour(TimeSlot.start_time)
+        q = (
+            self.db.query(weekday, hour, func.count(BookingRequest.id))
+            .join(TimeSlot, BookingRequest.slot_id == TimeSlot.id)
+            .filter(BookingRequest.id > after_id)
+            .group_by(weekday, hour)
+        )
+        return self._in_window(q, TimeSlot.start_time, window).all()
+
 class SystemRepository:
     def __init__(self, db: Session):
         self.db = db
-    def get_logs(self): return []
+
+    @replica_read
+    def get_logs(self, action: Optional[str] = None, actor_id: Optional[int] = None,
+                 before_id: Optional[int] = None, limit: int = 50) -> List[AuditLog]:
+        """Newest first, keyset-paginated on id (uses the (action, id) / (actor_id, id) indexes)."""
+        q = self.db.query(AuditLog)
+        if action:
+            q = q.filter(AuditLog.action == action)
+        if actor_id is not None:
+            q = q.filter(AuditLog.actor_id == actor_id)
+        if before_id is not None:
+            q = q.filter(AuditLog.id < before_id)
+        return q.order_by(AuditLog.id.desc()).limit(limit).all()
+
+    def append_logs(self, rows: List[dict]):
+        self.db.bulk_insert_mappings(AuditLog, rows)
+        self.db.commit()
 
 
 
 class BookingRepository:
     def __init__(self, db: Session):
         self.db = db
+        self.versions = FeedVersionRepository(db)
 
     def create_request(self, student_id, tutor_id, slot_id, note):
         req = BookingRequest(
@@ -85,10 +383,12 @@ class BookingRepository:
             status="pending"
         )
         self.db.add(req)
+        self.versions.bump(FeedVersionRepository.STUDENT_BOOKINGS, student_id)
         self.db.commit()
         self.db.refresh(req)
         return req
     
+    @replica_read
     def get_pending_requests(self, tutor_id: int):
         return (
             self.db.query(BookingRequest)
@@ -104,6 +404,7 @@ class BookingRepository:
             .all()
         )
     
+    @replica_read
     def get_upcoming_sessions(self, tutor_id: int):
         return (
             self.db.query(BookingRequest)
@@ -115,12 +416,28 @@ class BookingRepository:
             .filter(
                 BookingRequest.tutor_id == tutor_id,
                 BookingRequest.status == "accepted",
-                TimeSlot.start_time >= datetime.now() 
+                TimeSlot.is_closed == False,
+                TimeSlot.start_time >= datetime.now()
             )
             .order_by(TimeSlot.start_time.asc())
             .all()
         )
 
+    @replica_read
+    def get_busy_times(self, student_id: int, after: datetime):
+        """Start/end of the student's pending and accepted sessions."""
+        return (
+            self.db.query(TimeSlot.start_time, TimeSlot.end_time)
+            .join(BookingRequest, BookingRequest.slot_id == TimeSlot.id)
+            .filter(
+                BookingRequest.student_id == student_id,
+                BookingRequest.status.in_(["pending", "accepted"]),
+                TimeSlot.end_time > after
+            )
+            .all()
+        )
+
+    @replica_read
     def get_by_tutor(self, tutor_id):
         return (
             self.db.query(BookingRequest)
@@ -133,6 +450,7 @@ class BookingRepository:
             .all()
         )
 
+    @replica_read
     def get_by_student(self, student_id):
         return (
             self.db.query(BookingRequest)
@@ -156,15 +474,209 @@ class BookingRepository:
                 slot = self.db.query(TimeSlot).filter(TimeSlot.id == req.slot_id).first()
                 if slot:
                     slot.is_booked = True
+                    self.versions.bump(FeedVersionRepository.TUTOR_SLOTS, slot.tutor_id)
+            self.versions.bump(FeedVersionRepository.STUDENT_BOOKINGS, req.student_id)
             self.db.commit()
             self.db.refresh(req)
             return req
         return None
 
-    def delete_request(self, req_id, student_id):
+    def get_pending_slot_starts(self, after: datetime) -> List[datetime]:
+        rows = (
+            self.db.query(TimeSlot.start_time)
+            .join(BookingRequest, BookingRequest.slot_id == TimeSlot.id)
+            .filter(BookingRequest.status == "pending", TimeSlot.start_time > after)
+            .distinct()
+            .all()
+        )
+        return [r.start_time for r in rows]
+
+    def get_stale_pending(self, now: datetime, limit: int, exclude_ids=()):
+        """Pending requests whose slot has already started."""
+        q = (
+            self.db.query(BookingRequest.id, BookingRequest.student_id)
+            .join(TimeSlot, BookingRequest.slot_id == TimeSlot.id)
+            .filter(BookingRequest.status == "pending", TimeSlot.start_time <= now)
+        )
+        if exclude_ids:
+            q = q.filter(BookingRequest.id.notin_(list(exclude_ids)))
+        return q.order_by(BookingRequest.id).limit(limit).all()
+
+    def iter_history(self, student_id: Optional[int] = None, tutor_id: Optional[int] = None,
+                     program_id: Optional[int] = None, semester: Optional[str] = None,
+                     start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     chunk_size: int = 1000):
+        """
+        Streams booking history (light columns only) through a server-side cursor.
+        Bookings have no program of their own: program/semester keep the students
+        registered in a matching program. start/end filter on the slot start.
+        """
+        student = aliased(User)
+        tutor = aliased(User)
+        q = (
+            self.db.query(
+                BookingRequest.id, BookingRequest.status, BookingRequest.note, BookingRequest.created_at,
+                student.mssv.label("student_mssv"), student.ho_ten.label("student_name"),
+                tutor.mssv.label("tutor_mssv"), tutor.ho_ten.label("tutor_name"),
+                TimeSlot.start_time, TimeSlot.end_time
+            )
+            .join(TimeSlot, BookingRequest.slot_id == TimeSlot.id)
+            .join(student, BookingRequest.student_id == student.id)
+            .join(tutor, BookingRequest.tutor_id == tutor.id)
+        )
+        if student_id is not None:
+            q = q.filter(BookingRequest.student_id == student_id)
+        if tutor_id is not None:
+            q = q.filter(BookingRequest.tutor_id == tutor_id)
+        if program_id is not None or semester:
+            reg = self.db.query(Registration.id).join(Program, Registration.program_id == Program.id).filter(
+                Registration.student_id == BookingRequest.student_id
+            )
+            if program_id is not None:
+                reg = reg.filter(Program.id == program_id)
+            if semester:
+                reg = reg.filter(Program.semester == semester)
+            q = q.filter(reg.exists())
+        if start is not None:
+            q = q.filter(TimeSlot.start_time >= start)
+        if end is not None:
+            q = q.filter(TimeSlot.start_time < end)
+        q = q.order_by(BookingRequest.id).execution_options(stream_results=True, yield_per=chunk_size)
+        yield from q
+
+    def reject_requests(self, rows):
+        """rows: (id, student_id). Set-based reject of still-pending requests."""
+        self.db.query(BookingRequest).filter(
+            BookingRequest.id.in_([r.id for r in rows]),
+            BookingRequest.status == "pending"
+        ).update({BookingRequest.status: "rejected"}, synchronize_session=False)
+        for student_id in sorted({r.student_id for r in rows}):
+            self.versions.bump(FeedVersionRepository.STUDENT_BOOKINGS, student_id)
+        self.db.commit()
+
+    def _session_rows(self):
+        student = aliased(User)
+        tutor = aliased(User)
+        return (
+            self.db.query(
+                BookingRequest.id, BookingRequest.student_id, BookingRequest.tutor_id,
+                student.ho_ten.label("student_name"), tutor.ho_ten.label("tutor_name"),
+                TimeSlot.start_time, TimeSlot.end_time
+            )
+            .join(TimeSlot, BookingRequest.slot_id == TimeSlot.id)
+            .join(student, BookingRequest.student_id == student.id)
+            .join(tutor, BookingRequest.tutor_id == tutor.id)
+            .filter(BookingRequest.status == "accepted")
+        )
+
+    def get_sessions_to_remind(self, start: datetime, end: datetime):
+        """Accepted sessions starting in [start, end) that have not been reminded."""
+        return (
+            self._session_rows()
+            .filter(
+                BookingRequest.reminder_token.is_(None),
+                TimeSlot.is_closed == False,
+                TimeSlot.start_time >= start,
+                TimeSlot.start_time < end
+            )
+            .order_by(TimeSlot.start_time)
+            .all()
+        )
+
+    def get_sessions_by_ids(self, req_ids):
+        return self._session_rows().filter(BookingRequest.id.in_(list(req_ids))).all()
+
+    def claim_reminders(self, req_ids, token: str) -> set:
+        """Marks the reminders as sent by `token`; returns the ids this caller won
+        (another worker may already have claimed some)."""
         self.db.query(BookingRequest).filter(
+            BookingRequest.id.in_(list(req_ids)),
+            BookingRequest.status == "accepted",
+            BookingRequest.reminder_token.is_(None)
+        ).update({BookingRequest.reminder_token: token}, synchronize_session=False)
+        self.db.commit()
+        rows = self.db.query(BookingRequest.id).filter(
+            BookingRequest.id.in_(list(req_ids)),
+            BookingRequest.reminder_token == token
+        ).all()
+        return {r.id for r in rows}
+
+    def get_pending_by_ids(self, tutor_id: int, req_ids):
+        return (
+            self.db.query(BookingRequest.id, BookingRequest.slot_id, BookingRequest.student_id)
+            .filter(
+                BookingRequest.id.in_(list(req_ids)),
+                BookingRequest.tutor_id == tutor_id,
+                BookingRequest.status == "pending"
+            )
+            .all()
+        )
+
+    def get_competing(self, accept_ids: List[int], exclude_ids=()):
+        """(id, student_id) of the other pending requests for the slots of `accept_ids`."""
+        if not accept_ids:
+            return []
+        slot_ids = select(BookingRequest.slot_id).where(BookingRequest.id.in_(accept_ids))
+        return (
+            self.db.query(BookingRequest.id, BookingRequest.student_id)
+            .filter(
+                BookingRequest.slot_id.in_(slot_ids),
+                BookingRequest.status == "pending",
+                BookingRequest.id.notin_(list(accept_ids) + list(exclude_ids))
+            )
+            .order_by(BookingRequest.id)
+            .all()
+        )
+
+    def bulk_update_status(self, tutor_id: int, accept_ids: List[int], reject_ids: List[int],
+                           reject_competitors: bool = True) -> List[int]:
+        """Applies many decisions in one transaction with set-based UPDATEs.
+        Other pending requests for the accepted slots are rejected too (unless
+        reject_competitors=False); their ids are returned. May raise IntegrityError
+        (unique_slot_booking) on commit."""
+        accepted = (
+            self.db.query(BookingRequest.slot_id, BookingRequest.student_id)
+            .filter(BookingRequest.id.in_(accept_ids))
+            .all()
+        ) if accept_ids else []
+        accepted_slot_ids = [r.slot_id for r in accepted]
+        competing = self.get_competing(accept_ids, reject_ids) if reject_competitors else []
+        rejected_students = (
+            self.db.query(BookingRequest.student_id)
+            .filter(BookingRequest.id.in_(reject_ids))
+            .all()
+        ) if reject_ids else []
+
+        if accept_ids:
+            self.db.query(BookingRequest).filter(
+                BookingRequest.id.in_(accept_ids),
+                BookingRequest.tutor_id == tutor_id,
+                BookingRequest.status == "pending"
+            ).update({BookingRequest.status: "accepted"}, synchronize_session=False)
+            self.db.query(TimeSlot).filter(TimeSlot.id.in_(accepted_slot_ids)).update(
+                {TimeSlot.is_booked: True}, synchronize_session=False
+            )
+            self.versions.bump(FeedVersionRepository.TUTOR_SLOTS, tutor_id)
+        auto_reject_ids = [r.id for r in competing]
+        all_reject_ids = list(reject_ids) + auto_reject_ids
+        if all_reject_ids:
+            self.db.query(BookingRequest).filter(
+                BookingRequest.id.in_(all_reject_ids),
+                BookingRequest.status == "pending"
+            ).update({BookingRequest.status: "rejected"}, synchronize_session=False)
+
+        student_ids = {r.student_id for r in accepted} | {r.student_id for r in competing} | {r.student_id for r in rejected_students}
+        for student_id in sorted(student_ids):
+            self.versions.bump(FeedVersionRepository.STUDENT_BOOKINGS, student_id)
+        self.db.commit()
+        return auto_reject_ids
+
+    def delete_request(self, req_id, student_id) -> int:
+        deleted = self.db.query(BookingRequest).filter(
             BookingRequest.id == req_id,
             BookingRequest.student_id == student_id,
             BookingRequest.status == "pending"
         ).delete()
-        self.db.commit()
\ No newline at end of file
+        self.versions.bump(FeedVersionRepository.STUDENT_BOOKINGS, student_id)
+        self.db.commit()
+        return deleted
\ No newline at end of file
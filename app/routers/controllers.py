@@ -1,16 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 from app.models import TutorRequest, RequestStatus, User
-from app.database import get_db
-from app.services.services import AuthService, ScheduleService, CoordinationService, SysManagementService, MatchingService, BookingService
-import random
-router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
+from app.database import get_db, replicas
+from app.services.services import AuthService, ScheduleService, CoordinationService, SysManagementService, MatchingService, BookingService, AvailabilityService, LibraryService, AnalyticsService
+from app.services.admission import admission_queue, AdmissionQueueFull, ADMISSION_QUEUE_ENABLED
+from app.services.health import health_monitor
+from app.services.slot_cache import tutor_slot_cache
+from app.services.availability import availability_index
+from app.services.scheduler import background_scheduler
+from app.services.reminders import reminder_index
+from app.integration.adapters import IntegrationUnavailable, sso_adapter, datacore_adapter, library_adapter
+from app.services.datacore_sync import datacore_sync
+from app.services.exports import ExportService, EXPORT_FORMATS
+from app.services.analytics import analytics_cache
+from app.services.audit import audit_log
+from app.idempotency import idempotency_store
+from app.ratelimit import rate_limiter
+from app.services.shared_cache import shared_cache
+from app.profiling import sample_stacks, ProfileSession, ProfiledRoute, ProfilerBusy, profiled_paths
+from app.templating import templates
+import asyncio
+import os
+# ProfiledRoute: cho phép admin bật cProfile cho từng route lúc đang chạy
+router = APIRouter(route_class=ProfiledRoute)
 
 # --- Helpers ---
 def get_user_session(request: Request):
@@ -22,6 +38,22 @@ def require_role(request: Request, role: str):
         raise HTTPException(status_code=403, detail="Unauthorized")
     return user
 
+# Calendar feeds: browser always revalidates, server answers 304 when the version is unchanged
+FEED_CACHE_CONTROL = "private, no-cache"
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [t.strip() for t in header.split(",")]
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = FEED_CACHE_CONTROL
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": FEED_CACHE_CONTROL})
+
 # --- Input Models ---
 class LoginRequest(BaseModel):
     mssv: str
@@ -48,9 +80,12 @@ class TutorRespondBooking(BaseModel):
 # --- ROUTES ---
 
 @router.post("/api/login")
-def login(req: LoginRequest, request: Request, db: Session = Depends(get_db)):
+async def login(req: LoginRequest, request: Request, db: Session = Depends(get_db)):
     auth_service = AuthService(db)
-    user = auth_service.login(req.mssv, req.password)
+    try:
+        user = await auth_service.login(req.mssv, req.password)
+    except IntegrationUnavailable:
+        return {"success": False, "message": "Hệ thống SSO đang gián đoạn, vui lòng thử lại sau"}
     if user:
         user_data = {"id": user.id, "ho_ten": user.ho_ten, "role": user.role}
         request.session["user"] = user_data
@@ -70,36 +105,30 @@ def api_find_tutor(request: Request, db: Session = Depends(get_db)):
     user = get_user_session(request)
     if not user: return []
 
-    # 2. Get basic users from DB
+    # 2. Tutor cards (đã serialize sẵn trong shared cache, trả thẳng bytes)
     match_service = MatchingService(db)
-    tutors_db = match_service.search_tutors()
-
-    # 3. Enrich with Mock Data (since DB is simple) for UI display
-    enriched_tutors = []
-    departments = ["Khoa học Máy tính", "Điện - Điện tử", "Cơ khí", "Kỹ thuật Hóa học", "Khoa học Ứng dụng"]
-    subjects_pool = ["Giải tích 1", "Vật lý 1", "Đại số tuyến tính", "Cấu trúc dữ liệu", "Lập trình C++", "Hóa đại cương"]
-
-    for t in tutors_db:
-        enriched_tutors.append({
-            "id": t.id,
-            "name": t.ho_ten,
-            "mssv": t.mssv,
-            # Mock details
-            "department": random.choice(departments),
-            "rating": round(random.uniform(4.0, 5.0), 1),
-            "totalSessions": random.randint(10, 50),
-            "subjects": random.sample(subjects_pool, k=2),
-            "bio": "Sinh viên năm 3 với thành tích học tập xuất sắc. Nhiệt tình hỗ trợ các bạn mất gốc.",
-            "avatar": f"https://api.dicebear.com/7.x/avataaars/svg?seed={t.mssv}" # Random avatar based on MSSV
-        })
-    
-    return enriched_tutors
+    return Response(match_service.get_tutor_cards(), media_type="application/json")
+
+# Tài liệu thư viện cho các môn hiển thị trên thẻ tutor
+@router.get("/api/subject_materials")
+async def subject_materials(request: Request, subjects: List[str] = Query(default=[])):
+    user = get_user_session(request)
+    if not user: return {"materials": {}}
+    return {"materials": await LibraryService().get_materials(subjects)}
 
 class TutorRespondRequest(BaseModel):
     request_id: int
     accept: bool
     reason: str = None  # Bắt buộc nếu từ chối
 
+class TutorRespondRequestBulk(BaseModel):
+    decisions: List[TutorRespondRequest]
+
+class TutorRespondBookingBulk(BaseModel):
+    decisions: List[TutorRespondBooking]
+
+MAX_BULK_DECISIONS = 200
+
 # API: Sinh viên gửi yêu cầu chọn tutor (đã có, chỉ đảm bảo đúng)
 @router.post("/api/select_tutor")
 def api_select_tutor(req: TutorSelectRequest, request: Request, db: Session = Depends(get_db)):
@@ -141,6 +170,25 @@ def respond_request(payload: TutorRespondRequest, request: Request, db: Session
     else:
         return {"success": False, "message": "Yêu cầu không tồn tại hoặc đã được xử lý."}
 
+# API: Tutor phản hồi nhiều yêu cầu cùng lúc
+@router.post("/api/tutor/respond_requests_bulk")
+def respond_requests_bulk(payload: TutorRespondRequestBulk, request: Request, db: Session = Depends(get_db)):
+    user = require_role(request, 'tutor')
+    if len(payload.decisions) > MAX_BULK_DECISIONS:
+        return {"success": False, "message": f"Tối đa {MAX_BULK_DECISIONS} yêu cầu mỗi lần."}
+    for d in payload.decisions:
+        if not d.accept and (not d.reason or d.reason.strip() == ""):
+            return {"success": False, "message": f"Vui lòng nhập lý do từ chối cho yêu cầu #{d.request_id}!"}
+
+    match_service = MatchingService(db)
+    try:
+        result = match_service.respond_to_requests_bulk(
+            user['id'], [(d.request_id, d.accept, d.reason) for d in payload.decisions]
+        )
+    except Exception as e:
+        return {"success": False, "message": str(e)}
+    return {"success": True, **result}
+
 # API: Sinh viên xem trạng thái yêu cầu của mình
 @router.get("/api/my_tutor_requests")
 def get_my_requests(request: Request, db: Session = Depends(get_db)):
@@ -193,6 +241,14 @@ def view_register(request: Request, db: Session = Depends(get_db)):
 @router.post("/api/register_program")
 def register_program(req: ProgramRegRequest, request: Request, db: Session = Depends(get_db)):
     user = require_role(request, 'student')
+    if ADMISSION_QUEUE_ENABLED:
+        # Giờ cao điểm: nhận yêu cầu ngay, xử lý theo lô ở hàng đợi
+        try:
+            ticket = admission_queue.submit(user['id'], req.program_id)
+        except AdmissionQueueFull as e:
+            return {"success": False, "message": str(e)}
+        return {"success": True, "queued": True, "ticket": ticket, "message": "Yêu cầu đăng ký đang được xử lý"}
+
     coord_service = CoordinationService(db)
     try:
         coord_service.register_student_to_program(user['id'], req.program_id)
@@ -200,6 +256,14 @@ def register_program(req: ProgramRegRequest, request: Request, db: Session = Dep
     except Exception as e:
         return {"success": False, "message": str(e)}
 
+@router.get("/api/register_program/status/{ticket}")
+def register_program_status(ticket: str, request: Request):
+    user = require_role(request, 'student')
+    info = admission_queue.status(ticket, user['id'])
+    if not info:
+        raise HTTPException(404, detail="Ticket không tồn tại hoặc đã hết hạn")
+    return info
+
 # --- Tutor Routes ---
 
 @router.get("/tutor/dashboard", response_class=HTMLResponse)
@@ -267,10 +331,14 @@ def view_schedule(request: Request):
     return templates.TemplateResponse("schedule.html", {"request": request, "user": user})
 
 @router.get("/api/get_schedule")
-def get_schedule(request: Request, db: Session = Depends(get_db)):
+def get_schedule(request: Request, response: Response, db: Session = Depends(get_db)):
     user = get_user_session(request)
     if not user: return []
     service = ScheduleService(db)
+    etag = service.get_schedule_etag(user['id'])
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     slots = service.get_tutor_schedule(user['id'])
     
     events = []
@@ -299,6 +367,17 @@ def update_schedule(req: ScheduleRequest, request: Request, db: Session = Depend
     except Exception as e:
         return {"success": False, "message": str(e)}
     
+# --- Health checks (load balancer) ---
+
+@router.get("/health/live")
+async def health_live():
+    return health_monitor.liveness()
+
+@router.get("/health/ready")
+async def health_ready():
+    report = await health_monitor.readiness()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
 @router.get("/sso", response_class=HTMLResponse)
 async def sso_page(request: Request):
     """
@@ -313,7 +392,84 @@ def view_admin(request: Request, db: Session = Depends(get_db)):
     user = get_user_session(request)
     if not user or user['role'] != 'admin': return RedirectResponse("/")
     sys = SysManagementService(db)
-    return templates.TemplateResponse("admin_dashboard.html", {"request": request, "user": user, "users": sys.get_all_users()})
+    page = sys.list_users()
+    return templates.TemplateResponse("admin_dashboard.html", {
+        "request": request,
+        "user": user,
+        "users": page["users"],
+        "next_cursor": page["next_cursor"],
+        "role_counts": sys.get_role_counts()
+    })
+
+@router.get("/api/admin/metrics")
+def admin_metrics(request: Request):
+    require_role(request, 'admin')
+    return {
+        "slot_cache": tutor_slot_cache.stats(),
+        "availability_index": availability_index.stats(),
+        "admission_queue": admission_queue.stats(),
+        "scheduler": background_scheduler.stats(),
+        "reminders": reminder_index.stats(),
+        "sso": sso_adapter.stats(),
+        "datacore": datacore_adapter.stats(),
+        "datacore_sync": datacore_sync.last_run,
+        "library": library_adapter.stats(),
+        "replicas": replicas.snapshot(),
+        "analytics": analytics_cache.stats(),
+        "audit": audit_log.stats(),
+        "idempotency": idempotency_store.snapshot(),
+        "rate_limit": rate_limiter.stats(),
+        "shared_cache": shared_cache.snapshot(),
+    }
+
+# --- Profiling worker đang chạy (admin) ---
+
+@router.post("/api/admin/profile/sample")
+async def admin_profile_sample(request: Request, seconds: float = 5, interval_ms: float = 5, include_idle: bool = False):
+    require_role(request, 'admin')
+    try:
+        stacks = await asyncio.to_thread(sample_stacks, seconds, max(interval_ms, 1) / 1000, include_idle)
+    except ProfilerBusy as e:
+        raise HTTPException(409, detail=str(e))
+    return Response(stacks, media_type="text/plain", headers={
+        "Content-Disposition": f'attachment; filename="worker-{os.getpid()}.collapsed"'
+    })
+
+@router.post("/api/admin/profile/requests")
+async def admin_profile_requests(request: Request, path: str, count: int = 5, timeout: float = 60,
+                                 format: str = "text"):
+    require_role(request, 'admin')
+    if format not in ("text", "pstats"):
+        raise HTTPException(400, detail="format phải là 'text' hoặc 'pstats'")
+    if path not in profiled_paths:
+        raise HTTPException(404, detail=f"Không tìm thấy route {path}")
+    profiler = ProfileSession(path, max(1, count))
+    try:
+        await profiler.run(timeout)
+    except ProfilerBusy as e:
+        raise HTTPException(409, detail=str(e))
+    if format == "pstats":
+        return Response(profiler.as_pstats(), media_type="application/octet-stream", headers={
+            "Content-Disposition": f'attachment; filename="worker-{os.getpid()}.pstats"'
+        })
+    return Response(profiler.as_text(), media_type="text/plain")
+
+@router.get("/api/admin/users")
+def admin_list_users(request: Request, role: Optional[str] = None, mssv: Optional[str] = None,
+                     sort: str = "id", desc: bool = False, cursor: Optional[str] = None,
+                     limit: int = 50, db: Session = Depends(get_db)):
+    require_role(request, 'admin')
+    sys = SysManagementService(db)
+    try:
+        return sys.list_users(role, mssv, sort, desc, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(400, detail=str(e))
+
+@router.get("/api/admin/logs")
+def admin_logs(request: Request, action: Optional[str] = None, actor_id: Optional[int] = None,
+               cursor: Optional[int] = None, limit: int = 50, db: Session = Depends(get_db)):
+    require_role(request, 'admin')
+    return SysManagementService(db).get_logs(action, actor_id, cursor, limit)
 
 @router.get("/coordinator/dashboard", response_class=HTMLResponse)
 def view_coord(request: Request, db: Session = Depends(get_db)):
@@ -322,6 +478,10 @@ def view_coord(request: Request, db: Session = Depends(get_db)):
     coord = CoordinationService(db)
     return templates.TemplateResponse("coordinator_dashboard.html", {"request": request, "user": user, "programs": coord.get_available_programs()})
 
+@router.get("/api/coordinator/analytics")
+def coordinator_analytics(request: Request, semester: Optional[str] = None, db: Session = Depends(get_db)):
+    require_role(request, 'coordinator')
+    return AnalyticsService(db).get_report(semester)
 
 @router.get("/student/schedule", response_class=HTMLResponse)
 def view_student_schedule(request: Request, db: Session = Depends(get_db)):
@@ -353,12 +513,16 @@ def view_student_schedule(request: Request, db: Session = Depends(get_db)):
 
 
 @router.get("/api/student/schedule")
-def student_schedule(request: Request, db: Session = Depends(get_db)):
+def student_schedule(request: Request, response: Response, db: Session = Depends(get_db)):
     user = get_user_session(request)
     if not user or user["role"] != "student":
         raise HTTPException(403)
 
     service = BookingService(db)
+    etag = service.get_student_schedule_etag(user['id'])
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     raw_requests = service.get_student_bookings(user['id']) 
     
     events = []
@@ -392,17 +556,61 @@ def student_schedule(request: Request, db: Session = Depends(get_db)):
 # STUDENT - Lấy lịch rảnh tutor
 # =========================
 @router.get("/api/student/slots")
-def get_slots(request: Request, db: Session = Depends(get_db)):
+def get_slots(request: Request, response: Response, db: Session = Depends(get_db)):
     user = get_user_session(request)
     if not user or user["role"] != "student":
         raise HTTPException(403)
 
     service = BookingService(db)
+    etag = service.get_slots_etag(user["id"])
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     slots = service.get_slots_of_tutors(user["id"])
 
     return {"slots": slots or []}
 
 
+# =========================
+# STUDENT - Tìm giờ rảnh chung với tutor
+# =========================
+def parse_hhmm(value: str) -> int:
+    try:
+        hours, minutes = value.split(":")
+        total = int(hours) * 60 + int(minutes)
+    except ValueError:
+        raise HTTPException(400, detail=f"Giờ không hợp lệ: {value}")
+    if not 0 <= total <= 24 * 60:
+        raise HTTPException(400, detail=f"Giờ không hợp lệ: {value}")
+    return total
+
+@router.get("/api/student/free_time")
+def earliest_free_time(request: Request, duration: int = 60, db: Session = Depends(get_db)):
+    user = get_user_session(request)
+    if not user or user["role"] != "student":
+        raise HTTPException(403)
+    if not 15 <= duration <= 8 * 60:
+        raise HTTPException(400, detail="Thời lượng phải từ 15 đến 480 phút")
+
+    service = AvailabilityService(db)
+    return {"free": service.earliest_common_free(user["id"], duration)}
+
+@router.get("/api/student/free_time/window")
+def free_time_window(request: Request, weekday: int, start: str, end: str, week_offset: int = 0,
+                     db: Session = Depends(get_db)):
+    user = get_user_session(request)
+    if not user or user["role"] != "student":
+        raise HTTPException(403)
+    if not 0 <= weekday <= 6 or not 0 <= week_offset < AvailabilityService.HORIZON_WEEKS:
+        raise HTTPException(400, detail="Ngày hoặc tuần không hợp lệ")
+    start_minute, end_minute = parse_hhmm(start), parse_hhmm(end)
+    if end_minute <= start_minute:
+        raise HTTPException(400, detail="Giờ kết thúc phải sau giờ bắt đầu")
+
+    service = AvailabilityService(db)
+    return service.tutors_free_in_window(user["id"], weekday, start_minute, end_minute, week_offset)
+
+
 # =========================
 # STUDENT - Gửi yêu cầu đặt lịch
 # =========================
@@ -491,3 +699,67 @@ def respond_booking(req: TutorRespondBooking, request: Request, db: Session = De
             
     except Exception as e:
         raise HTTPException(400, detail=str(e))
+
+
+# =========================
+# TUTOR - accept/reject nhiều request đặt lịch
+# =========================
+@router.post("/api/tutor/requests/respond_bulk")
+def respond_booking_bulk(req: TutorRespondBookingBulk, request: Request, db: Session = Depends(get_db)):
+    user = get_user_session(request)
+    if not user or user["role"] != "tutor":
+        raise HTTPException(403)
+    if len(req.decisions) > MAX_BULK_DECISIONS:
+        raise HTTPException(400, detail=f"Tối đa {MAX_BULK_DECISIONS} yêu cầu mỗi lần.")
+
+    service = BookingService(db)
+    try:
+        return service.tutor_respond_bulk(user["id"], [(d.req_id, d.action) for d in req.decisions])
+    except Exception as e:
+        raise HTTPException(400, detail=str(e))
+
+
+# =========================
+# EXPORT - lịch sử đặt lịch / đăng ký (stream NDJSON hoặc CSV)
+# =========================
+def export_response(kind: str, fmt: str, **filters):
+    service = ExportService()
+    try:
+        chunks = getattr(service, kind)(fmt, **filters)
+    except ValueError as e:
+        raise HTTPException(400, detail=str(e))
+    ext = "csv" if fmt == "csv" else "ndjson"
+    return StreamingResponse(chunks, media_type=EXPORT_FORMATS[fmt], headers={
+        "Content-Disposition": f'attachment; filename="{kind}-{datetime.now():%Y%m%d}.{ext}"'
+    })
+
+def date_range(start: Optional[date], end: Optional[date]):
+    """Inclusive dates from the query string -> [start, end) datetimes."""
+    return {
+        "start": datetime.combine(start, datetime.min.time()) if start else None,
+        "end": datetime.combine(end + timedelta(days=1), datetime.min.time()) if end else None,
+    }
+
+@router.get("/api/student/bookings/export")
+def export_student_bookings(request: Request, format: str = "ndjson",
+                            start: Optional[date] = None, end: Optional[date] = None):
+    user = require_role(request, 'student')
+    return export_response("bookings", format, student_id=user["id"], **date_range(start, end))
+
+@router.get("/api/tutor/requests/export")
+def export_tutor_requests(request: Request, format: str = "ndjson",
+                          start: Optional[date] = None, end: Optional[date] = None):
+    user = require_role(request, 'tutor')
+    return export_response("bookings", format, tutor_id=user["id"], **date_range(start, end))
+
+@router.get("/api/coordinator/export/bookings")
+def export_bookings(request: Request, format: str = "csv", program_id: Optional[int] = None,
+                    semester: Optional[str] = None, start: Optional[date] = None, end: Optional[date] = None):
+    require_role(request, 'coordinator')
+    return export_response("bookings", format, program_id=program_id, semester=semester, **date_range(start, end))
+
+@router.get("/api/coordinator/export/registrations")
+def export_registrations(request: Request, format: str = "csv", program_id: Optional[int] = None,
+                         semester: Optional[str] = None):
+    require_role(request, 'coordinator')
+    return export_response("registrations", format, program_id=program_id, semester=semester)
@@ -0,0 +1,152 @@
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import List, Optional, Tuple
+from app.database import SessionLocal
+from app.services.services import CoordinationService
+
+logger = logging.getLogger(__name__)
+
+# Admission queue is opt-in: set ADMISSION_QUEUE_ENABLED=1 before registration opens
+ADMISSION_QUEUE_ENABLED = os.getenv("ADMISSION_QUEUE_ENABLED", "0") == "1"
+ADMISSION_WORKERS = int(os.getenv("ADMISSION_WORKERS", "2"))
+ADMISSION_BATCH_SIZE = int(os.getenv("ADMISSION_BATCH_SIZE", "50"))
+ADMISSION_MAX_PENDING = int(os.getenv("ADMISSION_MAX_PENDING", "10000"))
+TICKET_TTL_SECONDS = 600
+
+class AdmissionQueueFull(Exception):
+    pass
+
+class AdmissionQueue:
+    """
+    Accepts program registrations immediately and drains them through a small
+    pool of worker threads, several registrations per transaction.
+    Tickets let the client poll for the final result.
+    """
+
+    def __init__(self, session_factory=SessionLocal, workers: int = ADMISSION_WORKERS,
+                 batch_size: int = ADMISSION_BATCH_SIZE, max_pending: int = ADMISSION_MAX_PENDING):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._tickets = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self.processed = 0
+        self.batches = 0
+
+    def submit(self, student_id: int, program_id: int) -> str:
+        self._ensure_started()
+        ticket = uuid.uuid4().hex
+        with self._lock:
+            self._tickets[ticket] = {
+                "status": "queued",
+                "student_id": student_id,
+                "program_id": program_id,
+                "message": None,
+                "updated": time.monotonic(),
+            }
+        try:
+            self._queue.put_nowait((ticket, student_id, program_id))
+        except queue.Full:
+            with self._lock:
+                self._tickets.pop(ticket, None)
+            raise AdmissionQueueFull("Hệ thống đang quá tải, vui lòng thử lại sau")
+        return ticket
+
+    def status(self, ticket: str, student_id: int) -> Optional[dict]:
+        with self._lock:
+            info = self._tickets.get(ticket)
+            if not info or info["student_id"] != student_id:
+                return None
+            return {
+                "ticket": ticket,
+                "status": info["status"],
+                "program_id": info["program_id"],
+                "message": info["message"],
+            }
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._queue.qsize(),
+            "workers": len(self._threads),
+            "processed": self.processed,
+            "batches": self.batches,
+        }
+
+    def _ensure_started(self):
+        if len(self._threads) >= self.workers and all(t.is_alive() for t in self._threads):
+            return
+        with self._lock:
+            # Thread chết (lỗi ngoài dự kiến) thì thay thread mới
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                t = threading.Thread(target=self._run, name=f"admission-{len(self._threads)}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._process(batch)
+            except Exception:
+                # Mất kết nối DB...: batch này báo lỗi, thread vẫn sống để xử lý tiếp
+                logger.exception("Admission batch of %d failed", len(batch))
+                self._finish(batch, ["Hệ thống đang gặp sự cố, vui lòng thử lại sau"] * len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _process(self, batch: List[Tuple[str, int, int]]):
+        pairs = [(student_id, program_id) for _, student_id, program_id in batch]
+        db = self.session_factory()
+        try:
+            service = CoordinationService(db)
+            try:
+                errors = service.register_students_batch(pairs)
+            except Exception:
+                # Một dòng lỗi (vd: program không tồn tại) làm hỏng cả batch -> xử lý từng dòng
+                db.rollback()
+                errors = []
+                for student_id, program_id in pairs:
+                    try:
+                        service.register_student_to_program(student_id, program_id)
+                        errors.append(None)
+                    except Exception as e:
+                        db.rollback()
+                        errors.append(str(e))
+        finally:
+            db.close()
+        self._finish(batch, errors)
+
+    def _finish(self, batch: List[Tuple[str, int, int]], errors: List[Optional[str]]):
+        now = time.monotonic()
+        with self._lock:
+            for (ticket, _, _), error in zip(batch, errors):
+                info = self._tickets.get(ticket)
+                if not info:
+                    continue
+                info["status"] = "failed" if error else "done"
+                info["message"] = error or "Đăng ký thành công!"
+                info["updated"] = now
+            self.processed += len(batch)
+            self.batches += 1
+            self._purge_expired(now)
+
+    def _purge_expired(self, now: float):
+        expired = [t for t, info in self._tickets.items()
+                   if info["status"] != "queued" and now - info["updated"] > TICKET_TTL_SECONDS]
+        for t in expired:
+            del self._tickets[t]
+
+admission_queue = AdmissionQueue()
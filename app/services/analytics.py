@@ -0,0 +1,190 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+import numpy as np
+from app.domain.rules import SemesterDomain
+
+# Programs have no capacity column yet: fill rate = registrations / PROGRAM_CAPACITY
+PROGRAM_CAPACITY = int(os.getenv("PROGRAM_CAPACITY", "100"))
+# Page views within this interval reuse the report without even checking the watermarks
+ANALYTICS_REFRESH_SECONDS = float(os.getenv("ANALYTICS_REFRESH_SECONDS", "30"))
+WEEKDAYS = ["T2", "T3", "T4", "T5", "T6", "T7", "CN"]
+
+class SemesterAnalytics:
+    """
+    Aggregates of one semester, kept between page views. Each refresh reads the
+    watermarks first and only touches sections whose tables changed: registrations and
+    booking demand are append-mostly and get patched with the new rows only; programs are
+    reloaded when a program is added, removed, opened or closed; slot hours and response
+    latencies are re-aggregated when their marker moves.
+    """
+
+    def __init__(self, semester: str = None):
+        self.semester = semester
+        self.window = SemesterDomain.window(semester) if semester else None
+        self.lock = threading.Lock()
+        self.marks = None
+        self.checked_at = float("-inf")
+        self.programs = {}  # program_id -> [name, status, registrations]
+        self.tutor_ids = np.zeros(0, dtype=np.int64)
+        self.tutor_names = []
+        self.offered = np.zeros(0)
+        self.booked = np.zeros(0)
+        self.latency = np.zeros(0)
+        self.accepted = np.zeros(0, dtype=bool)
+        self.heatmap = np.zeros((7, 24), dtype=np.int64)
+        self.report = None
+        self.refreshes = {"full": 0, "incremental": 0, "partial": 0, "unchanged": 0}
+
+    @staticmethod
+    def _appended_only(marks, prev, count_key, max_key) -> bool:
+        # Số dòng tăng đúng bằng số id mới => không có dòng nào bị xóa
+        return marks[count_key] - prev[count_key] == marks[max_key] - prev[max_key]
+
+    def refresh(self, repo):
+        marks = repo.watermarks()
+        prev = self.marks
+        if prev is not None and marks == prev:
+            self.refreshes["unchanged"] += 1
+            return
+        full = prev is None
+        incremental = False
+
+        if full or any(marks[k] != prev[k] for k in ("programs", "programs_open", "programs_open_ids")) \
+                or not self._appended_only(marks, prev, "registrations", "registration_max_id"):
+            self._load_programs(repo.program_registrations(self.semester))
+        elif marks["registrations"] != prev["registrations"]:
+            self._add_programs(repo.program_registrations(self.semester, after_id=prev["registration_max_id"]))
+            incremental = True
+
+        if full or marks["slot_version"] != prev["slot_version"]:
+            self._load_tutors(repo.tutor_slot_hours(self.window))
+
+        if full or marks["responded"] != prev["responded"] or marks["responded_max_at"] != prev["responded_max_at"]:
+            self._load_latency(repo.response_latencies(self.window))
+
+        if full or not self._appended_only(marks, prev, "bookings", "booking_max_id"):
+            self.heatmap[:] = 0
+            self._add_demand(repo.demand_by_hour(self.window))
+        elif marks["bookings"] != prev["bookings"]:
+            self._add_demand(repo.demand_by_hour(self.window, after_id=prev["booking_max_id"]))
+            incremental = True
+
+        self.refreshes["full" if full else "incremental" if incremental else "partial"] += 1
+        self.marks = marks
+        self.report = self._build_report()
+
+    def _load_programs(self, rows):
+        self.programs = {pid: [name, status, int(n)] for pid, name, status, n in rows}
+
+    def _add_programs(self, rows):
+        for pid, name, status, n in rows:
+            self.programs.setdefault(pid, [name, status, 0])[2] += int(n)
+
+    def _load_tutors(self, rows):
+        self.tutor_ids = np.array([r[0] for r in rows], dtype=np.int64)
+        self.tutor_names = [r[1] for r in rows]
+        self.offered = np.array([float(r[2] or 0) for r in rows])
+        self.booked = np.array([float(r[3] or 0) for r in rows])
+
+    def _load_latency(self, rows):
+        self.latency = np.clip(np.array([float(r[1] or 0) for r in rows]), 0, None)
+        self.accepted = np.array([getattr(r[0], "value", r[0]) == "accepted" for r in rows], dtype=bool)
+
+    def _add_demand(self, rows):
+        if rows:
+            cells = np.array(rows, dtype=np.int64)
+            np.add.at(self.heatmap, (cells[:, 0], cells[:, 1]), cells[:, 2])
+
+    def _build_report(self) -> dict:
+        ids = list(self.programs)
+        counts = np.array([self.programs[i][2] for i in ids], dtype=np.float64)
+        fill = counts / PROGRAM_CAPACITY if PROGRAM_CAPACITY else np.zeros_like(counts)
+        order = np.argsort(-fill, kind="stable")
+
+        offered_h, booked_h = self.offered / 3600, self.booked / 3600
+        utilization = np.divide(booked_h, offered_h, out=np.zeros_like(offered_h), where=offered_h > 0)
+
+        hours = self.latency / 3600
+        total_demand = int(self.heatmap.sum())
+        flat = self.heatmap.ravel()
+        peaks = [i for i in np.argsort(-flat, kind="stable")[:5] if flat[i] > 0]
+
+        return {
+            "semester": self.semester,
+            "window": [d.isoformat() for d in self.window] if self.window else None,
+            "programs": {
+                "capacity": PROGRAM_CAPACITY,
+                "registrations": int(counts.sum()),
+                "items": [
+                    {"id": ids[i], "name": self.programs[ids[i]][0], "status": self.programs[ids[i]][1],
+                     "registrations": int(counts[i]), "fill_rate": round(float(fill[i]), 4)}
+                    for i in order
+                ],
+            },
+            "tutors": {
+                "offered_hours": round(float(offered_h.sum()), 2),
+                "booked_hours": round(float(booked_h.sum()), 2),
+                "utilization": round(float(booked_h.sum() / offered_h.sum()), 4) if offered_h.sum() else 0.0,
+                "median_utilization": round(float(np.median(utilization)), 4) if utilization.size else 0.0,
+                "items": [
+                    {"tutor_id": int(self.tutor_ids[i]), "name": self.tutor_names[i],
+                     "offered_hours": round(float(offered_h[i]), 2), "booked_hours": round(float(booked_h[i]), 2),
+                     "utilization": round(float(utilization[i]), 4)}
+                    for i in np.argsort(-utilization, kind="stable")
+                ],
+            },
+            "response_latency": {
+                "responded": int(hours.size),
+                "acceptance_rate": round(float(self.accepted.mean()), 4) if hours.size else None,
+                "mean_hours": round(float(hours.mean()), 2) if hours.size else None,
+                "p50_hours": round(float(np.percentile(hours, 50)), 2) if hours.size else None,
+                "p90_hours": round(float(np.percentile(hours, 90)), 2) if hours.size else None,
+                "within_24h": round(float((hours <= 24).mean()), 4) if hours.size else None,
+            },
+            "demand_heatmap": {
+                "weekdays": WEEKDAYS,
+                "grid": self.heatmap.tolist(),
+                "total": total_demand,
+                "peaks": [{"weekday": WEEKDAYS[i // 24], "hour": int(i % 24), "requests": int(flat[i])} for i in peaks],
+            },
+            "refreshed_at": datetime.now().isoformat(timespec="seconds"),
+        }
+
+class AnalyticsCache:
+    """One SemesterAnalytics per semester (LRU), shared by all coordinators of the worker."""
+
+    def __init__(self, max_semesters: int = 16, refresh_seconds: float = ANALYTICS_REFRESH_SECONDS):
+        self.max_semesters = max_semesters
+        self.refresh_seconds = refresh_seconds
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _state(self, semester) -> SemesterAnalytics:
+        with self._lock:
+            state = self._states.get(semester)
+            if state is None:
+                state = self._states[semester] = SemesterAnalytics(semester)
+            self._states.move_to_end(semester)
+            while len(self._states) > self.max_semesters:
+                self._states.popitem(last=False)
+            return state
+
+    def report(self, repo, semester: str = None) -> dict:
+        state = self._state(semester)
+        # Một coordinator làm mới, các request đồng thời chờ và dùng lại kết quả
+        with state.lock:
+            now = time.monotonic()
+            if state.report is None or now - state.checked_at >= self.refresh_seconds:
+                state.refresh(repo)
+                state.checked_at = now
+            return {**state.report, "refreshes": dict(state.refreshes)}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"semesters": len(self._states),
+                    "refreshes": {s if s else "all": dict(st.refreshes) for s, st in self._states.items()}}
+
+analytics_cache = AnalyticsCache()
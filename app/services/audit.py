@@ -0,0 +1,142 @@
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Optional
+from app.database import SessionLocal
+from app.repositories.repos import SystemRepository
+
+logger = logging.getLogger(__name__)
+
+AUDIT_ENABLED = os.getenv("AUDIT_ENABLED", "1") == "1"
+AUDIT_BUFFER_SIZE = int(os.getenv("AUDIT_BUFFER_SIZE", "50000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "2.0"))
+
+class AuditTrail:
+    """
+    Request threads only append a tuple to an in-memory ring buffer; one writer thread
+    drains it into the audit_logs table, AUDIT_BATCH_SIZE rows per INSERT. When the
+    database is unavailable the buffer keeps the newest AUDIT_BUFFER_SIZE events and
+    counts the ones it had to drop.
+    """
+
+    def __init__(self, session_factory=SessionLocal, buffer_size: int = AUDIT_BUFFER_SIZE,
+                 batch_size: int = AUDIT_BATCH_SIZE, flush_seconds: float = AUDIT_FLUSH_SECONDS,
+                 enabled: bool = AUDIT_ENABLED):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.enabled = enabled
+        self._buffer = deque(maxlen=buffer_size)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # Giữ chỗ trong buffer cố định: append/trả batch về và đếm dropped phải đi cùng nhau
+        self._buffer_lock = threading.Lock()
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.failures = 0
+
+    def record(self, action: str, actor_id: Optional[int] = None, entity: Optional[str] = None,
+               entity_id: Optional[int] = None, **detail):
+        if not self.enabled:
+            return
+        self._ensure_started()
+        event = (datetime.now(), actor_id, action, entity, entity_id, detail or None)
+        with self._buffer_lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(event)
+            self.recorded += 1
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """Writes everything buffered so far; returns the number of rows written."""
+        written = 0
+        with self._flush_lock:
+            while self._buffer:
+                batch = []
+                while self._buffer and len(batch) < self.batch_size:
+                    batch.append(self._buffer.popleft())
+                try:
+                    self._write(batch)
+                except Exception:
+                    self._requeue(batch)
+                    self.failures += 1
+                    logger.exception("Audit log flush failed (%d events buffered)", len(self._buffer))
+                    break
+                written += len(batch)
+                self.written += len(batch)
+                self.batches += 1
+        return written
+
+    def _requeue(self, batch):
+        """Puts a failed batch back at the head of the buffer, in order. Events recorded
+        meanwhile are newer: when they left too little room, the oldest of the batch are
+        the ones dropped (extendleft on a full deque would evict the newest instead)."""
+        with self._buffer_lock:
+            room = self._buffer.maxlen - len(self._buffer)
+            keep = batch[max(0, len(batch) - room):]
+            self.dropped += len(batch) - len(keep)
+            self._buffer.extendleft(reversed(keep))
+
+    def _write(self, batch):
+        rows = [
+            {"created_at": created_at, "actor_id": actor_id, "action": action, "entity": entity,
+             "entity_id": entity_id,
+             "detail": json.dumps(detail, ensure_ascii=False, default=str) if detail else None}
+            for created_at, actor_id, action, entity, entity_id, detail in batch
+        ]
+        db = self.session_factory()
+        try:
+            SystemRepository(db).append_logs(rows)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "failures": self.failures,
+        }
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def stop(self, timeout: float = 5.0):
+        """Stops the writer and flushes what is left (called on shutdown)."""
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            self._wake.set()
+            thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+audit_log = AuditTrail()
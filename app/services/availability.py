@@ -0,0 +1,78 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Tuple
+from app.domain.rules import AvailabilityDomain
+
+class AvailabilityIndex:
+    """
+    In-memory week bitsets: open slots per tutor, booked sessions per student.
+    Entries carry the owner's feed version and are rebuilt when it moves;
+    ScheduleService applies its own writes in place so the author's worker
+    does not have to reload.
+    """
+
+    def __init__(self, max_entries: int = 20000):
+        self.max_entries = max_entries
+        self._tutors = OrderedDict()
+        self._students = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_many(self, table: OrderedDict, versions: Dict[int, int]) -> Tuple[Dict[int, dict], List[int]]:
+        found, missing = {}, []
+        with self._lock:
+            for owner_id, version in versions.items():
+                entry = table.get(owner_id)
+                if entry is not None and entry[0] == version:
+                    table.move_to_end(owner_id)
+                    found[owner_id] = entry[1]
+                else:
+                    missing.append(owner_id)
+        return found, missing
+
+    def _put(self, table: OrderedDict, owner_id: int, version: int, weeks: dict):
+        with self._lock:
+            table[owner_id] = (version, weeks)
+            table.move_to_end(owner_id)
+            while len(table) > self.max_entries:
+                table.popitem(last=False)
+
+    def get_tutors(self, versions: Dict[int, int]):
+        return self._get_many(self._tutors, versions)
+
+    def put_tutor(self, tutor_id: int, version: int, weeks: dict):
+        self._put(self._tutors, tutor_id, version, weeks)
+
+    def get_student(self, student_id: int, version: int):
+        found, _ = self._get_many(self._students, {student_id: version})
+        return found.get(student_id)
+
+    def put_student(self, student_id: int, version: int, weeks: dict):
+        self._put(self._students, student_id, version, weeks)
+
+    def apply_slot_change(self, tutor_id: int, start: datetime, end: datetime, is_open: bool, new_version: int):
+        """Incremental update after a single write that moved the version by exactly one."""
+        with self._lock:
+            entry = self._tutors.get(tutor_id)
+            if entry is None:
+                return
+            version, weeks = entry
+            if version != new_version - 1:
+                del self._tutors[tutor_id]
+                return
+            weeks = dict(weeks)
+            for week, bits in AvailabilityDomain.encode([(start, end)]).items():
+                if is_open:
+                    weeks[week] = weeks.get(week, 0) | bits
+                else:
+                    weeks[week] = weeks.get(week, 0) & ~bits
+            self._tutors[tutor_id] = (new_version, weeks)
+
+    def invalidate_tutor(self, tutor_id: int):
+        with self._lock:
+            self._tutors.pop(tutor_id, None)
+
+    def stats(self) -> dict:
+        return {"tutors": len(self._tutors), "students": len(self._students)}
+
+availability_index = AvailabilityIndex()
@@ -0,0 +1,110 @@
+"""
+Incremental roster synchronization from HCMUT DataCore.
+
+    python -m app.services.datacore_sync
+
+Streams the roster in pages, looks up the page's users by mssv in one
+indexed query (id, mssv, ho_ten, role only), compares ho_ten/role field by
+field and writes only changed/new rows with one batched UPDATE + INSERT per
+page (short transactions, no long table lock).
+The cursor of the last applied page is checkpointed to disk so an
+interrupted run resumes where it stopped.
+"""
+import asyncio
+import json
+import os
+import time
+from app.database import SessionLocal, NamedLock
+from app.integration.adapters import datacore_adapter
+from app.models import NO_LOCAL_PASSWORD
+from app.repositories.repos import UserRepository
+from app.services.shared_cache import shared_cache, TUTORS, USER_NAMES
+
+SYNC_PAGE_SIZE = int(os.getenv("DATACORE_SYNC_PAGE_SIZE", "1000"))
+SYNC_CHECKPOINT_PATH = os.getenv("DATACORE_SYNC_CHECKPOINT", "datacore_sync.checkpoint")
+SYNCED_ROLES = ("student", "tutor")
+
+class DataCoreSync:
+    def __init__(self, adapter=datacore_adapter, session_factory=SessionLocal,
+                 page_size: int = SYNC_PAGE_SIZE, checkpoint_path: str = SYNC_CHECKPOINT_PATH):
+        self.adapter = adapter
+        self.session_factory = session_factory
+        self.page_size = page_size
+        self.checkpoint_path = checkpoint_path
+        self.last_run = None
+        # Một lần đồng bộ trên toàn hệ thống (các worker + CLI dùng chung checkpoint)
+        self.lock = NamedLock("datacore_roster_sync")
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                return json.load(f).get("cursor")
+        except FileNotFoundError:
+            return None
+
+    def _save_checkpoint(self, cursor):
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"cursor": cursor}, f)
+        os.replace(tmp, self.checkpoint_path)
+
+    def _clear_checkpoint(self):
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def apply_page(self, users) -> dict:
+        """Diffs one roster page against `users` and writes the changes. Runs in a worker thread."""
+        incoming = {}
+        for u in users:
+            role = u.get("role") if u.get("role") in SYNCED_ROLES else "student"
+            incoming[u["mssv"]] = {"mssv": u["mssv"], "ho_ten": u.get("ho_ten", ""), "role": role}
+        db = self.session_factory()
+        try:
+            repo = UserRepository(db)
+            existing = {r.mssv: r for r in repo.get_sync_rows(incoming.keys())}
+            updates, inserts = [], []
+            for mssv, data in incoming.items():
+                current = existing.get(mssv)
+                if current is None:
+                    # Tài khoản mới: không có mật khẩu local, chỉ đăng nhập qua SSO
+                    inserts.append({**data, "password": NO_LOCAL_PASSWORD})
+                elif current.role in SYNCED_ROLES and (current.ho_ten, current.role) != (data["ho_ten"], data["role"]):
+                    updates.append({"id": current.id, "ho_ten": data["ho_ten"], "role": data["role"]})
+            if updates or inserts:
+                repo.apply_sync_batch(updates, inserts)
+                shared_cache.invalidate(TUTORS)
+                shared_cache.invalidate(USER_NAMES)
+        finally:
+            db.close()
+        return {"seen": len(incoming), "updated": len(updates), "inserted": len(inserts)}
+
+    async def run(self) -> dict:
+        if not await asyncio.to_thread(self.lock.acquire):
+            return {"skipped": "another sync is running"}
+        try:
+            return await self._run()
+        finally:
+            await asyncio.to_thread(self.lock.release)
+
+    async def _run(self) -> dict:
+        started = time.perf_counter()
+        cursor = self._load_checkpoint()
+        totals = {"pages": 0, "seen": 0, "updated": 0, "inserted": 0, "resumed": cursor is not None}
+        async for users, next_cursor in self.adapter.iter_roster(self.page_size, cursor):
+            result = await asyncio.to_thread(self.apply_page, users)
+            for key in ("seen", "updated", "inserted"):
+                totals[key] += result[key]
+            totals["pages"] += 1
+            if next_cursor:
+                self._save_checkpoint(next_cursor)
+        self._clear_checkpoint()
+        elapsed = time.perf_counter() - started
+        totals["elapsed_seconds"] = round(elapsed, 2)
+        totals["rows_per_second"] = round(totals["seen"] / elapsed, 1) if elapsed else 0.0
+        self.last_run = totals
+        return totals
+
+datacore_sync = DataCoreSync()
+
+if __name__ == "__main__":
+    print(asyncio.run(datacore_sync.run()))
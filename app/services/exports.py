@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from app.database import SessionLocal, read_replica
+from app.repositories.repos import BookingRepository, ProgramRepository
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+BOOKING_COLUMNS = ["id", "status", "student_mssv", "student_name", "tutor_mssv", "tutor_name",
+                   "start_time", "end_time", "note", "created_at"]
+REGISTRATION_COLUMNS = ["id", "program_id", "program_name", "semester", "mssv", "ho_ten"]
+
+def _value(v):
+    return v.isoformat() if isinstance(v, datetime) else v
+
+class ExportService:
+    """
+    Streams history as NDJSON or CSV. The generator owns its own session (it outlives
+    the request handler) and buffers about one cursor chunk before yielding, so memory
+    stays flat whatever the history size.
+    """
+
+    def __init__(self, session_factory=SessionLocal, chunk_size: int = EXPORT_CHUNK_SIZE):
+        self.session_factory = session_factory
+        self.chunk_size = chunk_size
+
+    def bookings(self, fmt: str, **filters):
+        return self._stream(fmt, BOOKING_COLUMNS,
+                            lambda db: BookingRepository(db).iter_history(chunk_size=self.chunk_size, **filters))
+
+    def registrations(self, fmt: str, **filters):
+        return self._stream(fmt, REGISTRATION_COLUMNS,
+                            lambda db: ProgramRepository(db).iter_registrations(chunk_size=self.chunk_size, **filters))
+
+    def _stream(self, fmt: str, columns, rows):
+        # Kiểm tra trước khi trả generator, để lỗi thành 400 chứ không phải body hỏng
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Định dạng không hỗ trợ: {fmt}")
+        return self._chunks(fmt, columns, rows)
+
+    def _chunks(self, fmt: str, columns, rows):
+        buf = io.StringIO()
+        writer = csv.writer(buf) if fmt == "csv" else None
+        if writer:
+            writer.writerow(columns)
+        db = self.session_factory()
+        try:
+            with read_replica(db):
+                for n, row in enumerate(rows(db), 1):
+                    values = [_value(getattr(row, c)) for c in columns]
+                    if writer:
+                        writer.writerow(values)
+                    else:
+                        buf.write(json.dumps(dict(zip(columns, values)), ensure_ascii=False))
+                        buf.write("\n")
+                    if n % self.chunk_size == 0:
+                        yield buf.getvalue().encode()
+                        buf.seek(0)
+                        buf.truncate()
+        finally:
+            db.close()
+        if buf.tell():
+            yield buf.getvalue().encode()
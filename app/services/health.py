@@ -0,0 +1,117 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import text
+from app.database import engine
+
+DB_PROBE_TIMEOUT_SECONDS = float(os.getenv("HEALTH_DB_TIMEOUT", "1.0"))
+MAX_LOOP_LAG_MS = float(os.getenv("HEALTH_MAX_LOOP_LAG_MS", "250"))
+MAX_POOL_SATURATION = float(os.getenv("HEALTH_MAX_POOL_SATURATION", "1.0"))
+MAX_THREADPOOL_WAITING = int(os.getenv("HEALTH_MAX_THREADPOOL_WAITING", "20"))
+LOOP_LAG_INTERVAL_SECONDS = 0.5
+
+class HealthMonitor:
+    """
+    Liveness/readiness probes for the load balancer.
+    Readiness flips to False when the DB is unreachable or the worker is overloaded
+    (event loop lagging, DB pool exhausted, request threadpool backed up).
+    """
+
+    def __init__(self, db_engine=engine):
+        self.engine = db_engine
+        self.started_at = time.time()
+        self.loop_lag_ms = 0.0
+        self.cold_start_ms = None
+        self._lag_task = None
+        # Executor riêng để probe DB không phải xếp hàng sau các request đang chờ threadpool
+        self._probe_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="health-probe")
+
+    def start(self):
+        if self._lag_task is None:
+            self._lag_task = asyncio.get_running_loop().create_task(self._measure_loop_lag())
+
+    async def stop(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            try:
+                await self._lag_task
+            except asyncio.CancelledError:
+                pass
+            self._lag_task = None
+
+    async def _measure_loop_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LOOP_LAG_INTERVAL_SECONDS
+            await asyncio.sleep(LOOP_LAG_INTERVAL_SECONDS)
+            self.loop_lag_ms = max(0.0, (loop.time() - expected) * 1000)
+
+    def liveness(self) -> dict:
+        return {
+            "status": "ok",
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "cold_start_ms": self.cold_start_ms,
+        }
+
+    def _ping_db(self):
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    async def probe_db(self) -> dict:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(loop.run_in_executor(self._probe_executor, self._ping_db),
+                                   DB_PROBE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            return {"ok": False, "error": "timeout"}
+        except Exception as e:
+            return {"ok": False, "error": type(e).__name__}
+        return {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+    def pool_stats(self) -> dict:
+        pool = self.engine.pool
+        if not hasattr(pool, "checkedout"):
+            return {"saturation": 0.0}
+        capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+        checked_out = pool.checkedout()
+        return {
+            "size": pool.size(),
+            "checked_out": checked_out,
+            "overflow": pool.overflow(),
+            "saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+        }
+
+    def threadpool_stats(self) -> dict:
+        import anyio.to_thread
+        stats = anyio.to_thread.current_default_thread_limiter().statistics()
+        return {
+            "busy": stats.borrowed_tokens,
+            "limit": stats.total_tokens,
+            "waiting": stats.tasks_waiting,
+        }
+
+    async def readiness(self) -> dict:
+        db = await self.probe_db()
+        pool = self.pool_stats()
+        threadpool = self.threadpool_stats()
+        reasons = []
+        if not db["ok"]:
+            reasons.append("database")
+        if self.loop_lag_ms > MAX_LOOP_LAG_MS:
+            reasons.append("event_loop_lag")
+        if pool["saturation"] >= MAX_POOL_SATURATION and threadpool["waiting"] > 0:
+            reasons.append("db_pool_saturated")
+        if threadpool["waiting"] > MAX_THREADPOOL_WAITING:
+            reasons.append("threadpool_backlog")
+        return {
+            "ready": not reasons,
+            "reasons": reasons,
+            "database": db,
+            "pool": pool,
+            "threadpool": threadpool,
+            "loop_lag_ms": round(self.loop_lag_ms, 2),
+        }
+
+health_monitor = HealthMonitor()
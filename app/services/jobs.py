@@ -0,0 +1,92 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+from app.database import SessionLocal
+from app.services.services import MaintenanceService
+from app.services.scheduler import background_scheduler, EXPIRE_REQUESTS_JOB, CLOSE_SLOTS_JOB, LOAD_DEADLINES_JOB
+from app.services.reminders import reminder_index, notifier, REMIND_JOB, REMINDER_BATCH_SIZE
+from app.services.datacore_sync import datacore_sync
+
+BACKGROUND_JOBS_ENABLED = os.getenv("BACKGROUND_JOBS_ENABLED", "1") == "1"
+CLOSE_SLOTS_INTERVAL_SECONDS = int(os.getenv("CLOSE_SLOTS_INTERVAL_SECONDS", "900"))
+REMINDER_REFILL_INTERVAL_SECONDS = int(os.getenv("REMINDER_REFILL_INTERVAL_SECONDS", "3600"))
+EXPIRE_SWEEP_INTERVAL_SECONDS = int(os.getenv("EXPIRE_SWEEP_INTERVAL_SECONDS", "900"))
+LOAD_REMINDERS_JOB = "load_session_reminders"
+# Quét toàn bộ request quá hạn (bắt cả những mốc được hẹn ở worker đã tắt)
+EXPIRE_SWEEP_JOB = "expire_pending_sweep"
+DATACORE_SYNC_JOB = "datacore_roster_sync"
+# Giờ chạy đồng bộ DataCore hằng đêm (giờ local); để trống để tắt
+DATACORE_SYNC_HOUR = os.getenv("DATACORE_SYNC_HOUR", "2")
+
+def _run(task):
+    db = SessionLocal()
+    try:
+        return task(MaintenanceService(db))
+    finally:
+        db.close()
+
+def expire_pending_requests():
+    return _run(lambda service: service.expire_stale_requests())
+
+def close_past_slots():
+    return _run(lambda service: service.close_past_slots())
+
+def load_request_deadlines():
+    """Queues one expiry run per distinct slot start that still has pending requests."""
+    deadlines = _run(lambda service: service.get_pending_deadlines())
+    for start_time in deadlines:
+        background_scheduler.schedule(EXPIRE_REQUESTS_JOB, start_time)
+    return len(deadlines)
+
+def load_session_reminders():
+    """Loads the sessions whose reminder falls before the next refill (one query per hour,
+    not per minute). Acceptances in between are pushed by BookingService."""
+    horizon = reminder_index.lead + timedelta(seconds=REMINDER_REFILL_INTERVAL_SECONDS * 2)
+    sessions = _run(lambda service: service.get_sessions_to_remind(datetime.now() + horizon))
+    for session in sessions:
+        reminder_index.add(session)
+    return len(sessions)
+
+def dispatch_session_reminders():
+    due = reminder_index.pop_due(datetime.now())
+    sent = 0
+    for i in range(0, len(due), REMINDER_BATCH_SIZE):
+        batch = due[i:i + REMINDER_BATCH_SIZE]
+        token = uuid.uuid4().hex
+        claimed = _run(lambda service: service.claim_reminders([s["id"] for s in batch], token))
+        reminders = [
+            {
+                **session,
+                "message": f"Buổi học với {session['tutor_name']} bắt đầu lúc {session['start_time']:%H:%M %d/%m/%Y}",
+            }
+            for session in batch if session["id"] in claimed
+        ]
+        if reminders:
+            notifier.send_batch(reminders)
+            sent += len(reminders)
+    reminder_index.sent += sent
+    return sent
+
+async def sync_datacore_roster():
+    return await datacore_sync.run()
+
+def register_jobs(scheduler=background_scheduler):
+    # Chạy ở worker đã lên lịch (mốc giờ của request/buổi học do chính worker đó nhận)
+    scheduler.register(EXPIRE_REQUESTS_JOB, expire_pending_requests)
+    scheduler.register(REMIND_JOB, dispatch_session_reminders)
+    # Quét cả DB: chỉ worker giữ leader lock chạy
+    now = datetime.now()
+    scheduler.register(EXPIRE_SWEEP_JOB, expire_pending_requests, every_seconds=EXPIRE_SWEEP_INTERVAL_SECONDS,
+                       leader_only=True)
+    scheduler.register(CLOSE_SLOTS_JOB, close_past_slots, every_seconds=CLOSE_SLOTS_INTERVAL_SECONDS,
+                       leader_only=True)
+    scheduler.register(LOAD_DEADLINES_JOB, load_request_deadlines, every_seconds=REMINDER_REFILL_INTERVAL_SECONDS,
+                       leader_only=True)
+    scheduler.register(LOAD_REMINDERS_JOB, load_session_reminders, every_seconds=REMINDER_REFILL_INTERVAL_SECONDS,
+                       leader_only=True)
+    if DATACORE_SYNC_HOUR:
+        first_run = now.replace(hour=int(DATACORE_SYNC_HOUR), minute=0, second=0, microsecond=0)
+        if first_run <= now:
+            first_run += timedelta(days=1)
+        scheduler.register(DATACORE_SYNC_JOB, sync_datacore_roster, every_seconds=24 * 3600, first_run=first_run,
+                           leader_only=True)
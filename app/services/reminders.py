@@ -0,0 +1,95 @@
+import abc
+import heapq
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import List
+from app.services.scheduler import background_scheduler
+
+REMIND_JOB = "dispatch_session_reminders"
+REMINDER_LEAD_MINUTES = int(os.getenv("REMINDER_LEAD_MINUTES", "30"))
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "200"))
+# "file" (JSON lines, mặc định) hoặc "memory" (giữ trong tiến trình, xem qua tests/)
+REMINDER_NOTIFIER = os.getenv("REMINDER_NOTIFIER", "file")
+REMINDER_LOG_PATH = os.getenv("REMINDER_LOG_PATH", "reminders.log")
+
+class Notifier(abc.ABC):
+    """Delivery channel for reminders. Implementations receive whole batches."""
+    @abc.abstractmethod
+    def send_batch(self, reminders: List[dict]):
+        ...
+
+class InMemoryNotifier(Notifier):
+    """Keeps delivered reminders in `sent` (used by tests/test_reminders.py)."""
+    def __init__(self):
+        self.sent = []
+
+    def send_batch(self, reminders: List[dict]):
+        self.sent.extend(reminders)
+
+class FileNotifier(Notifier):
+    """Local stand-in for an e-mail/push gateway: one JSON line per reminder."""
+    def __init__(self, path: str = REMINDER_LOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send_batch(self, reminders: List[dict]):
+        lines = "".join(json.dumps(r, default=str, ensure_ascii=False) + "\n" for r in reminders)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+def make_notifier() -> Notifier:
+    if REMINDER_NOTIFIER == "memory":
+        return InMemoryNotifier()
+    return FileNotifier()
+
+class ReminderIndex:
+    """
+    Upcoming accepted sessions ordered by reminder time (a heap).
+    Filled from the DB one window at a time and on each acceptance;
+    a scheduler job per distinct reminder minute pops what is due.
+    """
+
+    def __init__(self, lead_minutes: int = REMINDER_LEAD_MINUTES):
+        self.lead = timedelta(minutes=lead_minutes)
+        self._heap = []
+        self._known = {}
+        self._lock = threading.Lock()
+        self.sent = 0
+
+    def add(self, session: dict):
+        """session: {"id", "student_id", "tutor_id", "start_time", ...} of an accepted booking."""
+        remind_at = session["start_time"] - self.lead
+        with self._lock:
+            if session["id"] in self._known:
+                return
+            self._known[session["id"]] = session["start_time"]
+            heapq.heappush(self._heap, (remind_at, session["id"], session))
+        # Gộp theo phút (làm tròn xuống) để nhiều buổi cùng giờ chỉ tạo một lần chạy job
+        background_scheduler.schedule(REMIND_JOB, remind_at.replace(second=0, microsecond=0))
+
+    def pop_due(self, now: datetime) -> List[dict]:
+        due = []
+        with self._lock:
+            # Job chạy ở đầu phút: lấy cả các buổi có giờ nhắc trong phút đó
+            cutoff = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+            while self._heap and self._heap[0][0] < cutoff:
+                _, _, session = heapq.heappop(self._heap)
+                if session["start_time"] > now:
+                    due.append(session)
+            # Quên các buổi đã diễn ra để _known không phình mãi
+            for booking_id in [b for b, start in self._known.items() if start <= now]:
+                del self._known[booking_id]
+        return due
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queued": len(self._heap),
+                "next_at": self._heap[0][0] if self._heap else None,
+                "sent": self.sent,
+            }
+
+reminder_index = ReminderIndex()
+notifier = make_notifier()
@@ -0,0 +1,172 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+from app.database import NamedLock
+
+logger = logging.getLogger(__name__)
+
+# Job names shared by the services that schedule them and app/services/jobs.py
+EXPIRE_REQUESTS_JOB = "expire_pending_requests"
+CLOSE_SLOTS_JOB = "close_past_slots"
+LOAD_DEADLINES_JOB = "load_request_deadlines"
+
+class BackgroundScheduler:
+    """
+    In-process job scheduler: an asyncio task sleeping until the earliest
+    deadline of a heap. Jobs are registered by name and run in a worker
+    thread (they use the sync DB session). The same (job, time) pair is
+    only queued once, so many requests sharing a slot start cost one entry.
+
+    Every uvicorn worker runs one. Each due job runs as its own task, so a slow
+    job (DataCore sync) does not delay the others; a job never overlaps itself.
+    Jobs registered with leader_only=True (periodic sweeps over the whole DB)
+    only run in the worker holding the `leader` lock; the others skip them and
+    take over if the leader dies.
+    """
+
+    def __init__(self, leader: NamedLock = None):
+        # Sync jobs run in a worker thread; async jobs (e.g. remote I/O) run on the loop
+        self._jobs: Dict[str, Callable] = {}
+        self._intervals: Dict[str, float] = {}
+        self._leader_only = set()
+        self.leader = leader or NamedLock("tutor_scheduler_leader")
+        self._running: Dict[str, asyncio.Task] = {}
+        self._rerun = set()
+        self._heap = []
+        self._queued = set()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task = None
+        self.job_stats: Dict[str, dict] = {}
+
+    def register(self, name: str, fn: Callable, every_seconds: float = None, first_run: datetime = None,
+                 leader_only: bool = False):
+        """Registers a job; with every_seconds it also repeats on that interval
+        (starting at first_run, or now)."""
+        self._jobs[name] = fn
+        if leader_only:
+            self._leader_only.add(name)
+        self.job_stats.setdefault(name, {"runs": 0, "errors": 0, "skipped": 0, "last_duration_ms": None,
+                                         "max_duration_ms": 0.0, "last_result": None})
+        if every_seconds:
+            self._intervals[name] = every_seconds
+            self.schedule(name, first_run or datetime.now())
+
+    def schedule(self, name: str, when: datetime):
+        """Thread-safe. Runs job `name` at `when` (naive local time, like TimeSlot)."""
+        with self._lock:
+            key = (name, when)
+            if key in self._queued:
+                return
+            self._queued.add(key)
+            heapq.heappush(self._heap, (when, next(self._seq), name))
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def start(self):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            # _task = None trước: callback của các job bị hủy không lên lịch lại
+            tasks, self._task = [self._task, *self._running.values()], None
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._running.clear()
+            self._loop = None
+        await asyncio.to_thread(self.leader.release)
+
+    def _pop_due(self, now: datetime):
+        with self._lock:
+            if self._heap and self._heap[0][0] <= now:
+                when, _, name = heapq.heappop(self._heap)
+                self._queued.discard((name, when))
+                return name
+            return None
+
+    def _seconds_until_next(self, now: datetime):
+        with self._lock:
+            if not self._heap:
+                return None
+            return max((self._heap[0][0] - now).total_seconds(), 0.0)
+
+    async def _run(self):
+        while True:
+            now = datetime.now()
+            name = self._pop_due(now)
+            if name is not None:
+                self._spawn(name)
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._seconds_until_next(now))
+            except asyncio.TimeoutError:
+                pass
+
+    def _spawn(self, name: str):
+        if name in self._running:
+            # Lần chạy trước chưa xong: chạy thêm một lần ngay sau đó
+            self._rerun.add(name)
+            return
+        task = self._loop.create_task(self._execute(name))
+        self._running[name] = task
+        task.add_done_callback(lambda _, name=name: self._finished(name))
+
+    def _finished(self, name: str):
+        self._running.pop(name, None)
+        if self._task is None:
+            return
+        if name in self._intervals:
+            self.schedule(name, datetime.now() + timedelta(seconds=self._intervals[name]))
+        if name in self._rerun:
+            self._rerun.discard(name)
+            self._spawn(name)
+
+    async def _execute(self, name: str):
+        stats = self.job_stats[name]
+        if name in self._leader_only and not await asyncio.to_thread(self.leader.acquire):
+            stats["skipped"] += 1
+            return
+        started = time.perf_counter()
+        try:
+            job = self._jobs[name]
+            if asyncio.iscoroutinefunction(job):
+                stats["last_result"] = await job()
+            else:
+                stats["last_result"] = await asyncio.to_thread(job)
+        except Exception:
+            stats["errors"] += 1
+            logger.exception("Background job %s failed", name)
+        finally:
+            duration = round((time.perf_counter() - started) * 1000, 2)
+            stats["runs"] += 1
+            stats["last_duration_ms"] = duration
+            stats["max_duration_ms"] = max(stats["max_duration_ms"], duration)
+
+    def stats(self) -> dict:
+        now = datetime.now()
+        with self._lock:
+            overdue = sum(1 for when, _, _ in self._heap if when <= now)
+            backlog = len(self._heap)
+        return {
+            "running": self._task is not None,
+            "leader": self.leader.held,
+            "jobs_in_flight": sorted(self._running),
+            "backlog": backlog,
+            "overdue": overdue,
+            "next_due_in_seconds": self._seconds_until_next(now),
+            "jobs": self.job_stats,
+        }
+
+background_scheduler = BackgroundScheduler()
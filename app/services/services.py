@@ -1,22 +1,57 @@
 from sqlalchemy.orm import Session
 from datetime import datetime, timezone
-from app.repositories.repos import UserRepository, ScheduleRepository, ProgramRepository, SystemRepository, BookingRepository
-from app.models import TutorRequest, User, RequestStatus, BookingRequest, TimeSlot
-from app.integration.adapters import SSOAdapter
-from app.domain.rules import ScheduleDomain
+from app.repositories.repos import UserRepository, ScheduleRepository, ProgramRepository, SystemRepository, BookingRepository, FeedVersionRepository, AnalyticsRepository
+from app.models import TutorRequest, User, RequestStatus, BookingRequest, TimeSlot, FeedVersion, NO_LOCAL_PASSWORD
+from app.integration.adapters import sso_adapter, library_adapter
+from app.database import read_replica
+import asyncio
+from starlette.concurrency import run_in_threadpool
+from app.domain.rules import ScheduleDomain, AvailabilityDomain
+from app.services.health import health_monitor
+from app.services.slot_cache import tutor_slot_cache
+from app.services.availability import availability_index
+from app.services.scheduler import background_scheduler, EXPIRE_REQUESTS_JOB
+from app.services.reminders import reminder_index
+from app.services.analytics import analytics_cache
+from app.services.audit import audit_log
+from app.services.shared_cache import shared_cache, TUTORS, PROGRAMS, USER_NAMES
+import os
 from sqlalchemy.exc import IntegrityError
-from datetime import datetime
+from datetime import datetime, timedelta
 from fastapi import HTTPException
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+def cached_user_names(user_repo: UserRepository, user_ids) -> dict:
+    """get_names() through the host-wide shared cache (one entry per user)."""
+    values = shared_cache.load_many(
+        USER_NAMES, user_ids,
+        lambda keys: {str(k): v for k, v in user_repo.get_names([int(k) for k in keys]).items()},
+    )
+    return {int(k): json.loads(v) for k, v in values.items()}
+
 class AuthService:
     def __init__(self, db: Session):
         self.user_repo = UserRepository(db)
-        self.sso_adapter = SSOAdapter()
+        self.sso_adapter = sso_adapter
 
-    def login(self, mssv: str, password: str):
-        if not self.sso_adapter.authenticate(mssv, password):
+    async def login(self, mssv: str, password: str):
+        # SSO chạy async trên event loop; chỉ phần truy vấn DB mới chiếm thread của pool
+        if not await self.sso_adapter.authenticate(mssv, password):
             return None
+        if self.sso_adapter.configured:
+            # SSO đã xác thực: chỉ cần tài khoản tồn tại (tài khoản đồng bộ không có mật khẩu local)
+            return await run_in_threadpool(self.user_repo.get_by_mssv, mssv)
+        return await run_in_threadpool(self._check_local_user, mssv, password)
+
+    def _check_local_user(self, mssv: str, password: str):
         user = self.user_repo.get_by_mssv(mssv)
-        if user and user.password == password:
+        if not user or not password or user.password in (None, "", NO_LOCAL_PASSWORD):
+            return None
+        if user.password == password:
             return user
         return None
 
@@ -28,52 +63,196 @@ class ScheduleService:
     def get_tutor_schedule(self, tutor_id: int):
         return self.schedule_repo.get_slots_by_tutor(tutor_id)
 
+    def get_schedule_etag(self, tutor_id: int) -> str:
+        version = self.schedule_repo.versions.get(FeedVersionRepository.TUTOR_SLOTS, tutor_id)
+        return f'"ts-{tutor_id}-{version}"'
+
     def add_slot(self, tutor_id: int, start_time_str: str):
         # Convert JS ISO string (e.g., '2025-12-10T14:00:00') to Python datetime
         clean_time = start_time_str.replace("T", " ")[:16]
         start_time = datetime.strptime(clean_time, "%Y-%m-%d %H:%M")
         end_time = self.domain.validate_slot_time(start_time)
-        return self.schedule_repo.create_slot(tutor_id, start_time, end_time)
+        slot = self.schedule_repo.create_slot(tutor_id, start_time, end_time)
+        self._sync_availability(tutor_id, start_time, end_time, True)
+        audit_log.record("slot.create", tutor_id, "time_slot", slot.id, start_time=start_time)
+        return slot
 
     def remove_slot(self, tutor_id: int, start_time_str: str):
         clean_time = start_time_str.replace("T", " ")[:16]
         start_time = datetime.strptime(clean_time, "%Y-%m-%d %H:%M")
         self.schedule_repo.delete_slot(tutor_id, start_time)
+        availability_index.invalidate_tutor(tutor_id)
+        audit_log.record("slot.delete", tutor_id, "time_slot", start_time=start_time)
 
     def book_appointment(self, student_id: int, slot_id: int):
         slot = self.schedule_repo.get_slot_by_id(slot_id)
         if not slot or slot.is_booked:
             raise Exception("Khung giờ đã được đặt hoặc không tồn tại")
         self.schedule_repo.mark_booked(slot_id)
-        self.schedule_repo.create_appointment(student_id, slot_id)
+        appt = self.schedule_repo.create_appointment(student_id, slot_id)
+        self._sync_availability(slot.tutor_id, slot.start_time, slot.end_time, False)
+        audit_log.record("appointment.create", student_id, "appointment", appt.id, slot_id=slot_id)
+
+    def _sync_availability(self, tutor_id: int, start_time: datetime, end_time: datetime, is_open: bool):
+        version = self.schedule_repo.versions.get(FeedVersionRepository.TUTOR_SLOTS, tutor_id)
+        availability_index.apply_slot_change(tutor_id, start_time, end_time, is_open, version)
 
 class CoordinationService:
     def __init__(self, db: Session):
         self.prog_repo = ProgramRepository(db)
 
     def get_available_programs(self):
-        return self.prog_repo.get_open_programs()
+        return json.loads(shared_cache.load(PROGRAMS, "open", self._load_open_programs))
+
+    def _load_open_programs(self):
+        return [{"id": p.id, "name": p.name, "semester": p.semester, "status": p.status}
+                for p in self.prog_repo.get_open_programs()]
 
     def register_student_to_program(self, student_id: int, program_id: int):
-        return self.prog_repo.register_student(student_id, program_id)
+        reg = self.prog_repo.register_student(student_id, program_id)
+        audit_log.record("program.register", student_id, "program", program_id)
+        return reg
+
+    def register_students_batch(self, pairs):
+        errors = self.prog_repo.register_students(pairs)
+        for (student_id, program_id), error in zip(pairs, errors):
+            if error is None:
+                audit_log.record("program.register", student_id, "program", program_id)
+        return errors
     
     def create_new_program(self, name: str, semester: str):
-        return self.prog_repo.create_program(name, semester)
+        prog = self.prog_repo.create_program(name, semester)
+        shared_cache.invalidate(PROGRAMS)
+        audit_log.record("program.create", None, "program", prog.id, name=name, semester=semester)
+        return prog
+
+ROLE_COUNTS_TTL_SECONDS = 60
+_role_counts_cache = {"expires": 0.0, "data": None}
+_role_counts_lock = threading.Lock()
+
+class AnalyticsService:
+    """Coordinator analytics; aggregates are cached per semester in analytics_cache."""
+    def __init__(self, db: Session):
+        self.repo = AnalyticsRepository(db)
+
+    def get_report(self, semester: str = None):
+        return analytics_cache.report(self.repo, semester or None)
 
 class SysManagementService:
+    USER_SORTS = ("id", "mssv", "ho_ten")
+    MAX_PAGE_SIZE = 200
+
     def __init__(self, db: Session):
         self.sys_repo = SystemRepository(db)
         self.user_repo = UserRepository(db)
 
-    def get_health(self): return {"status": "ok"}
+    def get_health(self): return health_monitor.liveness()
     def get_all_users(self): return self.user_repo.get_all()
+
+    def list_users(self, role: str = None, mssv_prefix: str = None, sort: str = "id",
+                   desc: bool = False, cursor: str = None, limit: int = 50):
+        if sort not in self.USER_SORTS:
+            raise ValueError(f"Không hỗ trợ sắp xếp theo '{sort}'")
+        limit = max(1, min(limit, self.MAX_PAGE_SIZE))
+        after = self._decode_cursor(cursor) if cursor else None
+        # Lấy dư 1 dòng để biết còn trang sau hay không
+        rows = self.user_repo.list_users(role, mssv_prefix, sort, desc, after, limit + 1)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        users = [{"id": r.id, "mssv": r.mssv, "ho_ten": r.ho_ten, "role": r.role} for r in rows]
+        next_cursor = None
+        if has_more:
+            last = users[-1]
+            next_cursor = self._encode_cursor(last[sort], last["id"])
+        return {"users": users, "next_cursor": next_cursor}
+
+    def get_logs(self, action: str = None, actor_id: int = None, cursor: int = None, limit: int = 50):
+        limit = max(1, min(limit, self.MAX_PAGE_SIZE))
+        rows = self.sys_repo.get_logs(action, actor_id, cursor, limit + 1)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        names = cached_user_names(self.user_repo, {r.actor_id for r in rows if r.actor_id is not None})
+        logs = [{
+            "id": r.id,
+            "created_at": r.created_at,
+            "actor_id": r.actor_id,
+            "actor_name": names.get(r.actor_id),
+            "action": r.action,
+            "entity": r.entity,
+            "entity_id": r.entity_id,
+            "detail": json.loads(r.detail) if r.detail else None,
+        } for r in rows]
+        return {"logs": logs, "next_cursor": logs[-1]["id"] if has_more else None}
+
+    def get_role_counts(self) -> dict:
+        now = time.monotonic()
+        with _role_counts_lock:
+            if _role_counts_cache["data"] is not None and now < _role_counts_cache["expires"]:
+                return _role_counts_cache["data"]
+        counts = self.user_repo.count_by_role()
+        with _role_counts_lock:
+            _role_counts_cache["data"] = counts
+            _role_counts_cache["expires"] = now + ROLE_COUNTS_TTL_SECONDS
+        return counts
+
+    @staticmethod
+    def _encode_cursor(value, user_id: int) -> str:
+        raw = json.dumps([value, user_id]).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> tuple:
+        try:
+            value, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return value, int(user_id)
+        except Exception:
+            raise ValueError("Cursor không hợp lệ")
     
+class LibraryService:
+    """Subject materials from the university library (cached in LibraryAdapter)."""
+    MAX_SUBJECTS = 50
+
+    def __init__(self, adapter=library_adapter):
+        self.adapter = adapter
+
+    async def get_materials(self, subjects):
+        subjects = list(dict.fromkeys(subjects))[:self.MAX_SUBJECTS]
+        results = await asyncio.gather(*(self.adapter.get_documents(s) for s in subjects), return_exceptions=True)
+        # Thư viện lỗi thì thẻ tutor vẫn hiển thị, chỉ không có tài liệu
+        return {s: ([] if isinstance(r, Exception) else r) for s, r in zip(subjects, results)}
+
 class MatchingService:
     def __init__(self, db: Session):
         self.db = db
 
+    DEPARTMENTS = ["Khoa học Máy tính", "Điện - Điện tử", "Cơ khí", "Kỹ thuật Hóa học", "Khoa học Ứng dụng"]
+    SUBJECTS_POOL = ["Giải tích 1", "Vật lý 1", "Đại số tuyến tính", "Cấu trúc dữ liệu", "Lập trình C++", "Hóa đại cương"]
+
     def search_tutors(self):
-        return self.db.query(User).filter(User.role == "tutor").all()
+        return UserRepository(self.db).get_all_tutors()
+
+    def get_tutor_cards(self) -> bytes:
+        """Tutor cards for /api/find_tutor as serialized JSON, shared by all workers of the host."""
+        return shared_cache.load(TUTORS, "cards", self._build_tutor_cards)
+
+    def _build_tutor_cards(self):
+        cards = []
+        for t in self.search_tutors():
+            # Mock details (DB chưa có) sinh cố định theo MSSV (hoặc id khi MSSV trống, vì
+            # Random(None) lấy seed theo thời gian) để thẻ không đổi giữa các lần tải
+            rng = random.Random(t.mssv or f"id:{t.id}")
+            cards.append({
+                "id": t.id,
+                "name": t.ho_ten,
+                "mssv": t.mssv,
+                "department": rng.choice(self.DEPARTMENTS),
+                "rating": round(rng.uniform(4.0, 5.0), 1),
+                "totalSessions": rng.randint(10, 50),
+                "subjects": rng.sample(self.SUBJECTS_POOL, k=2),
+                "bio": "Sinh viên năm 3 với thành tích học tập xuất sắc. Nhiệt tình hỗ trợ các bạn mất gốc.",
+                "avatar": f"https://api.dicebear.com/7.x/avataaars/svg?seed={t.mssv}" # Random avatar based on MSSV
+            })
+        return cards
 
     def select_tutor(self, student_id: int, tutor_id: int) -> bool:
         # Kiểm tra tutor tồn tại
@@ -100,11 +279,63 @@ class MatchingService:
             )
             self.db.add(request)
             self.db.commit()
+            audit_log.record("tutor_request.create", student_id, "tutor_request", request.id, tutor_id=tutor_id)
             return True
         except Exception:
             self.db.rollback()
             return False
 
+    def respond_to_requests_bulk(self, tutor_id: int, decisions) -> dict:
+        """decisions: [(request_id, accept, reason)]. One transaction, one UPDATE per outcome/reason."""
+        request_ids = [request_id for request_id, _, _ in decisions]
+        pending_ids = {
+            r.id for r in self.db.query(TutorRequest.id).filter(
+                TutorRequest.id.in_(request_ids),
+                TutorRequest.tutor_id == tutor_id,
+                TutorRequest.status == RequestStatus.pending
+            ).all()
+        }
+        accept_ids, rejects_by_reason = [], {}
+        for request_id, accept, reason in decisions:
+            if request_id not in pending_ids:
+                continue
+            if accept:
+                accept_ids.append(request_id)
+            else:
+                rejects_by_reason.setdefault(reason or "Không có lý do cụ thể", []).append(request_id)
+            pending_ids.discard(request_id)
+
+        now = datetime.utcnow()
+        try:
+            if accept_ids:
+                self.db.query(TutorRequest).filter(TutorRequest.id.in_(accept_ids)).update(
+                    {TutorRequest.status: RequestStatus.accepted, TutorRequest.responded_at: now},
+                    synchronize_session=False
+                )
+            for reason, ids in rejects_by_reason.items():
+                self.db.query(TutorRequest).filter(TutorRequest.id.in_(ids)).update(
+                    {TutorRequest.status: RequestStatus.rejected, TutorRequest.responded_at: now,
+                     TutorRequest.reject_reason: reason},
+                    synchronize_session=False
+                )
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            raise Exception("Không thể cập nhật: sinh viên đã có yêu cầu ở trạng thái này với bạn.")
+
+        for request_id in accept_ids:
+            audit_log.record("tutor_request.accept", tutor_id, "tutor_request", request_id)
+        for reason, ids in rejects_by_reason.items():
+            for request_id in ids:
+                audit_log.record("tutor_request.reject", tutor_id, "tutor_request", request_id, reason=reason)
+        rejected = [i for ids in rejects_by_reason.values() for i in ids]
+        handled = set(accept_ids) | set(rejected)
+        return {
+            "accepted": accept_ids,
+            "rejected": rejected,
+            "skipped": [i for i in request_ids if i not in handled],
+        }
+
     def get_pending_requests_for_tutor(self, tutor_id: int):
         return (self.db.query(TutorRequest)
                 .filter(TutorRequest.tutor_id == tutor_id,
@@ -130,6 +361,8 @@ class MatchingService:
 
         request.responded_at = datetime.utcnow()
         self.db.commit()
+        audit_log.record("tutor_request.accept" if accept else "tutor_request.reject", tutor_id,
+                         "tutor_request", request_id, **({} if accept else {"reason": request.reject_reason}))
         return True
     
 class BookingService:
@@ -137,44 +370,75 @@ class BookingService:
         self.db = db
         self.booking_repo = BookingRepository(db)
         self.schedule_repo = ScheduleRepository(db)
+        self._tutor_versions = {}
+
+    # Feed slot lọc theo thời gian hiện tại -> ETag cũng hết hạn theo từng khoảng này
+    SLOTS_ETAG_TIME_BUCKET_SECONDS = 300
+
+    def get_student_schedule_etag(self, student_id) -> str:
+        version = self.booking_repo.versions.get(FeedVersionRepository.STUDENT_BOOKINGS, student_id)
+        return f'"sb-{student_id}-{version}"'
+
+    def get_accepted_tutor_versions(self, student_id) -> dict:
+        """tutor_id -> slot feed version, for every tutor who accepted this student."""
+        if student_id not in self._tutor_versions:
+            rows = (
+                self.db.query(TutorRequest.tutor_id, FeedVersion.version)
+                .outerjoin(FeedVersion, (FeedVersion.owner_id == TutorRequest.tutor_id)
+                           & (FeedVersion.scope == FeedVersionRepository.TUTOR_SLOTS))
+                .filter(
+                    TutorRequest.student_id == student_id,
+                    TutorRequest.status == RequestStatus.accepted
+                )
+                .order_by(TutorRequest.tutor_id)
+                .all()
+            )
+            self._tutor_versions[student_id] = {t: v or 0 for t, v in rows}
+        return self._tutor_versions[student_id]
+
+    def get_slots_etag(self, student_id) -> str:
+        versions = self.get_accepted_tutor_versions(student_id)
+        bucket = int(time.time()) // self.SLOTS_ETAG_TIME_BUCKET_SECONDS
+        raw = f"{student_id}|{bucket}|" + ",".join(f"{t}:{v}" for t, v in versions.items())
+        return '"sl-' + hashlib.sha1(raw.encode()).hexdigest()[:20] + '"'
 
     def get_slots_of_tutors(self, student_id):
-        # Tìm tutors đã accepted ở bảng TutorRequest
-        from app.models import TutorRequest, RequestStatus, TimeSlot, User
+        # Tìm tutors đã accepted ở bảng TutorRequest, slot rảnh lấy từ cache theo từng tutor
+        versions = self.get_accepted_tutor_versions(student_id)
+        cached, missing = tutor_slot_cache.get_many(versions)
 
         current_time = datetime.now()
-        
-        accepted_tutor_ids = (
-            self.db.query(TutorRequest.tutor_id)
-            .filter(
-                TutorRequest.student_id == student_id,
-                TutorRequest.status == RequestStatus.accepted
+        if missing:
+            loaded = {tutor_id: [] for tutor_id in missing}
+            results = (
+                self.db.query(TimeSlot, User.ho_ten)
+                .join(User, TimeSlot.tutor_id == User.id)
+                .filter(TimeSlot.tutor_id.in_(missing))
+                .filter(TimeSlot.is_closed == False)
+                .filter(TimeSlot.is_booked == False)
+                .filter(TimeSlot.start_time > current_time)
+                .order_by(TimeSlot.start_time.asc())
+                .all()
             )
-            .subquery()
-        )
-
-        results = (
-            self.db.query(TimeSlot, User.ho_ten)
-            .join(User, TimeSlot.tutor_id == User.id)
-            .filter(TimeSlot.tutor_id.in_(accepted_tutor_ids))
-            .filter(TimeSlot.is_booked == False)
-            .filter(TimeSlot.start_time > current_time)
-            .order_by(TimeSlot.start_time.asc())
-            .all()
-        )
-
+            for slot, tutor_name in results:
+                loaded[slot.tutor_id].append({
+                    "id": slot.id,
+                    "tutor_id": slot.tutor_id,
+                    "tutor_name": tutor_name,
+                    "start_time": slot.start_time,
+                    "end_time": slot.end_time,
+                    "is_booked": slot.is_booked,
+                })
+            for tutor_id, slots in loaded.items():
+                tutor_slot_cache.put(tutor_id, versions[tutor_id], slots)
+            cached.update(loaded)
+
+        # Cache giữ cả slot vừa qua giờ bắt đầu -> lọc lại theo thời điểm đọc
         formatted_slots = [
-            {
-                "id": slot.id,
-                "tutor_id": slot.tutor_id,
-                "tutor_name": tutor_name,
-                "start_time": slot.start_time,
-                "end_time": slot.end_time,
-                "is_booked": slot.is_booked,
-            }
-            for slot, tutor_name in results
+            slot for slots in cached.values() for slot in slots
+            if slot["start_time"] > current_time
         ]
-
+        formatted_slots.sort(key=lambda slot: slot["start_time"])
         return formatted_slots
 
     def create_booking_request(self, student_id, slot_id, note=None):
@@ -204,12 +468,16 @@ class BookingService:
         )
 
         try:
-            return self.booking_repo.create_request(
+            req = self.booking_repo.create_request(
                 student_id=student_id,
                 tutor_id=slot.tutor_id,
                 slot_id=slot_id,
                 note=note
             )
+            # Tự động hết hạn nếu tutor chưa phản hồi khi buổi học bắt đầu
+            background_scheduler.schedule(EXPIRE_REQUESTS_JOB, slot.start_time)
+            audit_log.record("booking.create", student_id, "booking_request", req.id, slot_id=slot_id)
+            return req
         except IntegrityError:
             self.db.rollback()
             raise HTTPException(
@@ -224,7 +492,8 @@ class BookingService:
         return self.booking_repo.get_by_student(student_id)
 
     def cancel_booking(self, student_id, req_id):
-        self.booking_repo.delete_request(req_id, student_id)
+        if self.booking_repo.delete_request(req_id, student_id):
+            audit_log.record("booking.cancel", student_id, "booking_request", req_id)
 
     def tutor_get_pending_requests(self, tutor_id):
         return self.booking_repo.get_pending_requests(tutor_id)
@@ -235,6 +504,75 @@ class BookingService:
     def tutor_get_requests(self, tutor_id):
         return self.booking_repo.get_by_tutor(tutor_id)
 
+    def _queue_reminders(self, req_ids):
+        now = datetime.now()
+        for row in self.booking_repo.get_sessions_by_ids(req_ids):
+            if row.start_time > now:
+                reminder_index.add(dict(row._mapping))
+
+    def tutor_respond_bulk(self, tutor_id, decisions) -> dict:
+        """decisions: [(req_id, 'accept' | 'reject')]. For several accepts on one slot the first wins."""
+        for _, action in decisions:
+            if action not in ("accept", "reject"):
+                raise Exception("Hành động không hợp lệ.")
+        pending = {r.id: r for r in self.booking_repo.get_pending_by_ids(tutor_id, [i for i, _ in decisions])}
+        booked_slots = self.schedule_repo.get_booked_slot_ids({r.slot_id for r in pending.values()})
+
+        accept_ids, reject_rows, taken_slots, skipped = [], [], set(booked_slots), []
+        for req_id, action in decisions:
+            req = pending.pop(req_id, None)
+            if req is None:
+                skipped.append(req_id)
+            elif action == "accept" and req.slot_id not in taken_slots:
+                accept_ids.append(req_id)
+                taken_slots.add(req.slot_id)
+            else:
+                reject_rows.append(req)
+        reject_ids = [r.id for r in reject_rows]
+
+        failed = []
+        try:
+            auto_rejected = self.booking_repo.bulk_update_status(tutor_id, accept_ids, reject_ids)
+        except IntegrityError:
+            # unique_slot_booking: slot đã có một request ở trạng thái đó -> xử lý từng dòng
+            self.db.rollback()
+            accept_ids, reject_ids, auto_rejected, failed = self._respond_row_by_row(tutor_id, accept_ids, reject_rows)
+        if accept_ids:
+            self._queue_reminders(accept_ids)
+        for action, ids in (("booking.accept", accept_ids), ("booking.reject", reject_ids),
+                            ("booking.auto_reject", auto_rejected)):
+            for req_id in ids:
+                audit_log.record(action, tutor_id, "booking_request", req_id)
+        return {
+            "accepted": accept_ids,
+            "rejected": reject_ids,
+            "auto_rejected": auto_rejected,
+            "skipped": skipped,
+            "failed": failed,
+        }
+
+    def _respond_row_by_row(self, tutor_id, accept_ids, reject_rows):
+        """Fallback of tutor_respond_bulk: one transaction per request. Requests that still
+        conflict stay pending and are returned in `failed`, like expire_stale_requests."""
+        accepted, failed = [], []
+        for req_id in accept_ids:
+            try:
+                self.booking_repo.bulk_update_status(tutor_id, [req_id], [], reject_competitors=False)
+                accepted.append(req_id)
+            except IntegrityError:
+                self.db.rollback()
+                failed.append(req_id)
+        results = {"rejected": [], "auto_rejected": []}
+        for outcome, rows in (("rejected", reject_rows), ("auto_rejected", self.booking_repo.get_competing(accepted, [r.id for r in reject_rows]))):
+            for row in rows:
+                try:
+                    self.booking_repo.reject_requests([row])
+                    results[outcome].append(row.id)
+                except IntegrityError:
+                    self.db.rollback()
+                    failed.append(row.id)
+        return accepted, results["rejected"], results["auto_rejected"], failed
+
     def tutor_respond(self, tutor_id, req_id, action: str):
         req = self.booking_repo.get_by_id(req_id)
         if not req or req.tutor_id != tutor_id:
@@ -244,11 +582,175 @@ class BookingService:
         
         if action == 'accept':
             updated_req = self.booking_repo.update_status(req_id, "accepted")
+            self._queue_reminders([req_id])
+            audit_log.record("booking.accept", tutor_id, "booking_request", req_id)
             return updated_req
             
         elif action == 'reject':
             updated_req = self.booking_repo.update_status(req_id, "rejected")
+            audit_log.record("booking.reject", tutor_id, "booking_request", req_id)
             return updated_req
         
         else:
             raise Exception("Hành động không hợp lệ.")
+
+class AvailabilityService:
+    """Free-time search over the bitset availability index."""
+    HORIZON_WEEKS = 8
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.user_repo = UserRepository(db)
+        self.schedule_repo = ScheduleRepository(db)
+        self.booking_repo = BookingRepository(db)
+        self.booking_service = BookingService(db)
+
+    def _tutor_weeks(self, student_id) -> dict:
+        # Version và slot phải đọc từ cùng một nguồn (replica được ghim cho cả session), version trước:
+        # version từ primary + slot từ replica đang trễ sẽ cache lịch cũ dưới version mới
+        with read_replica(self.db):
+            versions = self.booking_service.get_accepted_tutor_versions(student_id)
+            found, missing = availability_index.get_tutors(versions)
+            if not missing:
+                return found
+            rows = self.schedule_repo.get_open_slot_times(missing, datetime.now())
+        intervals = {tutor_id: [] for tutor_id in missing}
+        for tutor_id, start, end in rows:
+            intervals[tutor_id].append((start, end))
+        for tutor_id, tutor_intervals in intervals.items():
+            weeks = AvailabilityDomain.encode(tutor_intervals)
+            availability_index.put_tutor(tutor_id, versions[tutor_id], weeks)
+            found[tutor_id] = weeks
+        return found
+
+    def _student_weeks(self, student_id) -> dict:
+        version = self.booking_repo.versions.get(FeedVersionRepository.STUDENT_BOOKINGS, student_id)
+        weeks = availability_index.get_student(student_id, version)
+        if weeks is None:
+            weeks = AvailabilityDomain.encode(self.booking_repo.get_busy_times(student_id, datetime.now()))
+            availability_index.put_student(student_id, version, weeks)
+        return weeks
+
+    def earliest_common_free(self, student_id, duration_minutes: int = 60):
+        """First block of `duration_minutes` where one accepted tutor is open and the student is free."""
+        length = -(-duration_minutes // AvailabilityDomain.GRANULARITY_MINUTES)
+        tutor_weeks = self._tutor_weeks(student_id)
+        busy = self._student_weeks(student_id)
+        now = datetime.now()
+        this_week = AvailabilityDomain.week_start(now)
+        # Bỏ các block đã bắt đầu trong tuần hiện tại
+        elapsed = -(-int((now - this_week).total_seconds() // 60) // AvailabilityDomain.GRANULARITY_MINUTES)
+        past = AvailabilityDomain.range_mask(0, elapsed)
+
+        week_bits = AvailabilityDomain.BLOCKS_PER_WEEK
+        in_week = AvailabilityDomain.range_mask(0, week_bits)
+        for offset in range(self.HORIZON_WEEKS):
+            week = this_week + timedelta(days=7 * offset)
+            next_week = week + timedelta(days=7)
+            blocked = busy.get(week, 0) | (past if offset == 0 else 0)
+            # Nối đầu tuần sau vào để khoảng trống vắt qua đêm Chủ nhật -> thứ Hai vẫn được tìm thấy
+            blocked |= busy.get(next_week, 0) << week_bits
+            runs = {
+                tutor_id: AvailabilityDomain.runs(
+                    (weeks.get(week, 0) | weeks.get(next_week, 0) << week_bits) & ~blocked, length
+                ) & in_week
+                for tutor_id, weeks in tutor_weeks.items()
+            }
+            any_run = 0
+            for bits in runs.values():
+                any_run |= bits
+            index = AvailabilityDomain.lowest_bit(any_run)
+            if index < 0:
+                continue
+            tutor_ids = [tutor_id for tutor_id, bits in runs.items() if bits >> index & 1]
+            names = cached_user_names(self.user_repo, tutor_ids)
+            start = AvailabilityDomain.block_time(week, index)
+            return {
+                "start_time": start,
+                "end_time": start + timedelta(minutes=length * AvailabilityDomain.GRANULARITY_MINUTES),
+                "tutors": [{"id": t, "name": names.get(t)} for t in tutor_ids],
+            }
+        return None
+
+    def tutors_free_in_window(self, student_id, weekday: int, start_minute: int, end_minute: int, week_offset: int = 0):
+        """Accepted tutors whose open slots cover the whole window (e.g. Tuesday 13:00-17:00)."""
+        g = AvailabilityDomain.GRANULARITY_MINUTES
+        day_offset = weekday * AvailabilityDomain.BLOCKS_PER_DAY
+        mask = AvailabilityDomain.range_mask(day_offset + start_minute // g, day_offset - (-end_minute // g))
+        week = AvailabilityDomain.week_start(datetime.now()) + timedelta(days=7 * week_offset)
+
+        tutor_weeks = self._tutor_weeks(student_id)
+        busy = self._student_weeks(student_id)
+        tutor_ids = [t for t, weeks in tutor_weeks.items() if mask and weeks.get(week, 0) & mask == mask]
+        names = cached_user_names(self.user_repo, tutor_ids)
+        window_start = week + timedelta(days=weekday, minutes=start_minute)
+        return {
+            "window_start": window_start,
+            "window_end": week + timedelta(days=weekday, minutes=end_minute),
+            "tutors": [{"id": t, "name": names.get(t)} for t in tutor_ids],
+            "all_tutors_free": bool(tutor_weeks) and len(tutor_ids) == len(tutor_weeks),
+            "student_free": busy.get(week, 0) & mask == 0,
+        }
+
+class MaintenanceService:
+    """Housekeeping run by the background scheduler (app/services/jobs.py)."""
+    BATCH_SIZE = 500
+    # Slot rảnh đã kết thúc bao lâu thì bị đánh dấu đóng
+    PAST_SLOT_RETENTION_DAYS = int(os.getenv("PAST_SLOT_RETENTION_DAYS", "1"))
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.booking_repo = BookingRepository(db)
+        self.schedule_repo = ScheduleRepository(db)
+
+    def get_pending_deadlines(self):
+        return self.booking_repo.get_pending_slot_starts(datetime.now())
+
+    def expire_stale_requests(self) -> int:
+        """Rejects pending booking requests whose slot has started, in batches."""
+        now = datetime.now()
+        expired, failed = 0, set()
+        while True:
+            rows = self.booking_repo.get_stale_pending(now, self.BATCH_SIZE, failed)
+            if not rows:
+                break
+            try:
+                self.booking_repo.reject_requests(rows)
+                expired += len(rows)
+            except IntegrityError:
+                # unique_slot_booking: slot đã có một request bị từ chối -> xử lý từng dòng
+                self.db.rollback()
+                for row in rows:
+                    try:
+                        self.booking_repo.reject_requests([row])
+                        expired += 1
+                    except IntegrityError:
+                        self.db.rollback()
+                        failed.add(row.id)
+            if len(rows) < self.BATCH_SIZE:
+                break
+        if expired:
+            audit_log.record("booking.expire", None, "booking_request", count=expired)
+        return expired
+
+    def get_sessions_to_remind(self, until: datetime):
+        return [dict(row._mapping) for row in self.booking_repo.get_sessions_to_remind(datetime.now(), until)]
+
+    def claim_reminders(self, req_ids, token: str) -> set:
+        return self.booking_repo.claim_reminders(req_ids, token)
+
+    def close_past_slots(self) -> int:
+        """Marks unbooked slots that ended before the retention window as closed (never deletes)."""
+        cutoff = datetime.now() - timedelta(days=self.PAST_SLOT_RETENTION_DAYS)
+        closed = 0
+        while True:
+            rows = self.schedule_repo.get_closable_slots(cutoff, self.BATCH_SIZE)
+            if not rows:
+                break
+            self.schedule_repo.close_slots(rows)
+            closed += len(rows)
+            if len(rows) < self.BATCH_SIZE:
+                break
+        if closed:
+            audit_log.record("slot.close_past", None, "time_slot", count=closed)
+        return closed
@@ -0,0 +1,163 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_ENABLED = os.getenv("SHARED_CACHE_ENABLED", "1") == "1"
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", "shared_cache.sqlite3")
+# Backstop for writes made on other hosts (each host has its own file)
+SHARED_CACHE_TTL_SECONDS = float(os.getenv("SHARED_CACHE_TTL_SECONDS", "300"))
+SHARED_CACHE_MMAP_BYTES = int(os.getenv("SHARED_CACHE_MMAP_BYTES", str(64 * 1024 * 1024)))
+SWEEP_EVERY_PUTS = 500
+
+# Namespaces; invalidate() one when the rows behind it change
+TUTORS = "tutors"
+PROGRAMS = "programs"
+USER_NAMES = "user_names"
+
+def dumps(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, default=str, separators=(",", ":")).encode()
+
+class SharedCache:
+    """
+    Host-wide cache of pre-serialized JSON values in a local SQLite (WAL) file, read
+    through SQLite's memory map, so every uvicorn worker on the host shares one copy.
+
+    Keys are versioned per namespace: invalidate() bumps the namespace generation and
+    every worker's next read misses. A miss returns the generation it saw; values are
+    stored under that generation, so a load racing an invalidation is never served.
+    Hits return the stored bytes as-is (no JSON decode/encode) for Response bodies.
+    """
+
+    def __init__(self, path: str = SHARED_CACHE_PATH, ttl: float = SHARED_CACHE_TTL_SECONDS,
+                 mmap_bytes: int = SHARED_CACHE_MMAP_BYTES, enabled: bool = SHARED_CACHE_ENABLED):
+        self.path = path
+        self.ttl = ttl
+        self.mmap_bytes = mmap_bytes
+        self.enabled = enabled
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.stats = {"hits": 0, "misses": 0, "loads": 0, "invalidations": 0, "errors": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.execute("CREATE TABLE IF NOT EXISTS generations "
+                                 "(namespace TEXT PRIMARY KEY, generation INTEGER NOT NULL) WITHOUT ROWID")
+                    conn.execute("CREATE TABLE IF NOT EXISTS entries (namespace TEXT, key TEXT, "
+                                 "generation INTEGER NOT NULL, expires_at REAL NOT NULL, value BLOB NOT NULL, "
+                                 "PRIMARY KEY (namespace, key))")
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self.stats[name] += n
+
+    def get_many(self, namespace: str, keys: Iterable[str]) -> Tuple[int, Dict[str, bytes]]:
+        """(current generation, {key: serialized value}) for the keys still cached."""
+        keys = list(keys)
+        # Một câu lệnh = một snapshot: generation và entry luôn khớp nhau
+        rows = self._connect().execute(
+            "SELECT g.generation, e.key, e.value FROM "
+            "(SELECT COALESCE((SELECT generation FROM generations WHERE namespace = ?), 0) AS generation) g "
+            f"LEFT JOIN entries e ON e.namespace = ? AND e.key IN ({','.join('?' * len(keys)) or 'NULL'}) "
+            "AND e.generation = g.generation AND e.expires_at > ?",
+            (namespace, namespace, *keys, time.time()),
+        ).fetchall()
+        generation = rows[0][0]
+        found = {key: value for _, key, value in rows if key is not None}
+        self._count("hits", len(found))
+        self._count("misses", len(keys) - len(found))
+        return generation, found
+
+    def put_many(self, namespace: str, generation: int, values: Dict[str, bytes], ttl: Optional[float] = None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        conn = self._connect()
+        conn.executemany(
+            "INSERT OR REPLACE INTO entries (namespace, key, generation, expires_at, value) VALUES (?, ?, ?, ?, ?)",
+            [(namespace, key, generation, expires_at, value) for key, value in values.items()],
+        )
+        with self._lock:
+            self._puts += 1
+            sweep = self._puts % SWEEP_EVERY_PUTS == 0
+        if sweep:
+            conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+
+    def load_many(self, namespace: str, keys: Iterable, loader: Callable[[list], dict]) -> Dict[str, bytes]:
+        """
+        Serialized values for `keys`; the missing ones come from loader(missing keys),
+        which returns {key: JSON-able value}. Keys absent from its result are cached as null.
+        """
+        keys = [str(k) for k in keys]
+        if not self.enabled:
+            return {k: dumps(v) for k, v in loader(keys).items()}
+        try:
+            generation, found = self.get_many(namespace, keys)
+        except sqlite3.Error:
+            # Cache hỏng/bị khóa thì đọc thẳng DB, không làm lỗi request
+            self._count("errors")
+            logger.exception("Shared cache read failed (%s)", namespace)
+            return {k: dumps(v) for k, v in loader(keys).items()}
+        missing = [k for k in keys if k not in found]
+        if missing:
+            self._count("loads")
+            loaded = loader(missing)
+            fresh = {k: dumps(loaded.get(k)) for k in missing}
+            try:
+                self.put_many(namespace, generation, fresh)
+            except sqlite3.Error:
+                self._count("errors")
+                logger.exception("Shared cache write failed (%s)", namespace)
+            found.update(fresh)
+        return found
+
+    def load(self, namespace: str, key: str, loader: Callable[[], object]) -> bytes:
+        return self.load_many(namespace, [key], lambda _: {key: loader()})[key]
+
+    def invalidate(self, namespace: str):
+        """Bumps the namespace generation: every worker on this host misses on its next read."""
+        if not self.enabled:
+            return
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("INSERT INTO generations VALUES (?, 1) ON CONFLICT (namespace) "
+                             "DO UPDATE SET generation = generation + 1", (namespace,))
+                # Các entry thế hệ cũ không còn đọc được nữa
+                conn.execute("DELETE FROM entries WHERE namespace = ? AND generation < "
+                             "(SELECT generation FROM generations WHERE namespace = ?)", (namespace, namespace))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            # Không bump được thì TTL vẫn giới hạn thời gian dữ liệu cũ
+            self._count("errors")
+            logger.exception("Shared cache invalidation failed (%s)", namespace)
+            return
+        self._count("invalidations")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        total = stats["hits"] + stats["misses"]
+        return {**stats, "hit_rate": round(stats["hits"] / total, 3) if total else 0.0, "path": self.path}
+
+shared_cache = SharedCache()
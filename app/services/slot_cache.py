@@ -0,0 +1,53 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+class TutorSlotCache:
+    """
+    Open future slots per tutor, shared by every student of that tutor.
+    Entries are tagged with the tutor's feed version (feed_versions table),
+    so any slot create/delete/book on any worker invalidates them.
+    """
+
+    def __init__(self, max_tutors: int = 5000):
+        self.max_tutors = max_tutors
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, versions: Dict[int, int]) -> Tuple[Dict[int, List[dict]], List[int]]:
+        found, missing = {}, []
+        with self._lock:
+            for tutor_id, version in versions.items():
+                entry = self._entries.get(tutor_id)
+                if entry is not None and entry[0] == version:
+                    self._entries.move_to_end(tutor_id)
+                    found[tutor_id] = entry[1]
+                    self.hits += 1
+                else:
+                    missing.append(tutor_id)
+                    self.misses += 1
+        return found, missing
+
+    def put(self, tutor_id: int, version: int, slots: List[dict]):
+        with self._lock:
+            self._entries[tutor_id] = (version, slots)
+            self._entries.move_to_end(tutor_id)
+            while len(self._entries) > self.max_tutors:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tutor_id: int):
+        with self._lock:
+            self._entries.pop(tutor_id, None)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "tutors": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+tutor_slot_cache = TutorSlotCache()
@@ -0,0 +1,35 @@
+// Idempotency-Key cho các POST có thể bị gửi lại (đặt lịch, chọn tutor, đăng ký chương trình).
+// Gốc khóa do server sinh cho mỗi lần render trang (data-key của thẻ script), nên không cần
+// crypto.randomUUID (chỉ có trên HTTPS/localhost). Cùng một nội dung gửi lại sau lỗi mạng dùng
+// lại đúng khóa cũ; khóa chỉ bị bỏ khi server đã trả lời.
+const idempotency = {
+    base: document.currentScript.dataset.key,
+    seq: 0,
+    pending: {},
+
+    key(body) {
+        if (!(body in this.pending)) {
+            this.pending[body] = `${this.base}-${this.seq++}`;
+        }
+        return this.pending[body];
+    },
+
+    answered(body) {
+        delete this.pending[body];
+    },
+
+    // fetch() POST JSON với khóa của `payload`; lỗi mạng cũng giữ khóa cho lần thử lại
+    async post(url, payload) {
+        const body = JSON.stringify(payload);
+        const res = await fetch(url, {
+            method: "POST",
+            headers: { "Content-Type": "application/json", "Idempotency-Key": this.key(body) },
+            body,
+        });
+        // 409 = lần gửi trước còn đang chạy, 5xx = server không lưu kết quả: thử lại vẫn cùng khóa
+        if (res.status !== 409 && res.status < 500) {
+            this.answered(body);
+        }
+        return res;
+    },
+};
@@ -0,0 +1,26 @@
+import os
+from jinja2 import FileSystemBytecodeCache
+from fastapi.templating import Jinja2Templates
+from app.assets import asset_url
+from app.idempotency import new_idempotency_key
+
+TEMPLATE_DIR = "app/templates"
+# Bytecode cache trên đĩa: worker khởi động lại không phải biên dịch lại template
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", "app/.template_cache")
+# Production: không stat file template mỗi lần render
+TEMPLATE_AUTO_RELOAD = os.getenv("TEMPLATE_AUTO_RELOAD", "0") == "1"
+
+# Single template environment shared by main.py and the routers
+templates = Jinja2Templates(directory=TEMPLATE_DIR)
+templates.env.auto_reload = TEMPLATE_AUTO_RELOAD
+os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+templates.env.bytecode_cache = FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+templates.env.globals["asset_url"] = asset_url
+templates.env.globals["idempotency_key"] = new_idempotency_key
+
+def precompile_templates() -> int:
+    """Loads every template once so the first request does not pay for compilation."""
+    names = templates.env.list_templates(extensions=["html"])
+    for name in names:
+        templates.env.get_template(name)
+    return len(names)
@@ -46,7 +46,9 @@ CREATE TABLE time_slots (
     start_time DATETIME NOT NULL,
     end_time DATETIME NOT NULL,
     is_booked TINYINT(1) DEFAULT 0,
-    FOREIGN KEY (tutor_id) REFERENCES users(id)
+    is_closed TINYINT(1) NOT NULL DEFAULT 0,
+    FOREIGN KEY (tutor_id) REFERENCES users(id),
+    INDEX ix_time_slots_tutor_open (tutor_id, is_closed, start_time)
 );
 
 -- ============================
@@ -71,12 +73,39 @@ CREATE TABLE booking_requests (
     slot_id INT NOT NULL,
     note TEXT,
     status ENUM('pending', 'accepted', 'rejected') DEFAULT 'pending',
+    reminder_token VARCHAR(32) NULL,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (student_id) REFERENCES users(id),
     FOREIGN KEY (tutor_id) REFERENCES users(id),
     FOREIGN KEY (slot_id) REFERENCES time_slots(id)
 );
 
+-- ============================
+--  TABLE: FEED VERSIONS (ETag cho lịch)
+-- ============================
+CREATE TABLE feed_versions (
+    scope VARCHAR(32) NOT NULL,
+    owner_id INT NOT NULL,
+    version INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, owner_id)
+);
+
+-- ============================
+--  TABLE: AUDIT LOGS (append-only, ghi theo lô)
+-- ============================
+CREATE TABLE audit_logs (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    created_at DATETIME NOT NULL,
+    actor_id INT NULL,
+    action VARCHAR(50) NOT NULL,
+    entity VARCHAR(50) NULL,
+    entity_id INT NULL,
+    detail TEXT NULL,
+    INDEX ix_audit_logs_actor (actor_id, id),
+    INDEX ix_audit_logs_action (action, id),
+    INDEX ix_audit_logs_created_at (created_at)
+);
+
 -- ============================
 --  INSERT USERS
 -- ============================
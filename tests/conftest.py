@@ -0,0 +1,60 @@
+import os
+import tempfile
+
+# Chạy test không cần MySQL: tắt các thành phần nền trước khi import app
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("AUDIT_ENABLED", "0")
+os.environ.setdefault("BACKGROUND_JOBS_ENABLED", "0")
+os.environ.setdefault("SHARED_CACHE_ENABLED", "0")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+os.environ.setdefault("LOCK_DIR", tempfile.gettempdir())
+
+import pytest
+from sqlalchemy import create_engine, UniqueConstraint
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+import app.models  # noqa: F401
+
+# SQLite không hỗ trợ UNIQUE ... DEFERRABLE (chỉ MySQL/PostgreSQL dùng tới)
+for table in Base.metadata.tables.values():
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint) and constraint.deferrable:
+            constraint.deferrable = None
+            constraint.initially = None
+
+def make_engine(path):
+    eng = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(eng)
+    return eng
+
+@pytest.fixture
+def engine(tmp_path):
+    eng = make_engine(tmp_path / "primary.sqlite3")
+    yield eng
+    eng.dispose()
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine, autoflush=False)
+
+@pytest.fixture
+def client(session_factory):
+    """TestClient on app.main with get_db bound to the test database."""
+    from fastapi.testclient import TestClient
+    from app.database import get_db
+    from app.main import app
+
+    def test_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = test_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+
+def login(client, mssv, password=None):
+    res = client.post("/api/login", json={"mssv": mssv, "password": password or mssv})
+    assert res.json()["success"], res.text
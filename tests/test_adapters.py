@@ -0,0 +1,141 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import pytest
+from app.integration.adapters import (SSOAdapter, DataCoreAdapter, LibraryAdapter, HttpClientPool,
+                                      IntegrationUnavailable)
+from app.integration.library_cache import TwoTierCache
+
+class StandIn:
+    """Local HTTP server answering each path from `routes`: path -> (status, body) or callable(query)."""
+
+    def __init__(self):
+        self.routes = {}
+        self.calls = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _answer(self):
+                url = urlparse(self.path)
+                stand_in.calls.append(url.path)
+                route = stand_in.routes.get(url.path, (404, {}))
+                status, body = route(parse_qs(url.query)) if callable(route) else route
+                raw = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                try:
+                    self.wfile.write(raw)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client đã hủy request (timeout/cancel) là điều test muốn
+
+            def do_GET(self):
+                self._answer()
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self._answer()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+@pytest.fixture
+def stand_in():
+    server = StandIn()
+    yield server
+    server.server.shutdown()
+    server.server.server_close()
+
+def run(make_coro):
+    async def main():
+        pool = HttpClientPool()
+        try:
+            return await make_coro(pool)
+        finally:
+            await pool.aclose()
+    return asyncio.run(main())
+
+def test_sso_authenticates_and_caches(stand_in):
+    stand_in.routes["/authenticate"] = (200, {"authenticated": True})
+
+    async def scenario(pool):
+        sso = SSOAdapter(stand_in.url, pool=pool)
+        return [await sso.authenticate("1", "pw"), await sso.authenticate("1", "pw")]
+
+    assert run(scenario) == [True, True]
+    assert stand_in.calls == ["/authenticate"]
+
+def test_sso_malformed_body_is_unavailable(stand_in):
+    stand_in.routes["/authenticate"] = (200, b"<html>maintenance</html>")
+
+    async def scenario(pool):
+        with pytest.raises(IntegrationUnavailable):
+            await SSOAdapter(stand_in.url, pool=pool).authenticate("1", "pw")
+
+    run(scenario)
+
+def test_breaker_opens_then_recovers(stand_in):
+    stand_in.routes["/authenticate"] = (503, {})
+
+    async def scenario(pool):
+        sso = SSOAdapter(stand_in.url, pool=pool)
+        sso.breaker.reset_timeout = 0.2
+        for _ in range(sso.breaker.failure_threshold):
+            with pytest.raises(IntegrationUnavailable):
+                await sso.authenticate("1", "pw")
+        assert sso.breaker.state == "open"
+        calls = len(stand_in.calls)
+        with pytest.raises(IntegrationUnavailable):
+            await sso.authenticate("1", "pw")
+        assert len(stand_in.calls) == calls  # fail fast, không gọi server
+        await asyncio.sleep(0.25)
+        stand_in.routes["/authenticate"] = (200, {"authenticated": False})
+        assert await sso.authenticate("1", "pw") is False
+        return sso.breaker.state
+
+    assert run(scenario) == "closed"
+
+def test_cancelled_trial_does_not_wedge_breaker(stand_in):
+    def slow(query):
+        threading.Event().wait(0.5)
+        return 200, {"authenticated": True}
+    stand_in.routes["/authenticate"] = slow
+
+    async def scenario(pool):
+        sso = SSOAdapter(stand_in.url, pool=pool)
+        sso.breaker.opened_at, sso.breaker.reset_timeout = 0.0, 0.0  # half-open
+        trial = asyncio.ensure_future(sso.authenticate("1", "pw"))
+        await asyncio.sleep(0.1)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        return sso.breaker.allow()
+
+    assert run(scenario) is True
+
+def test_datacore_roster_pages(stand_in):
+    pages = {None: ([{"mssv": "1"}, {"mssv": "2"}], "c2"), "c2": ([{"mssv": "3"}], None)}
+    stand_in.routes["/users"] = lambda q: (200, dict(zip(("users", "next_cursor"), pages[q.get("cursor", [None])[0]])))
+
+    async def scenario(pool):
+        adapter = DataCoreAdapter(stand_in.url, pool=pool)
+        return [([u["mssv"] for u in users], cursor) async for users, cursor in adapter.iter_roster(page_size=2)]
+
+    assert run(scenario) == [(["1", "2"], "c2"), (["3"], None)]
+
+def test_library_documents_are_cached(stand_in, tmp_path):
+    stand_in.routes["/documents"] = lambda q: (200, {"documents": [f"Giáo trình {q['subject'][0]}"]})
+
+    async def scenario(pool):
+        library = LibraryAdapter(stand_in.url, cache=TwoTierCache(path=str(tmp_path / "lib.sqlite3")), pool=pool)
+        return [await library.get_documents("CO2003"), await library.get_documents("CO2003")]
+
+    assert run(scenario) == [["Giáo trình CO2003"]] * 2
+    assert stand_in.calls == ["/documents"]
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+from app.models import User, Program, Registration, TimeSlot, BookingRequest, TutorRequest, RequestStatus
+from app.repositories.repos import AnalyticsRepository
+from app.services.analytics import SemesterAnalytics
+
+# Monday 2026-03-02 09:00
+MONDAY_9 = datetime(2026, 3, 2, 9, 0)
+
+def _seed(db):
+    db.add_all([User(id=1, mssv="1", password="x", ho_ten="SV", role="student"),
+                User(id=2, mssv="2", password="x", ho_ten="Tutor", role="tutor")])
+    db.add(Program(id=1, name="Giải tích", semester="HK1"))
+    db.add(Registration(student_id=1, program_id=1))
+    db.add_all([
+        TimeSlot(id=1, tutor_id=2, start_time=MONDAY_9, end_time=MONDAY_9 + timedelta(hours=1), is_booked=True),
+        TimeSlot(id=2, tutor_id=2, start_time=MONDAY_9 + timedelta(days=1),
+                 end_time=MONDAY_9 + timedelta(days=1, hours=2), is_booked=False),
+        # Slot đã qua không ai đặt: job chỉ đánh dấu đóng, vẫn tính vào giờ đã mở
+        TimeSlot(id=3, tutor_id=2, start_time=MONDAY_9 - timedelta(days=1),
+                 end_time=MONDAY_9 - timedelta(hours=23, minutes=30), is_booked=False, is_closed=True),
+    ])
+    db.add(BookingRequest(student_id=1, tutor_id=2, slot_id=1, status="accepted"))
+    db.add(TutorRequest(student_id=1, tutor_id=2, status=RequestStatus.accepted,
+                        requested_at=MONDAY_9, responded_at=MONDAY_9 + timedelta(minutes=30)))
+    db.commit()
+
+def test_dialect_expressions_on_sqlite(session_factory):
+    db = session_factory()
+    _seed(db)
+    repo = AnalyticsRepository(db)
+    [(tutor_id, name, offered, booked)] = repo.tutor_slot_hours()
+    assert (tutor_id, name) == (2, "Tutor")
+    assert round(offered) == 3.5 * 3600 and round(booked) == 3600
+    [(status, seconds)] = repo.response_latencies()
+    assert round(seconds) == 1800
+    assert repo.demand_by_hour() == [(0, 9, 1)]
+    db.close()
+
+def test_report_counts_closed_slots_as_offered(session_factory):
+    db = session_factory()
+    _seed(db)
+    state = SemesterAnalytics()
+    state.refresh(AnalyticsRepository(db))
+    tutors = state.report["tutors"]
+    assert tutors["offered_hours"] == 3.5 and tutors["booked_hours"] == 1.0
+    assert state.report["demand_heatmap"]["peaks"] == [{"weekday": "T2", "hour": 9, "requests": 1}]
+    assert state.report["programs"]["registrations"] == 1
+    db.close()
+
+def test_program_status_change_reloads_programs(session_factory):
+    db = session_factory()
+    _seed(db)
+    db.add(Program(id=2, name="Vật lý", semester="HK1", status="closed"))
+    db.commit()
+    state = SemesterAnalytics()
+    state.refresh(AnalyticsRepository(db))
+    assert {p["id"]: p["status"] for p in state.report["programs"]["items"]} == {1: "open", 2: "closed"}
+    # Đổi trạng thái hai program cùng lúc: số program đang mở không đổi
+    db.query(Program).filter(Program.id == 1).update({Program.status: "closed"})
+    db.query(Program).filter(Program.id == 2).update({Program.status: "open"})
+    db.commit()
+    state.refresh(AnalyticsRepository(db))
+    assert {p["id"]: p["status"] for p in state.report["programs"]["items"]} == {1: "closed", 2: "open"}
+    assert state.refreshes["partial"] == 1
+    db.close()
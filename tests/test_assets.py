@@ -0,0 +1,50 @@
+import gzip
+import io
+import json
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from fastapi.testclient import TestClient
+from app import assets
+
+@pytest.fixture
+def static_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(assets, "STATIC_DIR", str(tmp_path))
+    monkeypatch.setattr(assets, "VENDOR_DIR", str(tmp_path / "vendor"))
+    monkeypatch.setattr(assets, "MANIFEST_PATH", str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(assets, "_manifest", None)
+    monkeypatch.setattr(assets, "_fingerprinted", None)
+    return tmp_path
+
+def _build(monkeypatch, body: bytes) -> dict:
+    monkeypatch.setattr(assets, "CDN_ASSETS", {"lib.js": "https://cdn.example/lib.js"})
+    monkeypatch.setattr(assets.urllib.request, "urlopen", lambda url, timeout: io.BytesIO(body))
+    return assets.build()
+
+def test_rebuild_prunes_previous_fingerprinted_files(static_dir, monkeypatch):
+    (static_dir / "logo.png").write_bytes(b"png")
+    first = _build(monkeypatch, b"console.log(1)")
+    old_js = static_dir / first["lib.js"]
+    assert old_js.exists() and (static_dir / (first["lib.js"] + ".gz")).exists()
+    second = _build(monkeypatch, b"console.log(2)")
+    assert second["lib.js"] != first["lib.js"]
+    assert not old_js.exists() and not (static_dir / (first["lib.js"] + ".gz")).exists()
+    # logo.png không đổi -> cùng tên fingerprint, vẫn giữ
+    assert second["logo.png"] == first["logo.png"] and (static_dir / second["logo.png"]).exists()
+    assert json.loads((static_dir / "manifest.json").read_text()) == second
+
+def test_serves_precompressed_variant_with_cache_headers(static_dir):
+    (static_dir / "app.1234567890.js").write_bytes(b"var a = 1;")
+    (static_dir / "app.1234567890.js.gz").write_bytes(gzip.compress(b"var a = 1;"))
+    (static_dir / "manifest.json").write_text(json.dumps({"app.js": "app.1234567890.js"}))
+    app = Starlette(routes=[Mount("/static", assets.CachedStaticFiles(directory=str(static_dir)))])
+    client = TestClient(app)
+    res = client.get("/static/app.1234567890.js", headers={"accept-encoding": "gzip"})
+    assert res.status_code == 200 and res.text == "var a = 1;"
+    assert res.headers["content-encoding"] == "gzip"
+    assert res.headers["cache-control"] == assets.CachedStaticFiles.IMMUTABLE
+    assert res.headers["vary"] == "Accept-Encoding"
+    res = client.get("/static/app.1234567890.js", headers={"accept-encoding": "gzip;q=0"})
+    assert "content-encoding" not in res.headers and res.text == "var a = 1;"
+    res = client.get("/static/manifest.json", headers={"accept-encoding": "br, gzip"})
+    assert res.headers["cache-control"] == assets.CachedStaticFiles.REVALIDATE
@@ -0,0 +1,55 @@
+from app.services.audit import AuditTrail
+
+class FlakyTrail(AuditTrail):
+    """Writes into `rows`; each entry of `failures` fails one _write after calling it."""
+
+    def __init__(self, **kwargs):
+        super().__init__(session_factory=None, flush_seconds=3600, enabled=True, **kwargs)
+        self.rows = []
+        self.failures_left = []
+
+    def _ensure_started(self):
+        pass  # test gọi flush() trực tiếp, không cần thread ghi
+
+    def _write(self, batch):
+        if self.failures_left:
+            self.failures_left.pop(0)()
+            raise RuntimeError("database unavailable")
+        self.rows.extend(event[2] for event in batch)
+
+def _record(trail, *actions):
+    for action in actions:
+        trail.record(action)
+
+def test_failed_batch_is_retried_in_order():
+    trail = FlakyTrail(buffer_size=10, batch_size=2)
+    _record(trail, "a", "b", "c")
+    trail.failures_left = [lambda: None]
+    assert trail.flush() == 0
+    assert [e[2] for e in trail._buffer] == ["a", "b", "c"]
+    _record(trail, "d")
+    assert trail.flush() == 4
+    assert trail.rows == ["a", "b", "c", "d"]
+    assert trail.stats()["failures"] == 1 and trail.stats()["dropped"] == 0
+
+def test_requeue_into_full_buffer_drops_oldest():
+    trail = FlakyTrail(buffer_size=4, batch_size=2)
+    _record(trail, "a", "b", "c", "d")
+    # Trong lúc ghi batch [a, b] thất bại, 2 event mới lấp chỗ trống: buffer = c d e f
+    trail.failures_left = [lambda: _record(trail, "e", "f")]
+    assert trail.flush() == 0
+    assert [e[2] for e in trail._buffer] == ["c", "d", "e", "f"]
+    assert trail.dropped == 2
+    # Một chỗ trống: chỉ giữ event mới hơn của batch
+    trail.failures_left = [lambda: _record(trail, "g")]
+    assert trail.flush() == 0
+    assert [e[2] for e in trail._buffer] == ["d", "e", "f", "g"]
+    assert trail.dropped == 3
+    assert trail.flush() == 4 and trail.rows == ["d", "e", "f", "g"]
+    stats = trail.stats()
+    assert stats["recorded"] == 7 and stats["written"] + stats["dropped"] == 7
+
+def test_ring_buffer_counts_overflow():
+    trail = FlakyTrail(buffer_size=3, batch_size=10)
+    _record(trail, "a", "b", "c", "d", "e")
+    assert [e[2] for e in trail._buffer] == ["c", "d", "e"] and trail.dropped == 2
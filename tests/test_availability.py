@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+import pytest
+from app.domain.rules import AvailabilityDomain as D
+from app.models import User, TimeSlot, TutorRequest, BookingRequest, RequestStatus
+from app.services import services
+from app.services.availability import AvailabilityIndex
+from app.services.services import AvailabilityService
+
+MONDAY = datetime(2026, 3, 2)
+
+def test_encode_rounds_to_blocks_and_splits_weeks():
+    weeks = D.encode([(MONDAY + timedelta(minutes=20), MONDAY + timedelta(minutes=50))])
+    assert weeks == {MONDAY: 0b1110}  # 00:15 -> 01:00
+    sunday_late = MONDAY + timedelta(days=6, hours=23, minutes=30)
+    weeks = D.encode([(sunday_late, sunday_late + timedelta(hours=1))])
+    assert weeks == {MONDAY: D.range_mask(D.BLOCKS_PER_WEEK - 2, D.BLOCKS_PER_WEEK),
+                     MONDAY + timedelta(days=7): 0b11}
+
+def test_runs_and_lowest_bit():
+    bits = 0b0111_0011_1100
+    assert D.runs(bits, 3) == 0b0001_0000_1100
+    assert D.lowest_bit(D.runs(bits, 3)) == 2
+    assert D.runs(bits, 5) == 0 and D.lowest_bit(0) == -1
+    assert D.block_time(MONDAY, D.BLOCKS_PER_DAY + 2) == MONDAY + timedelta(days=1, minutes=30)
+
+@pytest.fixture
+def index(monkeypatch):
+    index = AvailabilityIndex()
+    monkeypatch.setattr(services, "availability_index", index)
+    return index
+
+def test_earliest_common_free_spans_week_boundary(session_factory, index):
+    next_week = D.week_start(datetime.now()) + timedelta(days=7)
+    saturday_10 = next_week + timedelta(days=5, hours=10)
+    sunday_23 = next_week + timedelta(days=6, hours=23)
+    db = session_factory()
+    db.add(User(id=1, mssv="1", password="x", ho_ten="SV", role="student"))
+    db.add_all([User(id=t, mssv=str(t), password="x", ho_ten=f"Tutor {t}", role="tutor") for t in (10, 11, 12)])
+    db.add_all([TutorRequest(student_id=1, tutor_id=t, status=RequestStatus.accepted) for t in (10, 11)])
+    db.add_all([
+        # Tutor 10: 23:00 Chủ nhật -> 01:00 thứ Hai tuần sau, hai slot liền nhau
+        TimeSlot(id=1, tutor_id=10, start_time=sunday_23, end_time=sunday_23 + timedelta(hours=1)),
+        TimeSlot(id=2, tutor_id=10, start_time=sunday_23 + timedelta(hours=1), end_time=sunday_23 + timedelta(hours=2)),
+        # Tutor 11 rảnh 2 giờ sáng thứ Bảy nhưng sinh viên đã có lịch 11:00 với tutor 12
+        TimeSlot(id=3, tutor_id=11, start_time=saturday_10, end_time=saturday_10 + timedelta(hours=2)),
+        TimeSlot(id=4, tutor_id=12, start_time=saturday_10 + timedelta(hours=1), end_time=saturday_10 + timedelta(hours=2)),
+    ])
+    db.add(BookingRequest(student_id=1, tutor_id=12, slot_id=4, status="pending"))
+    db.commit()
+
+    service = AvailabilityService(db)
+    two_hours = service.earliest_common_free(1, 120)
+    assert (two_hours["start_time"], two_hours["end_time"]) == (sunday_23, sunday_23 + timedelta(hours=2))
+    assert two_hours["tutors"] == [{"id": 10, "name": "Tutor 10"}]
+    one_hour = service.earliest_common_free(1, 60)
+    assert one_hour["start_time"] == saturday_10 and [t["id"] for t in one_hour["tutors"]] == [11]
+    assert service.earliest_common_free(1, 180) is None
+    assert index.stats() == {"tutors": 2, "students": 1}
+    db.close()
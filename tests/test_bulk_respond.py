@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import User, TimeSlot, BookingRequest, TutorRequest, RequestStatus
+from conftest import make_engine, login
+
+START = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=2)
+
+@pytest.fixture
+def without_slot_unique():
+    """Schema as created by script.sql (MySQL): no unique_slot_booking, so a slot can
+    have several pending requests."""
+    table = Base.metadata.tables["booking_requests"]
+    constraint = next(c for c in table.constraints if c.name == "unique_slot_booking")
+    table.constraints.discard(constraint)
+    yield
+    table.constraints.add(constraint)
+
+@pytest.fixture
+def session_factory(tmp_path, request):
+    if "without_slot_unique" in request.fixturenames:
+        request.getfixturevalue("without_slot_unique")
+    eng = make_engine(tmp_path / "primary.sqlite3")
+    yield sessionmaker(bind=eng, autoflush=False)
+    eng.dispose()
+
+def _seed(session_factory, bookings):
+    """bookings: [(id, student_id, slot_id, status)]; tutor 10 owns slots 1..3."""
+    db = session_factory()
+    db.add_all([User(id=i, mssv=str(i), password=str(i), ho_ten=f"SV{i}", role="student") for i in (1, 2, 3)])
+    db.add_all([User(id=10, mssv="10", password="10", ho_ten="Tutor", role="tutor"),
+                User(id=11, mssv="11", password="11", ho_ten="Tutor 2", role="tutor")])
+    for slot_id in (1, 2, 3):
+        start = START + timedelta(hours=slot_id)
+        db.add(TimeSlot(id=slot_id, tutor_id=10, start_time=start, end_time=start + timedelta(hours=1)))
+    for req_id, student_id, slot_id, status in bookings:
+        db.add(BookingRequest(id=req_id, student_id=student_id, tutor_id=10, slot_id=slot_id, status=status))
+    db.commit()
+    db.close()
+
+def _statuses(session_factory):
+    db = session_factory()
+    try:
+        return {r.id: r.status for r in db.query(BookingRequest).all()}
+    finally:
+        db.close()
+
+def _respond(client, *decisions):
+    res = client.post("/api/tutor/requests/respond_bulk",
+                      json={"decisions": [{"req_id": i, "action": a} for i, a in decisions]})
+    assert res.status_code == 200, res.text
+    return res.json()
+
+def test_first_accept_wins_and_competitors_are_rejected(without_slot_unique, session_factory, client):
+    _seed(session_factory, [(1, 1, 1, "pending"), (2, 2, 1, "pending"), (3, 3, 1, "pending"),
+                            (4, 1, 2, "pending")])
+    login(client, "10")
+    result = _respond(client, (2, "accept"), (1, "accept"), (4, "reject"), (99, "accept"))
+    assert result == {"accepted": [2], "rejected": [1, 4], "auto_rejected": [3], "skipped": [99], "failed": []}
+    assert _statuses(session_factory) == {1: "rejected", 2: "accepted", 3: "rejected", 4: "rejected"}
+    db = session_factory()
+    assert db.get(TimeSlot, 1).is_booked and not db.get(TimeSlot, 2).is_booked
+    db.close()
+
+def test_already_handled_and_foreign_requests_are_skipped(without_slot_unique, session_factory, client):
+    _seed(session_factory, [(1, 1, 1, "accepted"), (2, 2, 2, "pending")])
+    db = session_factory()
+    db.query(BookingRequest).filter(BookingRequest.id == 2).update({BookingRequest.tutor_id: 11})
+    db.commit()
+    db.close()
+    login(client, "10")
+    result = _respond(client, (1, "reject"), (2, "accept"))
+    assert result["skipped"] == [1, 2] and result["accepted"] == [] and result["rejected"] == []
+    assert _statuses(session_factory) == {1: "accepted", 2: "pending"}
+
+def test_unique_slot_conflict_falls_back_to_row_by_row(session_factory, client):
+    # unique_slot_booking: slot 2 đã có một request bị từ chối, từ chối thêm request 2 sẽ vi phạm
+    _seed(session_factory, [(1, 1, 1, "pending"), (2, 2, 2, "pending"), (3, 3, 2, "rejected"),
+                            (4, 3, 3, "pending")])
+    login(client, "10")
+    result = _respond(client, (1, "accept"), (2, "reject"), (4, "reject"))
+    assert result == {"accepted": [1], "rejected": [4], "auto_rejected": [], "skipped": [], "failed": [2]}
+    assert _statuses(session_factory) == {1: "accepted", 2: "pending", 3: "rejected", 4: "rejected"}
+
+def test_tutor_request_bulk(session_factory, client):
+    db = session_factory()
+    db.add_all([User(id=i, mssv=str(i), password=str(i), ho_ten=f"SV{i}", role="student") for i in (1, 2, 3)])
+    db.add(User(id=10, mssv="10", password="10", ho_ten="Tutor", role="tutor"))
+    db.add_all([TutorRequest(id=1, student_id=1, tutor_id=10), TutorRequest(id=2, student_id=2, tutor_id=10),
+                TutorRequest(id=3, student_id=3, tutor_id=10, status=RequestStatus.accepted)])
+    db.commit()
+    db.close()
+    login(client, "10")
+    res = client.post("/api/tutor/respond_requests_bulk", json={"decisions": [
+        {"request_id": 1, "accept": True}, {"request_id": 2, "accept": False, "reason": "Kín lịch"},
+        {"request_id": 3, "accept": False, "reason": "x"}, {"request_id": 1, "accept": False, "reason": "x"}]})
+    assert res.json() == {"success": True, "accepted": [1], "rejected": [2], "skipped": [3]}
+    res = client.post("/api/tutor/respond_requests_bulk", json={"decisions": [{"request_id": 2, "accept": False}]})
+    assert res.json()["success"] is False  # thiếu lý do từ chối
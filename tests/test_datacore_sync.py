@@ -0,0 +1,62 @@
+import asyncio
+from app.database import NamedLock
+from app.models import User, NO_LOCAL_PASSWORD
+from app.services.datacore_sync import DataCoreSync
+from app.services.services import AuthService
+
+class Roster:
+    async def iter_roster(self, page_size, cursor=None):
+        yield [{"mssv": "2210001", "ho_ten": "Nguyễn Văn A", "role": "student"}], None
+
+def test_synced_accounts_cannot_log_in_locally(session_factory, tmp_path):
+    sync = DataCoreSync(adapter=Roster(), session_factory=session_factory,
+                        checkpoint_path=str(tmp_path / "checkpoint"))
+    assert asyncio.run(sync.run())["inserted"] == 1
+    db = session_factory()
+    assert db.query(User.password).filter(User.mssv == "2210001").scalar() == NO_LOCAL_PASSWORD
+    auth = AuthService(db)
+    assert asyncio.run(auth.login("2210001", "")) is None
+    assert asyncio.run(auth.login("2210001", NO_LOCAL_PASSWORD)) is None
+    db.close()
+
+def test_sync_skips_while_another_process_holds_the_lock(session_factory, tmp_path, monkeypatch):
+    monkeypatch.setattr("app.database.LOCK_DIR", str(tmp_path))
+    other = NamedLock("datacore_roster_sync")
+    assert other.acquire()
+    sync = DataCoreSync(adapter=Roster(), session_factory=session_factory,
+                        checkpoint_path=str(tmp_path / "checkpoint"))
+    try:
+        assert "skipped" in asyncio.run(sync.run())
+    finally:
+        other.release()
+    assert asyncio.run(sync.run())["inserted"] == 1
+
+class Pages:
+    def __init__(self, *pages):
+        self.pages = pages
+
+    async def iter_roster(self, page_size, cursor=None):
+        for i, page in enumerate(self.pages):
+            yield page, (str(i + 1) if i + 1 < len(self.pages) else None)
+
+def test_only_changed_rows_are_written(session_factory, tmp_path):
+    db = session_factory()
+    db.add_all([User(mssv="1", password="x", ho_ten="Không đổi", role="student"),
+                User(mssv="2", password="x", ho_ten="Tên cũ", role="student"),
+                User(mssv="3", password="x", ho_ten="Quản trị", role="admin")])
+    db.commit()
+    db.close()
+    roster = Pages([{"mssv": "1", "ho_ten": "Không đổi", "role": "student"},
+                    {"mssv": "2", "ho_ten": "Tên mới", "role": "tutor"}],
+                   [{"mssv": "3", "ho_ten": "Đổi tên admin", "role": "student"},
+                    {"mssv": "4", "ho_ten": "Mới", "role": "unknown"}])
+    sync = DataCoreSync(adapter=roster, session_factory=session_factory,
+                        checkpoint_path=str(tmp_path / "checkpoint"))
+    result = asyncio.run(sync.run())
+    assert (result["pages"], result["seen"], result["updated"], result["inserted"]) == (2, 4, 1, 1)
+    db = session_factory()
+    rows = {u.mssv: (u.ho_ten, u.role) for u in db.query(User).all()}
+    db.close()
+    assert rows == {"1": ("Không đổi", "student"), "2": ("Tên mới", "tutor"),
+                    "3": ("Quản trị", "admin"), "4": ("Mới", "student")}
+    assert not (tmp_path / "checkpoint").exists()
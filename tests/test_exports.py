@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+import pytest
+from app.models import User, Program, Registration, TimeSlot, BookingRequest
+from app.services.exports import ExportService, BOOKING_COLUMNS
+from conftest import login
+
+MONDAY_9 = datetime(2026, 3, 2, 9, 0)
+
+@pytest.fixture
+def exports(session_factory):
+    db = session_factory()
+    db.add_all([User(id=1, mssv="2110001", password="x", ho_ten="Nguyễn Văn A", role="student"),
+                User(id=2, mssv="2110002", password="x", ho_ten="Trần Thị B", role="student"),
+                User(id=10, mssv="T10", password="x", ho_ten="Tutor", role="tutor")])
+    db.add_all([Program(id=1, name="Giải tích", semester="HK1"), Program(id=2, name="Vật lý", semester="HK2")])
+    db.add_all([Registration(id=1, student_id=1, program_id=1), Registration(id=2, student_id=2, program_id=2)])
+    for i in range(1, 6):
+        start = MONDAY_9 + timedelta(days=i)
+        db.add(TimeSlot(id=i, tutor_id=10, start_time=start, end_time=start + timedelta(hours=1)))
+        db.add(BookingRequest(id=i, student_id=1 if i % 2 else 2, tutor_id=10, slot_id=i, status="pending",
+                              note="a, \"b\"" if i == 1 else None, created_at=MONDAY_9))
+    db.commit()
+    db.close()
+    # chunk_size nhỏ để body gồm nhiều chunk
+    return ExportService(session_factory=session_factory, chunk_size=2)
+
+def test_ndjson_streams_in_chunks(exports):
+    chunks = list(exports.bookings("ndjson"))
+    assert len(chunks) == 3  # 2 + 2 + 1 dòng
+    rows = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+    assert [r["id"] for r in rows] == [1, 2, 3, 4, 5]
+    assert list(rows[0]) == BOOKING_COLUMNS
+    assert rows[0]["student_name"] == "Nguyễn Văn A" and rows[0]["start_time"] == "2026-03-03T09:00:00"
+
+def test_csv_has_header_and_quotes_values(exports):
+    body = b"".join(exports.bookings("csv", student_id=1)).decode()
+    rows = list(csv.reader(io.StringIO(body)))
+    assert rows[0] == BOOKING_COLUMNS
+    assert [r[0] for r in rows[1:]] == ["1", "3", "5"] and rows[1][8] == 'a, "b"'
+
+def test_filters(exports):
+    def ids(chunks):
+        return [json.loads(line)["id"] for line in b"".join(chunks).decode().splitlines()]
+    assert ids(exports.bookings("ndjson", program_id=2)) == [2, 4]
+    assert ids(exports.bookings("ndjson", semester="HK1")) == [1, 3, 5]
+    start, end = MONDAY_9 + timedelta(days=2), MONDAY_9 + timedelta(days=4)
+    assert ids(exports.bookings("ndjson", start=start, end=end)) == [2, 3]
+    assert ids(exports.bookings("ndjson", tutor_id=11)) == []
+    assert ids(exports.registrations("ndjson", semester="HK2")) == [2]
+
+def test_unknown_format_is_rejected_before_streaming(exports, client):
+    with pytest.raises(ValueError):
+        exports.bookings("xlsx")
+    login(client, "2110001", "x")
+    assert client.get("/api/student/bookings/export?format=xlsx").status_code == 400
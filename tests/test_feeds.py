@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+from app.models import User, TimeSlot, TutorRequest, RequestStatus
+from conftest import login
+
+START = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=2)
+
+def _seed(session_factory):
+    db = session_factory()
+    db.add_all([User(id=1, mssv="1", password="1", ho_ten="SV", role="student"),
+                User(id=10, mssv="10", password="10", ho_ten="Tutor", role="tutor")])
+    db.add(TutorRequest(student_id=1, tutor_id=10, status=RequestStatus.accepted))
+    db.add(TimeSlot(id=1, tutor_id=10, start_time=START, end_time=START + timedelta(hours=1)))
+    db.commit()
+    db.close()
+
+def _get(client, path, etag=None):
+    return client.get(path, headers={"if-none-match": etag} if etag else {})
+
+def test_tutor_schedule_revalidates_until_slots_change(session_factory, client):
+    _seed(session_factory)
+    login(client, "10")
+    first = _get(client, "/api/get_schedule")
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and len(first.json()) == 1 and etag.startswith('"')
+    cached = _get(client, "/api/get_schedule", etag)
+    assert cached.status_code == 304 and cached.headers["etag"] == etag and cached.content == b""
+    assert _get(client, "/api/get_schedule", f'"other", {etag}').status_code == 304
+
+    later = (START + timedelta(hours=3)).strftime("%Y-%m-%dT%H:%M:%S")
+    assert client.post("/api/update_schedule", json={"action": "add", "slots": [later]}).json()["success"]
+    changed = _get(client, "/api/get_schedule", etag)
+    assert changed.status_code == 200 and len(changed.json()) == 2
+    assert changed.headers["etag"] != etag
+
+def test_booking_request_bumps_student_schedule(session_factory, client):
+    _seed(session_factory)
+    login(client, "1")
+    schedule = _get(client, "/api/student/schedule")
+    slots = _get(client, "/api/student/slots")
+    assert schedule.json() == [] and [s["id"] for s in slots.json()["slots"]] == [1]
+    assert _get(client, "/api/student/schedule", schedule.headers["etag"]).status_code == 304
+    assert _get(client, "/api/student/slots", slots.headers["etag"]).status_code == 304
+
+    assert client.post("/api/student/book", json={"slot_id": 1}).status_code == 200
+    schedule_after = _get(client, "/api/student/schedule", schedule.headers["etag"])
+    assert schedule_after.status_code == 200 and [e["status"] for e in schedule_after.json()] == ["pending"]
+    assert schedule_after.headers["etag"] != schedule.headers["etag"]
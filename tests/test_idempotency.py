@@ -0,0 +1,110 @@
+import asyncio
+import json
+from app.idempotency import IdempotencyMiddleware, IdempotencyStore
+
+PATH = "/api/student/book"
+
+class Handler:
+    """ASGI app counting calls; answers `statuses` in turn (200 once exhausted)."""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+        self.release = None
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        body = (await receive())["body"]
+        if self.release is not None:
+            await self.release.wait()
+        status = self.statuses.pop(0) if self.statuses else 200
+        payload = json.dumps({"call": self.calls, "echo": body.decode()}).encode()
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json"), (b"set-cookie", b"session=x")]})
+        await send({"type": "http.response.body", "body": payload})
+
+def _middleware(handler, **kwargs):
+    return IdempotencyMiddleware(handler, store=IdempotencyStore(), paths={PATH}, **kwargs)
+
+async def _post(middleware, body=b'{"slot_id":1}', key=b"k1", chunks=None, content_length=True):
+    chunks = chunks or [body]
+    messages = [{"type": "http.request", "body": c, "more_body": i < len(chunks) - 1} for i, c in enumerate(chunks)]
+    headers = [(b"idempotency-key", key)]
+    if content_length:
+        headers.append((b"content-length", str(sum(map(len, chunks))).encode()))
+    scope = {"type": "http", "method": "POST", "path": PATH, "headers": headers, "session": {"user": {"id": 1}}}
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+    await middleware(scope, receive, send)
+    return sent[0]["status"], dict(sent[0]["headers"]), b"".join(m.get("body", b"") for m in sent[1:])
+
+def test_replay_returns_first_response():
+    handler = Handler()
+    middleware = _middleware(handler)
+
+    async def main():
+        first = await _post(middleware)
+        second = await _post(middleware)
+        other_key = await _post(middleware, key=b"k2")
+        return first, second, other_key
+    first, second, other_key = asyncio.run(main())
+    assert handler.calls == 2
+    assert second[0] == 200 and second[2] == first[2]
+    assert second[1][b"idempotent-replayed"] == b"true" and b"set-cookie" not in second[1]
+    assert b"idempotent-replayed" not in first[1] and json.loads(other_key[2])["call"] == 2
+
+def test_key_reused_with_different_body_is_422():
+    handler = Handler()
+    middleware = _middleware(handler)
+
+    async def main():
+        await _post(middleware)
+        return await _post(middleware, body=b'{"slot_id":2}')
+    assert asyncio.run(main())[0] == 422
+    assert handler.calls == 1 and middleware.store.stats["conflicts"] == 1
+
+def test_concurrent_retry_waits_for_first_answer():
+    handler = Handler()
+    middleware = _middleware(handler)
+
+    async def main():
+        handler.release = asyncio.Event()
+        first = asyncio.create_task(_post(middleware))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(_post(middleware))
+        await asyncio.sleep(0.01)
+        assert not second.done()
+        handler.release.set()
+        return await first, await second
+    first, second = asyncio.run(main())
+    assert handler.calls == 1 and second[2] == first[2]
+    assert middleware.store.stats["in_flight_waits"] == 1
+
+def test_server_errors_are_not_stored():
+    handler = Handler(500)
+    middleware = _middleware(handler)
+
+    async def main():
+        return await _post(middleware), await _post(middleware)
+    first, second = asyncio.run(main())
+    assert (first[0], second[0]) == (500, 200)
+    assert handler.calls == 2 and b"idempotent-replayed" not in second[1]
+
+def test_large_bodies_are_rejected_before_buffering():
+    handler = Handler()
+    middleware = _middleware(handler, max_body_bytes=100)
+
+    async def main():
+        declared = await _post(middleware, body=b"x" * 101)
+        streamed = await _post(middleware, key=b"k2", chunks=[b"x" * 60, b"x" * 60], content_length=False)
+        small = await _post(middleware, key=b"k3", body=b"x" * 100)
+        return declared, streamed, small
+    declared, streamed, small = asyncio.run(main())
+    assert (declared[0], streamed[0], small[0]) == (413, 413, 200)
+    assert handler.calls == 1 and middleware.store.stats["too_large"] == 2
+    assert middleware.store.snapshot()["keys"] == 1
@@ -0,0 +1,76 @@
+import asyncio
+import time
+import pytest
+from app import profiling
+from app.profiling import ProfileSession, ProfilerBusy, sample_stacks
+from app.models import User
+from conftest import login
+
+def _work(n=2000):
+    return sum(i * i for i in range(n))
+
+@pytest.fixture
+def busy():
+    """Another profiling session holds this worker."""
+    assert profiling._session_lock.acquire(blocking=False)
+    yield
+    profiling._session_lock.release()
+
+def test_one_session_per_worker(busy):
+    with pytest.raises(ProfilerBusy):
+        sample_stacks(0.01)
+    with pytest.raises(ProfilerBusy):
+        asyncio.run(ProfileSession("/x", 1).run(1))
+
+def test_busy_worker_answers_409(busy, session_factory, client):
+    db = session_factory()
+    db.add(User(id=1, mssv="admin", password="admin", ho_ten="Admin", role="admin"))
+    db.commit()
+    db.close()
+    login(client, "admin")
+    assert client.post("/api/admin/profile/sample?seconds=0.01").status_code == 409
+    assert client.post("/api/admin/profile/requests?path=/api/get_schedule&timeout=0.01").status_code == 409
+    assert client.post("/api/admin/profile/requests?path=/nope").status_code == 404
+
+def test_limits_cap_count_and_duration(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_MAX_REQUESTS", 3)
+    monkeypatch.setattr(profiling, "PROFILE_MAX_SECONDS", 0.05)
+    assert ProfileSession("/x", 1000).count == 3
+    started = time.monotonic()
+    assert asyncio.run(ProfileSession("/x", 1).run(timeout=60)) is False
+    assert isinstance(sample_stacks(60, interval=0.01), str)
+    assert time.monotonic() - started < 5
+    assert profiling._active is None and not profiling._session_lock.locked()
+
+def test_armed_route_profiles_next_calls_only():
+    endpoint = profiling._profiled("/work", _work)
+    session = ProfileSession("/work", 2)
+
+    async def main():
+        task = asyncio.create_task(session.run(timeout=10))
+        await asyncio.sleep(0)
+        endpoint(10)  # chạy trên thread của event loop
+        assert profiling._profiled("/other", _work)(10) == _work(10)  # route khác: không profile
+        await asyncio.to_thread(endpoint, 10)
+        return await task
+    assert asyncio.run(main()) is True
+    assert session.calls == 2 and len(session.elapsed) == 2
+    assert endpoint() == _work()  # phiên đã kết thúc
+    assert session.calls == 2
+    text = session.as_text()
+    assert text.startswith("/work: 2 request(s)") and "_work" in text
+    assert session.as_pstats()
+
+def test_nested_call_on_same_thread_is_skipped():
+    session = ProfileSession("/outer", 5)
+    inner = profiling._profiled("/outer", _work)
+    outer = profiling._profiled("/outer", lambda: inner(10))
+
+    async def main():
+        task = asyncio.create_task(session.run(timeout=0.2))
+        await asyncio.sleep(0)
+        outer()
+        return await task
+    assert asyncio.run(main()) is False
+    assert (session.calls, session.skipped) == (1, 1)
+    assert "1 overlapping request(s) not profiled" in session.as_text()
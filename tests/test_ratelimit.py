@@ -0,0 +1,96 @@
+import asyncio
+import pytest
+from app import ratelimit
+from app.ratelimit import MemoryRateStore, RateLimiter, RateLimitMiddleware, Rule, SQLiteRateStore
+
+ROUTE = ("GET", "/api/find_tutor")
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(6000.0)  # đầu một cửa sổ 60s
+    monkeypatch.setattr(ratelimit, "time", clock)
+    return clock
+
+@pytest.fixture(params=["memory", "sqlite"])
+def limiter(request, tmp_path):
+    store = MemoryRateStore() if request.param == "memory" else SQLiteRateStore(str(tmp_path / "rl.sqlite3"))
+    return RateLimiter(rules={ROUTE: Rule(10, 60)}, store=store, enabled=True)
+
+def _check(limiter, client="user:1"):
+    return limiter.check(*ROUTE, client)
+
+def test_previous_window_is_weighted_by_overlap(limiter, clock):
+    assert all(_check(limiter) is None for _ in range(10))
+    assert _check(limiter) is not None  # cửa sổ hiện tại đã đủ 10 (+1 bị từ chối)
+    # Giữa cửa sổ sau: 11 lần trước tính 11 * 0.5 = 5.5, còn chỗ cho 4 lần nữa
+    clock.now += 90
+    assert all(_check(limiter) is None for _ in range(4))
+    assert _check(limiter) is not None
+    assert _check(limiter, "user:2") is None  # mỗi client một bộ đếm
+
+@pytest.mark.parametrize("burst", [11, 20])
+def test_client_honouring_retry_after_gets_through(limiter, clock, burst):
+    for _ in range(burst):
+        retry_after = _check(limiter)
+    assert retry_after is not None
+    clock.now += retry_after + 1e-6
+    assert _check(limiter) is None
+
+def test_retry_after_within_window_when_previous_decays(limiter, clock):
+    clock.now += 60 - 30  # nửa cửa sổ đầu
+    for _ in range(10):
+        _check(limiter)
+    clock.now += 40  # 10 sang cửa sổ sau, đã qua 1/6 cửa sổ
+    for _ in range(4):
+        _check(limiter)
+    retry_after = _check(limiter)
+    assert retry_after is not None and retry_after < 50
+    clock.now += retry_after + 1e-6
+    assert _check(limiter) is None
+
+def test_store_errors_let_requests_through(clock):
+    class Broken(MemoryRateStore):
+        def hit(self, *args):
+            raise ratelimit.sqlite3.OperationalError("database is locked")
+    limiter = RateLimiter(rules={ROUTE: Rule(1, 60)}, store=Broken(), enabled=True)
+    assert _check(limiter) is None and _check(limiter) is None
+    assert limiter.stats()["routes"]["/api/find_tutor"]["store_errors"] == 2
+
+def test_middleware_answers_429_with_retry_after(clock):
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    middleware = RateLimitMiddleware(app, RateLimiter(rules={ROUTE: Rule(1, 60)}, store=MemoryRateStore(),
+                                                      enabled=True))
+
+    async def request(path="/api/find_tutor"):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+        scope = {"type": "http", "method": "GET", "path": path, "client": ("10.0.0.1", 1),
+                 "session": {"user": {"id": 7}}}
+        await middleware(scope, None, send)
+        return sent[0]["status"], dict(sent[0]["headers"])
+
+    async def main():
+        assert (await request())[0] == 200
+        status, headers = await request()
+        assert status == 429 and int(headers[b"retry-after"]) >= 60
+        assert (await request("/api/other"))[0] == 200  # route không có rule
+    asyncio.run(main())
+    assert calls == ["/api/find_tutor", "/api/other"]
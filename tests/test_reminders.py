@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from app.models import User, TimeSlot, BookingRequest
+from app.migrate import add_missing_columns
+from app.services import jobs
+from app.services.reminders import InMemoryNotifier, ReminderIndex
+
+def _seed(db, start_times):
+    db.add_all([User(id=1, mssv="1", password="1", ho_ten="SV", role="student"),
+                User(id=2, mssv="2", password="2", ho_ten="Tutor", role="tutor")])
+    for i, start in enumerate(start_times, 1):
+        db.add(TimeSlot(id=i, tutor_id=2, start_time=start, end_time=start + timedelta(hours=1), is_booked=True))
+        db.add(BookingRequest(id=i, student_id=1, tutor_id=2, slot_id=i, status="accepted"))
+    db.commit()
+
+def test_due_reminders_are_sent_once(session_factory, monkeypatch):
+    now = datetime.now()
+    db = session_factory()
+    _seed(db, [now + timedelta(minutes=10), now + timedelta(minutes=90)])
+    db.close()
+    notifier = InMemoryNotifier()
+    monkeypatch.setattr(jobs, "SessionLocal", session_factory)
+    monkeypatch.setattr(jobs, "notifier", notifier)
+    monkeypatch.setattr(jobs, "reminder_index", ReminderIndex(lead_minutes=30))
+
+    assert jobs.load_session_reminders() == 2
+    assert jobs.dispatch_session_reminders() == 1
+    assert [r["id"] for r in notifier.sent] == [1]
+    assert "Tutor" in notifier.sent[0]["message"]
+    # Đã claim trong DB: nạp lại rồi gửi lại cũng không nhắc lần hai
+    assert jobs.load_session_reminders() == 1
+    assert jobs.dispatch_session_reminders() == 0
+    assert len(notifier.sent) == 1
+
+def test_migrate_adds_reminder_token(engine):
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE booking_requests DROP COLUMN reminder_token"))
+    assert add_missing_columns(engine) == ["booking_requests.reminder_token"]
+    assert add_missing_columns(engine) == []
@@ -0,0 +1,121 @@
+import time
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app.database import ReplicaSet, RoutingSession
+from app.models import User, TimeSlot, TutorRequest, FeedVersion, RequestStatus
+from app.repositories.repos import UserRepository
+from app.services import services
+from app.services.availability import AvailabilityIndex
+from conftest import make_engine
+
+# Hai file SQLite: "primary" và "replica" có dữ liệu khác nhau nên biết được câu đọc đi đâu
+
+class LaggingReplicaSet(ReplicaSet):
+    def __init__(self, engines, lag: float, **kwargs):
+        super().__init__(engines, **kwargs)
+        self.fixed_lag = lag
+
+    def measure_lag(self, eng) -> float:
+        return self.fixed_lag
+
+@pytest.fixture
+def primary(tmp_path):
+    eng = make_engine(tmp_path / "primary.sqlite3")
+    yield eng
+    eng.dispose()
+
+@pytest.fixture
+def replica(tmp_path):
+    eng = make_engine(tmp_path / "replica.sqlite3")
+    yield eng
+    eng.dispose()
+
+def _add_users(eng, *mssvs):
+    db = sessionmaker(bind=eng)()
+    db.add_all([User(mssv=m, password="x", ho_ten=m, role="student") for m in mssvs])
+    db.commit()
+    db.close()
+
+def _factory(primary, replica, lag: float = 0.0):
+    replica_set = LaggingReplicaSet([replica], lag=lag, max_lag=2.0, check_every=1.0)
+    return sessionmaker(class_=RoutingSession, bind=primary, replica_set=replica_set, autoflush=False)
+
+def _mssvs(db):
+    return sorted(u.mssv for u in UserRepository(db).get_all())
+
+def test_replica_reads_and_primary_writes(primary, replica):
+    _add_users(primary, "P")
+    _add_users(replica, "R")
+    factory = _factory(primary, replica)
+    db = factory()
+    assert _mssvs(db) == ["R"]
+    # Phương thức không đánh dấu @replica_read vẫn đọc primary
+    assert UserRepository(db).get_by_mssv("P") is not None
+    db.add(User(mssv="N", password="x", ho_ten="N", role="student"))
+    db.commit()
+    # Session đã ghi thì đọc tiếp ở primary, thấy ngay dòng vừa ghi
+    assert _mssvs(db) == ["N", "P"]
+    assert db.replicas.stats["replica_reads"] == 1 and db.replicas.stats["sticky_reads"] == 1
+    db.close()
+
+def test_read_your_writes_window(primary, replica):
+    _add_users(primary, "P")
+    _add_users(replica, "R")
+    factory = _factory(primary, replica)
+    http_session = {}
+    db = factory()
+    db.info["http_session"] = http_session
+    db.add(User(mssv="N", password="x", ho_ten="N", role="student"))
+    db.commit()
+    db.close()
+    # Cửa sổ dính primary = độ trễ tối đa + chu kỳ đo độ trễ
+    assert http_session["db_primary_until"] >= time.time() + 2.5
+
+    db = factory()
+    db.info["primary_until"] = http_session["db_primary_until"]
+    assert _mssvs(db) == ["N", "P"]
+    db.close()
+    db = factory()
+    db.info["primary_until"] = time.time() - 1
+    assert _mssvs(db) == ["R"]
+    db.close()
+
+def test_lagging_replica_is_skipped(primary, replica):
+    _add_users(primary, "P")
+    _add_users(replica, "R")
+    db = _factory(primary, replica, lag=10.0)()
+    assert _mssvs(db) == ["P"]
+    assert db.replicas.stats["lagging_skips"] == 1 and db.replicas.stats["primary_reads"] == 1
+    db.close()
+
+def test_check_interval_is_capped_by_max_lag():
+    assert ReplicaSet([], max_lag=2.0, check_every=5.0).check_every == 1.0
+
+def _seed_schedule(eng, version, slot_hours):
+    start = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+    db = sessionmaker(bind=eng)()
+    db.add_all([User(id=1, mssv="1", password="x", ho_ten="SV", role="student"),
+                User(id=2, mssv="2", password="x", ho_ten="Tutor", role="tutor")])
+    db.add(TutorRequest(student_id=1, tutor_id=2, status=RequestStatus.accepted))
+    db.add(FeedVersion(scope="tutor_slots", owner_id=2, version=version))
+    for h in slot_hours:
+        db.add(TimeSlot(tutor_id=2, start_time=start + timedelta(hours=h),
+                        end_time=start + timedelta(hours=h + 1), is_booked=False))
+    db.commit()
+    db.close()
+
+def test_tutor_weeks_cached_under_the_version_it_was_read_with(primary, replica, monkeypatch):
+    # Replica còn ở version 1 (một slot), primary đã sang version 2 (hai slot)
+    _seed_schedule(replica, 1, [0])
+    _seed_schedule(primary, 2, [0, 2])
+    index = AvailabilityIndex()
+    monkeypatch.setattr(services, "availability_index", index)
+    db = _factory(primary, replica)()
+    services.AvailabilityService(db)._tutor_weeks(1)
+    db.close()
+    # Lịch cũ của replica không được cache dưới version mới của primary
+    found, missing = index.get_tutors({2: 2})
+    assert missing == [2]
+    found, _ = index.get_tutors({2: 1})
+    assert sum(bin(bits).count("1") for bits in found[2].values()) == 60 // services.AvailabilityDomain.GRANULARITY_MINUTES
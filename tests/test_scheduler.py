@@ -0,0 +1,55 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from app.database import NamedLock
+from app.models import User, TimeSlot
+from app.services.scheduler import BackgroundScheduler
+from app.services.services import MaintenanceService
+
+def test_close_past_slots_keeps_rows(session_factory):
+    db = session_factory()
+    now = datetime.now()
+    db.add(User(id=1, mssv="1", password="1", ho_ten="Tutor", role="tutor"))
+    db.add_all([
+        TimeSlot(id=1, tutor_id=1, start_time=now - timedelta(days=3), end_time=now - timedelta(days=3, hours=-1)),
+        TimeSlot(id=2, tutor_id=1, start_time=now + timedelta(days=1), end_time=now + timedelta(days=1, hours=1)),
+    ])
+    db.commit()
+    assert MaintenanceService(db).close_past_slots() == 1
+    assert MaintenanceService(db).close_past_slots() == 0
+    db.expire_all()
+    assert [(s.id, s.is_closed) for s in db.query(TimeSlot).order_by(TimeSlot.id)] == [(1, True), (2, False)]
+    db.close()
+
+def test_leader_only_jobs_and_independent_tasks(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.database.LOCK_DIR", str(tmp_path))
+    other_worker = NamedLock("leader_test")
+    assert other_worker.acquire()
+    ran = []
+
+    def slow():
+        time.sleep(0.3)
+        ran.append("slow")
+
+    async def scenario():
+        scheduler = BackgroundScheduler(leader=NamedLock("leader_test"))
+        scheduler.register("sweep", lambda: ran.append("sweep"), leader_only=True)
+        scheduler.register("slow", slow)
+        scheduler.register("fast", lambda: ran.append("fast"))
+        scheduler.start()
+        now = datetime.now()
+        for name in ("sweep", "slow", "fast"):
+            scheduler.schedule(name, now)
+        await asyncio.sleep(0.1)
+        assert ran == ["fast"]  # không đợi job chậm, job leader-only bị bỏ qua
+        other_worker.release()
+        scheduler.schedule("sweep", datetime.now())
+        await asyncio.sleep(0.4)
+        stats = scheduler.stats()
+        await scheduler.stop()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert sorted(ran) == ["fast", "slow", "sweep"]
+    assert stats["jobs"]["sweep"]["skipped"] == 1
+    assert stats["leader"]
@@ -0,0 +1,78 @@
+import json
+import pytest
+from app.services import shared_cache as module
+from app.services.shared_cache import SharedCache, TUTORS
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(1000.0)
+    monkeypatch.setattr(module, "time", clock)
+    return clock
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two workers of one host sharing the cache file."""
+    path = str(tmp_path / "shared.sqlite3")
+    return SharedCache(path=path, ttl=60, enabled=True), SharedCache(path=path, ttl=60, enabled=True)
+
+class Loader:
+    def __init__(self, value="v1"):
+        self.value = value
+        self.calls = []
+
+    def __call__(self, keys):
+        self.calls.append(keys)
+        return {k: {"id": k, "value": self.value} for k in keys if k != "404"}
+
+def test_hits_are_shared_and_absent_keys_cached_as_null(workers, clock):
+    a, b = workers
+    loader = Loader()
+    values = a.load_many(TUTORS, [1, 2, "404"], loader)
+    assert json.loads(values["1"]) == {"id": "1", "value": "v1"} and values["404"] == b"null"
+    assert b.load_many(TUTORS, [2, 1, "404"], loader) == values
+    assert loader.calls == [["1", "2", "404"]]
+    assert b.snapshot()["hits"] == 3 and a.snapshot()["loads"] == 1
+
+def test_invalidate_bumps_generation_for_every_worker(workers, clock):
+    a, b = workers
+    loader = Loader()
+    a.load_many(TUTORS, [1], loader)
+    loader.value = "v2"
+    b.invalidate(TUTORS)
+    assert json.loads(a.load(TUTORS, "1", lambda: loader(["1"])["1"]))["value"] == "v2"
+    assert a.get_many("programs", ["1"]) == (0, {})  # namespace khác không bị ảnh hưởng
+    assert b.snapshot()["invalidations"] == 1
+
+def test_load_racing_an_invalidation_is_never_served(workers, clock):
+    a, b = workers
+    generation, found = a.get_many(TUTORS, ["1"])
+    assert found == {}
+    b.invalidate(TUTORS)  # dữ liệu đổi trong lúc a đang đọc DB
+    a.put_many(TUTORS, generation, {"1": b'"stale"'})
+    assert b.get_many(TUTORS, ["1"]) == (generation + 1, {})
+
+def test_entries_expire_after_ttl(workers, clock):
+    a, _ = workers
+    loader = Loader()
+    a.load_many(TUTORS, [1], loader)
+    clock.now += 59
+    a.load_many(TUTORS, [1], loader)
+    clock.now += 2
+    a.load_many(TUTORS, [1], loader)
+    assert loader.calls == [["1"], ["1"]]
+
+def test_disabled_or_broken_cache_reads_through(tmp_path):
+    loader = Loader()
+    off = SharedCache(path=str(tmp_path / "off.sqlite3"), enabled=False)
+    assert off.load_many(TUTORS, [1], loader) == off.load_many(TUTORS, [1], loader)
+    broken = SharedCache(path=str(tmp_path / "missing-dir" / "x.sqlite3"), enabled=True)
+    assert json.loads(broken.load_many(TUTORS, [1], loader)["1"])["id"] == "1"
+    broken.invalidate(TUTORS)
+    assert len(loader.calls) == 3 and broken.snapshot()["errors"] == 2
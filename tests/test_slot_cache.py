@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+import pytest
+from app.models import User, TimeSlot, TutorRequest, RequestStatus
+from app.repositories.repos import ScheduleRepository
+from app.services import services
+from app.services.services import BookingService
+from app.services.slot_cache import TutorSlotCache
+
+START = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=2)
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = TutorSlotCache()
+    monkeypatch.setattr(services, "tutor_slot_cache", cache)
+    return cache
+
+@pytest.fixture
+def db(session_factory):
+    db = session_factory()
+    db.add_all([User(id=i, mssv=str(i), password="x", ho_ten=f"SV{i}", role="student") for i in (1, 2)])
+    db.add_all([User(id=10, mssv="10", password="x", ho_ten="Tutor A", role="tutor"),
+                User(id=11, mssv="11", password="x", ho_ten="Tutor B", role="tutor")])
+    db.add_all([TutorRequest(student_id=1, tutor_id=10, status=RequestStatus.accepted),
+                TutorRequest(student_id=2, tutor_id=10, status=RequestStatus.accepted),
+                TutorRequest(id=3, student_id=1, tutor_id=11)])
+    db.add_all([TimeSlot(id=1, tutor_id=10, start_time=START, end_time=START + timedelta(hours=1)),
+                TimeSlot(id=2, tutor_id=11, start_time=START, end_time=START + timedelta(hours=1))])
+    db.commit()
+    yield db
+    db.close()
+
+def _slot_ids(db, student_id):
+    # Mỗi request một BookingService mới, như controller
+    return [s["id"] for s in BookingService(db).get_slots_of_tutors(student_id)]
+
+def test_tutor_entry_is_shared_between_students(db, cache):
+    assert _slot_ids(db, 1) == [1]
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert _slot_ids(db, 2) == [1] and _slot_ids(db, 1) == [1]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+def test_slot_writes_invalidate_through_feed_version(db, cache):
+    assert _slot_ids(db, 1) == [1]
+    repo = ScheduleRepository(db)
+    repo.create_slot(10, START + timedelta(hours=2), START + timedelta(hours=3))
+    assert _slot_ids(db, 1) == [1, 3] and cache.misses == 2
+    repo.mark_booked(1)
+    assert _slot_ids(db, 1) == [3] and cache.misses == 3
+    repo.delete_slot(10, START + timedelta(hours=2))
+    assert _slot_ids(db, 1) == [] and cache.misses == 4
+    assert _slot_ids(db, 2) == [] and cache.hits == 1
+
+def test_accepting_a_tutor_request_adds_that_tutor(db, cache):
+    assert _slot_ids(db, 1) == [1]
+    db.get(TutorRequest, 3).status = RequestStatus.accepted
+    db.commit()
+    assert _slot_ids(db, 1) == [1, 2]
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert cache.stats()["tutors"] == 2
@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+from sqlalchemy import inspect, text
+from app.migrate import add_missing_indexes
+from app.models import User, TimeSlot
+from app.repositories.repos import ScheduleRepository
+from app.services.services import MaintenanceService
+
+def test_closed_slots_are_hidden_from_schedule_reads(session_factory):
+    now = datetime.now()
+    db = session_factory()
+    db.add(User(id=1, mssv="1", password="1", ho_ten="Tutor", role="tutor"))
+    db.add_all([
+        TimeSlot(id=1, tutor_id=1, start_time=now - timedelta(days=40), end_time=now - timedelta(days=40, hours=-1)),
+        TimeSlot(id=2, tutor_id=1, start_time=now + timedelta(days=1), end_time=now + timedelta(days=1, hours=1)),
+    ])
+    db.commit()
+    assert MaintenanceService(db).close_past_slots() == 1
+    repo = ScheduleRepository(db)
+    assert [s.id for s in repo.get_slots_by_tutor(1)] == [2]
+    assert [r.tutor_id for r in repo.get_open_slot_times([1], now - timedelta(days=60))] == [1]
+    # Không xóa: slot đã đóng vẫn còn cho lịch sử/analytics
+    assert db.get(TimeSlot, 1).is_closed
+    db.close()
+
+def test_migrate_adds_open_slot_index(engine):
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_time_slots_tutor_open"))
+    assert add_missing_indexes(engine) == ["time_slots.ix_time_slots_tutor_open"]
+    assert add_missing_indexes(engine) == []
+    [index] = [i for i in inspect(engine).get_indexes("time_slots") if i["name"] == "ix_time_slots_tutor_open"]
+    assert index["column_names"] == ["tutor_id", "is_closed", "start_time"]